@@ -43,6 +43,7 @@ INSTALLED_APPS = [
     'packing',
     'chatbot',
     'api',
+    'jobs',
     'accounts',
     'home',
     'crispy_forms',
@@ -178,8 +179,18 @@ CACHES = {
         'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
         'LOCATION': 'travelmate-api-cache',
         'TIMEOUT': 3600,
-    }
+    },
+    # Visible to every gunicorn worker; create the table with `manage.py createcachetable`
+    'shared': {
+        'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+        'LOCATION': 'travelmate_shared_cache',
+        'TIMEOUT': 3600,
+        'OPTIONS': {
+            'MAX_ENTRIES': 20000,
+        },
+    },
 }
+SINGLEFLIGHT_CACHE_ALIAS = 'shared'  # Cache used to coalesce identical upstream calls across workers
 
 # API Keys
 OWM_API_KEY = os.getenv('OWM_API_KEY')
@@ -188,6 +199,93 @@ OPENROUTER_API_KEY = os.getenv('OPENROUTER_API_KEY')
 GEOCODE_API_KEY = os.getenv('GEOCODE_API_KEY')
 OPENROUTER_MODEL = "google/gemini-2.5-flash-preview-09-2025"
 
+# Outbound HTTP (see api/services/http_client.py)
+OUTBOUND_HTTP = {
+    'CONNECT_TIMEOUT': float(os.getenv('HTTP_CONNECT_TIMEOUT', 3.05)),
+    'READ_TIMEOUT': float(os.getenv('HTTP_READ_TIMEOUT', 10)),
+    'POOL_MAXSIZE': int(os.getenv('HTTP_POOL_MAXSIZE', 10)),
+    'RETRIES': int(os.getenv('HTTP_RETRIES', 2)),
+    'BACKOFF_FACTOR': float(os.getenv('HTTP_BACKOFF_FACTOR', 0.3)),
+}
+
+# Per-upstream circuit breakers (see api/services/circuit.py); unset keys use its DEFAULTS
+CIRCUIT_BREAKERS = {
+    'radar': {'SLOW_CALL_SECONDS': 3.0, 'OPEN_SECONDS': 30},
+    'owm': {'SLOW_CALL_SECONDS': 5.0, 'OPEN_SECONDS': 30},
+}
+
+# OpenRouter clients (see api/services/llm.py)
+LLM_CLIENT = {
+    'CONNECT_TIMEOUT': float(os.getenv('LLM_CONNECT_TIMEOUT', 5)),
+    'READ_TIMEOUT': float(os.getenv('LLM_READ_TIMEOUT', 60)),
+    'MAX_CONNECTIONS': int(os.getenv('LLM_MAX_CONNECTIONS', 20)),
+    'MAX_KEEPALIVE_CONNECTIONS': int(os.getenv('LLM_MAX_KEEPALIVE_CONNECTIONS', 10)),
+    'MAX_RETRIES': int(os.getenv('LLM_MAX_RETRIES', 2)),
+    'INTERACTIVE_MAX_RETRIES': int(os.getenv('LLM_INTERACTIVE_MAX_RETRIES', 0)),  # Chat replies a user waits on
+}
+
+# Model fallback chain and hedged requests for packing list generation (see api/services/hedging.py)
+LLM_HEDGING = {
+    'FALLBACK_MODELS': [m.strip() for m in os.getenv('LLM_FALLBACK_MODELS', 'openai/gpt-4o-mini').split(',') if m.strip()],
+    'PERCENTILE': float(os.getenv('LLM_HEDGE_PERCENTILE', 0.9)),
+    'MIN_DELAY': float(os.getenv('LLM_HEDGE_MIN_DELAY', 2)),
+    'MAX_DELAY': float(os.getenv('LLM_HEDGE_MAX_DELAY', 30)),
+    'DEFAULT_DELAY': float(os.getenv('LLM_HEDGE_DEFAULT_DELAY', 10)),
+}
+
+# LLM call telemetry (see api/services/telemetry.py); roll up with `manage.py llm_rollup`
+LLM_TELEMETRY_ENABLED = os.getenv('LLM_TELEMETRY_ENABLED', 'True') == 'True'
+LLM_TELEMETRY_RETENTION_DAYS = int(os.getenv('LLM_TELEMETRY_RETENTION_DAYS', 30))  # Raw calls kept; daily reports are kept
+# USD per million (prompt, completion[, cached prompt]) tokens, for cost estimates
+LLM_PRICES = {
+    'google/gemini-2.5-flash-preview-09-2025': (0.30, 2.50, 0.075),
+}
+
+# Background AI generations (see jobs/queue.py); run with `manage.py run_workers`
+JOBS = {
+    'WORKERS': int(os.getenv('JOB_WORKERS', 2)),
+    'POLL_INTERVAL': float(os.getenv('JOB_POLL_INTERVAL', 1.0)),
+    'MAX_ATTEMPTS': int(os.getenv('JOB_MAX_ATTEMPTS', 3)),
+    'RETRY_BACKOFF': int(os.getenv('JOB_RETRY_BACKOFF', 10)),
+    'STALE_SECONDS': int(os.getenv('JOB_STALE_SECONDS', 300)),
+}
+
+# Chatbot conversation memory (see chatbot/context.py)
+CHAT_CONTEXT = {
+    'HISTORY_TOKENS': int(os.getenv('CHAT_HISTORY_TOKENS', 1500)),
+    'MESSAGE_TOKENS': int(os.getenv('CHAT_MESSAGE_TOKENS', 400)),
+    'SUMMARY_TOKENS': int(os.getenv('CHAT_SUMMARY_TOKENS', 300)),
+    'SUMMARIZE_AFTER': int(os.getenv('CHAT_SUMMARIZE_AFTER', 4)),
+}
+
+# Generated packing lists are reused for near-identical trips (see api/services/packing_cache.py)
+PACKING_CACHE_TTL = int(os.getenv('PACKING_CACHE_TTL', 7 * 24 * 60 * 60))
+PACKING_STREAM_BATCH_SIZE = int(os.getenv('PACKING_STREAM_BATCH_SIZE', 5))  # Streamed packing items saved per INSERT
+
+# Shared travel tips per destination and month are regenerated after this many days (see tips/corpus.py)
+TIPS_CORPUS_TTL_DAYS = int(os.getenv('TIPS_CORPUS_TTL_DAYS', 90))
+
+# Weather caching
+GEOCODE_CACHE_TTL = int(os.getenv('GEOCODE_CACHE_TTL', 60 * 60 * 24 * 30))  # Seconds a geocode result stays fresh
+GEOCODE_NEGATIVE_CACHE_TTL = int(os.getenv('GEOCODE_NEGATIVE_CACHE_TTL', 60 * 60))  # Seconds to remember "not found"
+GEOCODE_LRU_SIZE = int(os.getenv('GEOCODE_LRU_SIZE', 1024))  # In-process entries per worker
+GAZETTEER_ENABLED = os.getenv('GAZETTEER_ENABLED', 'True') == 'True'  # Answer well-known cities offline (weather/gazetteer.py)
+GAZETTEER_CSV = os.getenv('GAZETTEER_CSV')  # Cities CSV; defaults to weather/data/cities.csv
+GAZETTEER_INDEX_DIR = os.getenv('GAZETTEER_INDEX_DIR', BASE_DIR / 'var' / 'gazetteer')  # Compiled index
+FORECAST_GRID_PRECISION = float(os.getenv('FORECAST_GRID_PRECISION', 0.1))  # Degrees per forecast cache cell
+FORECAST_REFRESH_HOURS = int(os.getenv('FORECAST_REFRESH_HOURS', 3))  # OWM model update cycle
+FORECAST_REFRESH_DELAY = int(os.getenv('FORECAST_REFRESH_DELAY', 15 * 60))  # Seconds after a cycle before new data is published
+FORECAST_STALE_TTL = int(os.getenv('FORECAST_STALE_TTL', 24 * 60 * 60))  # How long a superseded forecast may still be served as stale
+FORECAST_HORIZON_DAYS = int(os.getenv('FORECAST_HORIZON_DAYS', 5))  # Trips starting later are described from climate normals
+CLIMATE_GRID_PRECISION = float(os.getenv('CLIMATE_GRID_PRECISION', 0.5))  # Degrees per climate normals cell
+CLIMATE_SEARCH_RADIUS = float(os.getenv('CLIMATE_SEARCH_RADIUS', 1.0))  # Degrees searched for the nearest cell with normals
+
+# Weather refresh and batch requests
+WEATHER_REFRESH_HORIZON_DAYS = int(os.getenv('WEATHER_REFRESH_HORIZON_DAYS', 5))  # refresh_weather warms trips departing this soon
+WEATHER_REFRESH_WORKERS = int(os.getenv('WEATHER_REFRESH_WORKERS', 4))  # Destinations refreshed concurrently
+WEATHER_FETCH_WORKERS = int(os.getenv('WEATHER_FETCH_WORKERS', 4))  # Concurrent destination fetches per batch request
+WEATHER_BATCH_MAX_TRIPS = int(os.getenv('WEATHER_BATCH_MAX_TRIPS', 50))  # Trips per batch weather request
+
 # Security settings for production
 SECURE_BROWSER_XSS_FILTER = True
 SECURE_CONTENT_TYPE_NOSNIFF = True
@@ -14,6 +14,7 @@ urlpatterns = [
     path('weather/', include("weather.urls")),
     path('tips/', include('tips.urls')),
     path('packing/', include('packing.urls', namespace='packing')),
+    path('jobs/', include('jobs.urls', namespace='jobs')),
 ]
 
 if settings.DEBUG:
@@ -1,3 +1,21 @@
 from django.contrib import admin
 
-# Register your models here.
+from .models import LLMCall, LLMCallRollup
+
+
+@admin.register(LLMCall)
+class LLMCallAdmin(admin.ModelAdmin):
+    list_display = ('created_at', 'feature', 'model', 'prompt_version', 'outcome', 'parse_outcome', 'latency_ms',
+                    'attempts', 'prompt_tokens', 'cached_tokens', 'completion_tokens', 'finish_reason', 'cost_usd')
+    list_filter = ('feature', 'model', 'prompt_version', 'outcome', 'parse_outcome', 'streamed')
+    date_hierarchy = 'created_at'
+
+
+@admin.register(LLMCallRollup)
+class LLMCallRollupAdmin(admin.ModelAdmin):
+    """Daily report per feature and model, built by `manage.py llm_rollup`."""
+    list_display = ('day', 'feature', 'model', 'prompt_version', 'calls', 'failures', 'cancelled', 'timeouts',
+                    'parse_failures', 'truncated', 'retries', 'latency_p50_ms', 'latency_p95_ms', 'latency_p99_ms',
+                    'prompt_tokens', 'cached_tokens', 'completion_tokens', 'max_completion_tokens', 'cost_usd')
+    list_filter = ('feature', 'model', 'prompt_version')
+    date_hierarchy = 'day'
@@ -0,0 +1,86 @@
+# api/async_views.py
+"""
+Async versions of the Google Places endpoints for ASGI deployments.
+
+They return the same JSON as the DRF views in api/views.py, but await the
+upstream calls through a shared httpx.AsyncClient instead of blocking a worker.
+Authentication and the user/anon rate limits are applied the same way (and
+share the same throttle history); whole-response caching is left to the
+service layer's caches, since cache_page doesn't wrap async views.
+"""
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.http import HttpResponseNotAllowed, JsonResponse
+from rest_framework.throttling import AnonRateThrottle, UserRateThrottle
+
+from .services.places import GooglePlacesService
+from .views import _format_autocomplete_suggestions, _format_place_results, _user_location
+
+
+def _check_access(request):
+    """
+    Applies the DRF defaults (IsAuthenticated, user/anon throttles).
+
+    Returns (location, None) or (None, error JsonResponse).
+    """
+    if not request.user.is_authenticated:
+        return None, JsonResponse({'detail': 'Authentication credentials were not provided.'}, status=403)
+    for throttle in (UserRateThrottle(), AnonRateThrottle()):
+        if not throttle.allow_request(request, None):
+            return None, JsonResponse({'detail': 'Request was throttled.'}, status=429)
+    return _user_location(request), None
+
+
+async def _prepare(request):
+    if request.method != 'GET':
+        return None, HttpResponseNotAllowed(['GET'])
+    # Session, user and throttle lookups hit the database/cache synchronously
+    return await sync_to_async(_check_access)(request)
+
+
+async def place_search(request):
+    location, error_response = await _prepare(request)
+    if error_response:
+        return error_response
+
+    query = request.GET.get('q')
+    if not query:
+        return JsonResponse({'results': []})
+
+    try:
+        data = await GooglePlacesService.asearch_places(query, location)
+        return JsonResponse({'results': _format_place_results(data)})
+    except Exception as e:
+        return JsonResponse({'error': str(e)}, status=500)
+
+
+async def place_autocomplete(request):
+    location, error_response = await _prepare(request)
+    if error_response:
+        return error_response
+
+    query = request.GET.get('q')
+    if not query or len(query) < 2:
+        return JsonResponse({'suggestions': []})
+
+    try:
+        if not settings.GOOGLE_API_KEY:
+            return JsonResponse({'error': 'API key not configured'}, status=500)
+
+        data = await GooglePlacesService.aautocomplete(query, location)
+        return JsonResponse({'suggestions': _format_autocomplete_suggestions(data)})
+    except Exception as e:
+        return JsonResponse({'error': str(e)}, status=500)
+
+
+async def place_details(request, place_id):
+    _, error_response = await _prepare(request)
+    if error_response:
+        return error_response
+
+    try:
+        data = await GooglePlacesService.aget_place_details(place_id)
+        return JsonResponse(data)
+    except Exception as e:
+        return JsonResponse({'error': str(e)}, status=500)
@@ -0,0 +1,29 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from api.services import telemetry
+
+
+class Command(BaseCommand):
+    help = "Aggregates LLM call telemetry into daily reports and prunes old raw calls."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=2,
+                            help="Days to (re)build, counting back from today (default: 2).")
+        parser.add_argument('--keep-days', type=int, default=None,
+                            help="Delete raw calls older than this (default: LLM_TELEMETRY_RETENTION_DAYS).")
+
+    def handle(self, *args, **options):
+        today = timezone.localdate()
+        for offset in range(options['days'] - 1, -1, -1):
+            day = today - timedelta(days=offset)
+            groups = telemetry.rollup(day)
+            self.stdout.write(f"{day}: {groups} feature/model report(s).")
+
+        keep_days = options['keep_days'] if options['keep_days'] is not None else getattr(settings, 'LLM_TELEMETRY_RETENTION_DAYS', 30)
+        # Only prune days that have already been rolled up
+        deleted = telemetry.prune(max(keep_days, options['days']))
+        self.stdout.write(f"Pruned {deleted} raw call(s).")
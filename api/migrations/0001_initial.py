@@ -0,0 +1,67 @@
+# Generated by Django 4.2.24 on 2026-10-18 21:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LLMCall',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True, db_index=True)),
+                ('feature', models.CharField(max_length=32)),
+                ('model', models.CharField(max_length=100)),
+                ('streamed', models.BooleanField(default=False)),
+                ('outcome', models.CharField(choices=[('ok', 'OK'), ('timeout', 'Timeout'), ('rate_limited', 'Rate limited'), ('http_error', 'HTTP error'), ('connection_error', 'Connection error'), ('error', 'Other error')], default='ok', max_length=16)),
+                ('parse_outcome', models.CharField(blank=True, choices=[('', 'Not parsed'), ('ok', 'Parsed'), ('repaired', 'Parsed after repair'), ('failed', 'Failed')], max_length=8)),
+                ('finish_reason', models.CharField(blank=True, max_length=16)),
+                ('latency_ms', models.PositiveIntegerField()),
+                ('attempts', models.PositiveSmallIntegerField(default=1)),
+                ('max_tokens', models.PositiveIntegerField(blank=True, null=True)),
+                ('prompt_tokens', models.PositiveIntegerField(blank=True, null=True)),
+                ('completion_tokens', models.PositiveIntegerField(blank=True, null=True)),
+                ('cost_usd', models.DecimalField(blank=True, decimal_places=6, max_digits=10, null=True)),
+            ],
+            options={
+                'verbose_name': 'LLM call',
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.CreateModel(
+            name='LLMCallRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('feature', models.CharField(max_length=32)),
+                ('model', models.CharField(max_length=100)),
+                ('calls', models.PositiveIntegerField()),
+                ('failures', models.PositiveIntegerField()),
+                ('timeouts', models.PositiveIntegerField()),
+                ('parse_failures', models.PositiveIntegerField()),
+                ('truncated', models.PositiveIntegerField()),
+                ('retries', models.PositiveIntegerField()),
+                ('latency_p50_ms', models.PositiveIntegerField()),
+                ('latency_p95_ms', models.PositiveIntegerField()),
+                ('latency_p99_ms', models.PositiveIntegerField()),
+                ('prompt_tokens', models.PositiveBigIntegerField()),
+                ('completion_tokens', models.PositiveBigIntegerField()),
+                ('max_completion_tokens', models.PositiveIntegerField()),
+                ('cost_usd', models.DecimalField(decimal_places=6, max_digits=12)),
+            ],
+            options={
+                'verbose_name': 'LLM daily report',
+                'ordering': ['-day', 'feature', 'model'],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='llmcallrollup',
+            constraint=models.UniqueConstraint(fields=('day', 'feature', 'model'), name='unique_llm_rollup'),
+        ),
+    ]
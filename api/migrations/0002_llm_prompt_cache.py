@@ -0,0 +1,41 @@
+# Generated by Django 4.2.24 on 2026-10-18 21:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RemoveConstraint(
+            model_name='llmcallrollup',
+            name='unique_llm_rollup',
+        ),
+        migrations.AddField(
+            model_name='llmcall',
+            name='cached_tokens',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='llmcall',
+            name='prompt_version',
+            field=models.CharField(blank=True, max_length=16),
+        ),
+        migrations.AddField(
+            model_name='llmcallrollup',
+            name='cached_tokens',
+            field=models.PositiveBigIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='llmcallrollup',
+            name='prompt_version',
+            field=models.CharField(blank=True, max_length=16),
+        ),
+        migrations.AddConstraint(
+            model_name='llmcallrollup',
+            constraint=models.UniqueConstraint(fields=('day', 'feature', 'model', 'prompt_version'), name='unique_llm_rollup'),
+        ),
+    ]
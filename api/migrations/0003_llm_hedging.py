@@ -0,0 +1,23 @@
+# Generated by Django 4.2.24 on 2026-10-18 22:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0002_llm_prompt_cache'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='llmcallrollup',
+            name='cancelled',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AlterField(
+            model_name='llmcall',
+            name='outcome',
+            field=models.CharField(choices=[('ok', 'OK'), ('timeout', 'Timeout'), ('rate_limited', 'Rate limited'), ('http_error', 'HTTP error'), ('connection_error', 'Connection error'), ('error', 'Other error'), ('cancelled', 'Cancelled (hedged request won)')], default='ok', max_length=16),
+        ),
+    ]
@@ -1,3 +1,86 @@
 from django.db import models
 
-# Create your models here.
+
+class LLMCall(models.Model):
+    """One chat completion request to OpenRouter, recorded by api/services/telemetry.py."""
+    OUTCOME_CHOICES = [
+        ('ok', 'OK'),
+        ('timeout', 'Timeout'),
+        ('rate_limited', 'Rate limited'),
+        ('http_error', 'HTTP error'),
+        ('connection_error', 'Connection error'),
+        ('error', 'Other error'),
+        ('cancelled', 'Cancelled (hedged request won)'),
+    ]
+    PARSE_CHOICES = [
+        ('', 'Not parsed'),
+        ('ok', 'Parsed'),
+        ('repaired', 'Parsed after repair'),
+        ('failed', 'Failed'),
+    ]
+
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+    feature = models.CharField(max_length=32)  # e.g. packing_list, travel_tips, chat
+    model = models.CharField(max_length=100)
+    streamed = models.BooleanField(default=False)
+    prompt_version = models.CharField(max_length=16, blank=True)  # See api/services/prompts.py
+    outcome = models.CharField(max_length=16, choices=OUTCOME_CHOICES, default='ok')
+    parse_outcome = models.CharField(max_length=8, choices=PARSE_CHOICES, blank=True)
+    finish_reason = models.CharField(max_length=16, blank=True)  # 'length' means max_tokens cut the reply
+    latency_ms = models.PositiveIntegerField()
+    attempts = models.PositiveSmallIntegerField(default=1)  # HTTP requests made, including client retries
+    max_tokens = models.PositiveIntegerField(null=True, blank=True)
+    prompt_tokens = models.PositiveIntegerField(null=True, blank=True)
+    completion_tokens = models.PositiveIntegerField(null=True, blank=True)
+    cached_tokens = models.PositiveIntegerField(null=True, blank=True)  # Prompt tokens read from the provider's cache
+    cost_usd = models.DecimalField(max_digits=10, decimal_places=6, null=True, blank=True)  # Estimated from LLM_PRICES
+
+    class Meta:
+        ordering = ['-created_at']
+        verbose_name = "LLM call"
+
+    def __str__(self):
+        return f"{self.feature} via {self.model} ({self.outcome}, {self.latency_ms} ms)"
+
+
+class LLMCallRollup(models.Model):
+    """Daily aggregate of LLMCall rows per feature, model and prompt version, built by `manage.py llm_rollup`."""
+    day = models.DateField()
+    feature = models.CharField(max_length=32)
+    model = models.CharField(max_length=100)
+    prompt_version = models.CharField(max_length=16, blank=True)
+    calls = models.PositiveIntegerField()
+    failures = models.PositiveIntegerField()  # Outcome other than ok or cancelled
+    cancelled = models.PositiveIntegerField(default=0)  # Attempts abandoned for a faster hedged one
+    timeouts = models.PositiveIntegerField()
+    parse_failures = models.PositiveIntegerField()
+    truncated = models.PositiveIntegerField()  # Stopped by max_tokens
+    retries = models.PositiveIntegerField()
+    latency_p50_ms = models.PositiveIntegerField()
+    latency_p95_ms = models.PositiveIntegerField()
+    latency_p99_ms = models.PositiveIntegerField()
+    prompt_tokens = models.PositiveBigIntegerField()
+    completion_tokens = models.PositiveBigIntegerField()
+    cached_tokens = models.PositiveBigIntegerField(default=0)
+    max_completion_tokens = models.PositiveIntegerField()  # Largest reply seen; compare with max_tokens
+    cost_usd = models.DecimalField(max_digits=12, decimal_places=6)
+
+    class Meta:
+        ordering = ['-day', 'feature', 'model']
+        verbose_name = "LLM daily report"
+        constraints = [
+            models.UniqueConstraint(fields=['day', 'feature', 'model', 'prompt_version'], name='unique_llm_rollup'),
+        ]
+
+    def __str__(self):
+        version = f" v{self.prompt_version}" if self.prompt_version else ""
+        return f"{self.day} {self.feature}{version} via {self.model}: {self.calls} calls"
+
+
+class ServiceCounter(models.Model):
+    """A counter shared by all workers, e.g. packing list cache hits; incremented with an F() update."""
+    name = models.CharField(max_length=100, unique=True)
+    value = models.PositiveBigIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.name}: {self.value}"
@@ -0,0 +1,62 @@
+# api/services/async_http.py
+"""
+Shared outbound HTTP client for async views.
+
+The async counterpart of http_client: one pooled httpx.AsyncClient per event
+loop, so an ASGI worker can hold many in-flight upstream calls on a handful of
+keep-alive connections. Timeouts and pool sizes come from the same
+OUTBOUND_HTTP settings. Connection failures are retried by the transport;
+unlike http_client, HTTP 429/5xx responses are not retried. Clients live as
+long as their event loop; Django's ASGI handler has no lifespan shutdown to
+close them earlier.
+"""
+
+import asyncio
+import logging
+import threading
+import weakref
+
+import httpx
+
+from .http_client import _option
+
+logger = logging.getLogger(__name__)
+
+# AsyncClient is bound to the loop it was first used on, so keep one per loop
+_clients = weakref.WeakKeyDictionary()
+_lock = threading.Lock()
+
+
+def _build_client():
+    connect, read = _option('CONNECT_TIMEOUT'), _option('READ_TIMEOUT')
+    pool_size = _option('POOL_MAXSIZE')
+    transport = httpx.AsyncHTTPTransport(
+        retries=_option('RETRIES'),  # Connection errors only
+        limits=httpx.Limits(max_connections=pool_size * 10, max_keepalive_connections=pool_size),
+    )
+    return httpx.AsyncClient(
+        transport=transport,
+        timeout=httpx.Timeout(read, connect=connect),
+    )
+
+
+def get_client():
+    """Returns the pooled AsyncClient for the running event loop."""
+    loop = asyncio.get_running_loop()
+    with _lock:
+        client = _clients.get(loop)
+        if client is None or client.is_closed:
+            client = _clients[loop] = _build_client()
+        return client
+
+
+async def request(method, url, **kwargs):
+    return await get_client().request(method, url, **kwargs)
+
+
+async def get(url, **kwargs):
+    return await request('GET', url, **kwargs)
+
+
+async def post(url, **kwargs):
+    return await request('POST', url, **kwargs)
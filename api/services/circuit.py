@@ -0,0 +1,177 @@
+# api/services/circuit.py
+"""
+Per-upstream circuit breakers.
+
+Each breaker watches the outcome of recent calls to one upstream (Radar, OWM,
+...). When too many of them fail or are slow, the circuit opens and callers
+fail fast instead of waiting out the HTTP timeout. After a cool-down the
+circuit goes half-open and lets a few probe calls through; if they succeed it
+closes again, otherwise it re-opens.
+
+State is per process: each gunicorn worker trips its own breakers after a
+handful of failures, which needs no coordination and no shared storage.
+"""
+
+import logging
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+CLOSED, OPEN, HALF_OPEN = 'closed', 'open', 'half_open'
+
+DEFAULTS = {
+    'WINDOW': 20,               # Recent calls considered
+    'MIN_CALLS': 5,             # Don't judge the error rate on fewer calls than this
+    'FAILURE_RATE': 0.5,        # Open when this share of the window failed or was slow
+    'SLOW_CALL_SECONDS': 5.0,   # Calls slower than this count as failures
+    'OPEN_SECONDS': 30,         # Cool-down before probing again
+    'HALF_OPEN_PROBES': 2,      # Successful probes needed to close
+}
+
+_breakers = {}
+_breakers_lock = threading.Lock()
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling an upstream whose circuit is open."""
+
+
+def _counts_as_failure(exc):
+    # Client errors (bad key, bad query) say nothing about the upstream's health
+    status = getattr(getattr(exc, 'response', None), 'status_code', None)
+    if status is not None:
+        return status >= 500 or status == 429
+    return True
+
+
+class CircuitBreaker:
+    def __init__(self, name, window, min_calls, failure_rate, slow_call_seconds, open_seconds, half_open_probes):
+        self.name = name
+        self.min_calls = min_calls
+        self.failure_rate = failure_rate
+        self.slow_call_seconds = slow_call_seconds
+        self.open_seconds = open_seconds
+        self.half_open_probes = half_open_probes
+        self._outcomes = deque(maxlen=window)  # True = failure
+        self._state = CLOSED
+        self._opened_at = 0.0
+        self._probes_in_flight = 0
+        self._probe_successes = 0
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        with self._lock:
+            return self._current_state()
+
+    def _current_state(self):
+        if self._state == OPEN and time.monotonic() - self._opened_at >= self.open_seconds:
+            self._state = HALF_OPEN
+            self._probes_in_flight = 0
+            self._probe_successes = 0
+        return self._state
+
+    def allow(self):
+        """Whether a call may go to the upstream right now."""
+        with self._lock:
+            state = self._current_state()
+            if state == CLOSED:
+                return True
+            if state == HALF_OPEN and self._probes_in_flight < self.half_open_probes:
+                self._probes_in_flight += 1
+                return True
+            return False
+
+    def record(self, failed):
+        with self._lock:
+            state = self._current_state()
+            if state == HALF_OPEN:
+                self._probes_in_flight = max(0, self._probes_in_flight - 1)
+                if failed:
+                    self._trip()
+                else:
+                    self._probe_successes += 1
+                    if self._probe_successes >= self.half_open_probes:
+                        logger.info(f"Circuit '{self.name}' closed after successful probes.")
+                        self._state = CLOSED
+                        self._outcomes.clear()
+                return
+
+            self._outcomes.append(failed)
+            if state == CLOSED and len(self._outcomes) >= self.min_calls:
+                failures = sum(self._outcomes)
+                if failures / len(self._outcomes) >= self.failure_rate:
+                    self._trip()
+
+    def release(self):
+        """Frees a half-open probe slot taken by allow() without recording an outcome."""
+        with self._lock:
+            if self._current_state() == HALF_OPEN:
+                self._probes_in_flight = max(0, self._probes_in_flight - 1)
+
+    def _trip(self):
+        logger.warning(f"Circuit '{self.name}' opened; failing fast for {self.open_seconds}s.")
+        self._state = OPEN
+        self._opened_at = time.monotonic()
+        self._outcomes.clear()
+
+    @contextmanager
+    def guard(self):
+        """
+        Wraps one upstream call: raises CircuitOpenError if the circuit is open,
+        otherwise records whether the call failed (or was slower than
+        SLOW_CALL_SECONDS) when the block exits.
+        """
+        if not self.allow():
+            raise CircuitOpenError(f"{self.name} is temporarily unavailable")
+        started = time.monotonic()
+        try:
+            yield
+        except Exception as e:
+            self.record(_counts_as_failure(e))
+            raise
+        except BaseException:
+            self.release()  # Cancelled (asyncio.CancelledError) or interrupted: no verdict on the upstream
+            raise
+        self.record(time.monotonic() - started > self.slow_call_seconds)
+
+    def reset(self):
+        with self._lock:
+            self._state = CLOSED
+            self._outcomes.clear()
+
+
+def get(name):
+    """Returns the breaker for an upstream, configured from CIRCUIT_BREAKERS[name]."""
+    with _breakers_lock:
+        breaker = _breakers.get(name)
+        if breaker is None:
+            options = {**DEFAULTS, **getattr(settings, 'CIRCUIT_BREAKERS', {}).get(name, {})}
+            breaker = _breakers[name] = CircuitBreaker(
+                name,
+                window=options['WINDOW'],
+                min_calls=options['MIN_CALLS'],
+                failure_rate=options['FAILURE_RATE'],
+                slow_call_seconds=options['SLOW_CALL_SECONDS'],
+                open_seconds=options['OPEN_SECONDS'],
+                half_open_probes=options['HALF_OPEN_PROBES'],
+            )
+        return breaker
+
+
+def states():
+    """Current state of every breaker, keyed by upstream name."""
+    with _breakers_lock:
+        breakers = list(_breakers.values())
+    return {breaker.name: breaker.state for breaker in breakers}
+
+
+def reset_all():
+    """Forgets every breaker (tests, or after changing CIRCUIT_BREAKERS)."""
+    with _breakers_lock:
+        _breakers.clear()
@@ -0,0 +1,189 @@
+# api/services/hedging.py
+"""
+Hedged requests over a chain of models.
+
+A generation normally goes to OPENROUTER_MODEL. With fallback models
+configured (LLM_HEDGING['FALLBACK_MODELS']), first_valid() starts the first
+model and, if it has produced nothing usable once the call has run longer
+than most recent calls (the PERCENTILE of the feature's recorded latencies,
+see telemetry), also starts the next model in the chain. It starts the next
+model at once if an attempt fails or returns an invalid result. The first
+valid result wins and the other attempts are cancelled: an attempt registers
+a closer for its streamed response with the cancel event (CancelEvent.on_set),
+so the losing connection is closed from the winning side even while the
+attempt is blocked waiting for the next chunk.
+
+Each call runs its attempts on its own short-lived threads, so a call never
+queues behind another call's stalled attempts. A chain of one model runs on
+the calling thread, as before.
+"""
+
+import logging
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from django.conf import settings
+from django.db import connection
+
+from . import telemetry
+
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {
+    'FALLBACK_MODELS': [],       # Tried after OPENROUTER_MODEL, in order
+    'PERCENTILE': 0.9,           # Hedge once an attempt has run longer than this share of recent calls
+    'MIN_DELAY': 2.0,            # Seconds; bounds on the hedge delay
+    'MAX_DELAY': 30.0,
+    'DEFAULT_DELAY': 10.0,       # Until MIN_SAMPLES successful calls have been recorded
+    'MIN_SAMPLES': 20,
+    'SAMPLE_SIZE': 200,          # Recent successful calls the percentile is taken over
+    'DELAY_TTL': 60,             # Seconds a computed delay is reused
+}
+
+_delays = {}
+
+
+class Cancelled(Exception):
+    """Raised by an attempt that stopped because another attempt won."""
+
+
+class CancelEvent:
+    """
+    A threading.Event-like flag that also runs the callbacks registered with
+    on_set() when it is set, from the thread that sets it.
+    """
+
+    def __init__(self):
+        self._event = threading.Event()
+        self._lock = threading.Lock()
+        self._callbacks = []
+
+    def is_set(self):
+        return self._event.is_set()
+
+    def wait(self, timeout=None):
+        return self._event.wait(timeout)
+
+    def set(self):
+        with self._lock:
+            if self._event.is_set():
+                return
+            self._event.set()
+            callbacks, self._callbacks = self._callbacks, []
+        for callback in callbacks:
+            try:
+                callback()
+            except Exception as e:
+                logger.debug(f"Cancel callback {callback!r} failed: {e}")
+
+    def on_set(self, callback):
+        """Calls callback() when the event is set, or right away if it already is."""
+        with self._lock:
+            if not self._event.is_set():
+                self._callbacks.append(callback)
+                return
+        callback()
+
+
+def option(name):
+    return getattr(settings, 'LLM_HEDGING', {}).get(name, DEFAULTS[name])
+
+
+def model_chain(primary):
+    """The primary model followed by the configured fallback models."""
+    return [primary] + [model for model in option('FALLBACK_MODELS') if model and model != primary]
+
+
+def hedge_delay(feature, model):
+    """Seconds to wait for an attempt with the model before hedging it."""
+    key = (feature, model)
+    now = time.monotonic()
+    cached = _delays.get(key)
+    if cached is not None and cached[0] > now:
+        return cached[1]
+
+    delay = option('DEFAULT_DELAY')
+    try:
+        latencies = telemetry.recent_latencies(feature, model, option('SAMPLE_SIZE'))
+        if len(latencies) >= option('MIN_SAMPLES'):
+            delay = telemetry.percentile(sorted(latencies), option('PERCENTILE')) / 1000
+    except Exception as e:
+        logger.warning(f"Could not read recent {feature} latencies for {model}: {e}")
+    delay = min(max(delay, option('MIN_DELAY')), option('MAX_DELAY'))
+    _delays[key] = (now + option('DELAY_TTL'), delay)
+    return delay
+
+
+def _run(attempt, model, cancel):
+    try:
+        return attempt(model, cancel)
+    finally:
+        connection.close()  # Attempt threads have their own connections
+
+
+def first_valid(feature, models, attempt, is_valid):
+    """
+    Calls attempt(model, cancel_event) for the models in turn, hedging slow
+    attempts as described above, and returns (result, model) for the first
+    result for which is_valid(result) is true. Attempts should raise Cancelled
+    soon after cancel_event (a CancelEvent) is set, and register a closer for
+    any blocking response with cancel_event.on_set().
+
+    If no attempt succeeds, returns the last invalid result with its model, or
+    re-raises the last exception if every attempt raised.
+    """
+    if len(models) == 1:
+        return attempt(models[0], CancelEvent()), models[0]
+
+    # One thread per model at most; losers are closed on cancel and exit on their own
+    executor = ThreadPoolExecutor(max_workers=len(models), thread_name_prefix='llm-hedge')
+    remaining = list(models)
+    pending = {}
+    started = time.monotonic()
+    deadline = None
+    last_result = last_model = last_error = None
+    have_result = False
+
+    def start():
+        nonlocal deadline
+        model = remaining.pop(0)
+        cancel = CancelEvent()
+        pending[executor.submit(_run, attempt, model, cancel)] = (model, cancel)
+        deadline = time.monotonic() + hedge_delay(feature, model)
+
+    start()
+    try:
+        while pending:
+            timeout = max(deadline - time.monotonic(), 0) if remaining else None
+            done, _ = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+            if not done:
+                logger.info(f"{feature} via {', '.join(model for model, _ in pending.values())} still running "
+                            f"after {time.monotonic() - started:.1f}s; hedging with {remaining[0]}")
+                start()
+                continue
+
+            for future in done:
+                model, _ = pending.pop(future)
+                try:
+                    result = future.result()
+                except Exception as e:
+                    logger.warning(f"{feature} attempt with {model} failed: {e}")
+                    last_error = e
+                    continue
+                if is_valid(result):
+                    if model != models[0]:
+                        logger.info(f"{feature} answered by {model} after {time.monotonic() - started:.1f}s")
+                    return result, model
+                logger.warning(f"{feature} attempt with {model} returned an invalid result")
+                last_result, last_model, have_result = result, model, True
+            if remaining:
+                start()  # Don't wait out the delay after a failure
+    finally:
+        for _, cancel in pending.values():
+            cancel.set()
+        executor.shutdown(wait=False)
+
+    if have_result:
+        return last_result, last_model
+    raise last_error
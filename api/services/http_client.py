@@ -0,0 +1,140 @@
+# api/services/http_client.py
+"""
+Shared outbound HTTP client.
+
+Every external call (Radar, OpenWeatherMap, Google Places) goes
+through a per-host requests.Session so TCP/TLS connections are kept alive and
+reused between requests. Calls always carry connect/read timeouts, and
+idempotent requests are retried with exponential backoff on connection errors
+and 429/5xx responses. Read timeouts are not retried: a call never waits much
+longer than one READ_TIMEOUT, which keeps sync workers and the circuit
+breakers failing fast.
+
+Sessions are per process: after a fork (gunicorn workers) the pools are
+rebuilt rather than shared with the parent.
+"""
+
+import logging
+import os
+import threading
+from urllib.parse import urlsplit
+
+import requests
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {
+    'CONNECT_TIMEOUT': 3.05,   # Seconds to establish the TCP/TLS connection
+    'READ_TIMEOUT': 10,        # Seconds to wait for response data
+    'POOL_MAXSIZE': 10,        # Keep-alive connections per host
+    'RETRIES': 2,
+    'BACKOFF_FACTOR': 0.3,     # 0.3s, 0.6s, ... between retries
+}
+
+# Upstreams whose connections are opened when a worker starts
+WARMUP_URLS = [
+    'https://api.radar.io/',
+    'https://api.openweathermap.org/',
+    'https://places.googleapis.com/',
+    'https://maps.googleapis.com/',
+]  # OpenRouter is called through llm.py's httpx pool, warmed by llm.warmup()
+
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+_sessions = {}
+_lock = threading.Lock()
+_pid = os.getpid()
+
+
+def _option(name):
+    return getattr(settings, 'OUTBOUND_HTTP', {}).get(name, DEFAULTS[name])
+
+
+def default_timeout():
+    """Returns the (connect, read) timeout applied when a caller doesn't pass one."""
+    return _option('CONNECT_TIMEOUT'), _option('READ_TIMEOUT')
+
+
+def _build_session():
+    retry = Retry(
+        total=_option('RETRIES'),
+        connect=_option('RETRIES'),
+        read=0,  # A read timeout already cost READ_TIMEOUT; don't wait it out again
+        status=_option('RETRIES'),
+        backoff_factor=_option('BACKOFF_FACTOR'),
+        status_forcelist=RETRY_STATUSES,
+        allowed_methods=frozenset({'GET', 'HEAD', 'OPTIONS'}),  # Never replay POSTs
+        respect_retry_after_header=True,
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=_option('POOL_MAXSIZE'), max_retries=retry)
+    session = requests.Session()
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
+
+
+def get_session(url):
+    """Returns the pooled session for the URL's host, creating it on first use."""
+    global _pid
+    host = urlsplit(url).netloc
+    with _lock:
+        if os.getpid() != _pid:
+            # Forked since the pools were built; the parent's sockets aren't ours to reuse
+            _sessions.clear()
+            _pid = os.getpid()
+        session = _sessions.get(host)
+        if session is None:
+            session = _sessions[host] = _build_session()
+        return session
+
+
+def request(method, url, timeout=None, **kwargs):
+    """Sends a request through the host's pooled session with a mandatory timeout."""
+    if timeout is None:
+        timeout = default_timeout()
+    return get_session(url).request(method, url, timeout=timeout, **kwargs)
+
+
+def get(url, **kwargs):
+    return request('GET', url, **kwargs)
+
+
+def post(url, **kwargs):
+    return request('POST', url, **kwargs)
+
+
+def reset():
+    """Closes and forgets every pooled session (e.g. right after a fork)."""
+    global _pid
+    with _lock:
+        sessions = list(_sessions.values())
+        _sessions.clear()
+        _pid = os.getpid()
+    for session in sessions:
+        session.close()
+
+
+def warmup(urls=None, background=True):
+    """
+    Pre-establishes keep-alive connections to the upstream hosts.
+
+    Runs in a daemon thread by default so a worker can start serving while the
+    handshakes complete. Failures are logged and otherwise ignored.
+    """
+    urls = list(urls or WARMUP_URLS)
+
+    def _warm():
+        for url in urls:
+            try:
+                request('HEAD', url, timeout=(_option('CONNECT_TIMEOUT'), 2), allow_redirects=False)
+            except requests.exceptions.RequestException as e:
+                logger.info(f"Connection warmup to {url} failed: {e}")
+
+    if background:
+        threading.Thread(target=_warm, name='http-warmup', daemon=True).start()
+    else:
+        _warm()
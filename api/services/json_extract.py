@@ -0,0 +1,153 @@
+# api/services/json_extract.py
+"""
+Extraction of the JSON object from an LLM reply, with repair of common defects.
+
+Models wrap the object in ```json fences or a sentence of preamble, copy the
+// comments from the prompt's example, leave trailing commas, and stop mid-list
+when max_tokens is reached. extract_object() finds the outermost object in a
+single left-to-right scan that understands strings and escapes (so braces
+inside values don't confuse it), dropping comments and trailing commas on the
+way. If the text ends before the object closes, the incomplete last element is
+cut off and the open arrays and objects are closed, so a truncated packing list
+keeps the items it did finish instead of forcing a regeneration.
+
+The scan jumps between structural characters and over whole strings with
+compiled regexes, so it is linear in the length of the reply. A reply whose
+first '{' to last '}' is already valid JSON is parsed directly without
+scanning.
+
+See benchmarks/json_extraction.py for a comparison with the regex extraction
+it replaced.
+"""
+
+import json
+import re
+
+# Characters that matter outside strings; everything between them is copied as-is
+_STRUCTURAL = re.compile(r'["{}\[\],/]')
+# Rest of a string after its opening quote, up to and including the closing one
+_STRING_REST = re.compile(r'[^"\\]*(?:\\.[^"\\]*)*"', re.DOTALL)
+_CLOSERS = {'{': '}', '[': ']'}
+
+
+def _closers(stack):
+    return ''.join(_CLOSERS[opener] for opener in reversed(stack))
+
+
+def _strip_trailing_comma(text):
+    text = text.rstrip()
+    return text[:-1] if text.endswith(',') else text
+
+
+def _scan(text, start):
+    """
+    Copies the object starting at text[start] ('{'), minus comments and trailing
+    commas. Returns (pieces, repairs, state), where state is None if the object
+    closed, else (in_string, stack, safe_pieces, safe_stack): the open containers
+    and the last point at which cutting the text leaves only complete values.
+    """
+    pieces = []
+    repairs = set()
+    stack = []
+    in_string = False
+    last_comma = None          # Index in pieces of a ',' not yet followed by a value
+    safe = (0, ())
+    pos, end = start, len(text)
+
+    while pos < end:
+        match = _STRUCTURAL.search(text, pos)
+        if match is None:
+            pieces.append(text[pos:])
+            break
+        gap = text[pos:match.start()]
+        if gap:
+            pieces.append(gap)
+            if not gap.isspace():
+                last_comma = None
+        char = match.group()
+        pos = match.end()
+
+        if char == '"':
+            last_comma = None
+            string_end = _STRING_REST.match(text, pos)
+            if string_end is None:  # Cut off inside the string
+                pieces.append(text[match.start():])
+                in_string = True
+                break
+            pieces.append(text[match.start():string_end.end()])
+            pos = string_end.end()
+        elif char in '{[':
+            stack.append(char)
+            last_comma = None
+            pieces.append(char)
+            if len(stack) == 1:  # Cutting after a nested opener would leave an empty item behind
+                safe = (len(pieces), tuple(stack))
+        elif char in '}]':
+            if last_comma is not None:
+                pieces[last_comma] = ''
+                repairs.add('trailing_comma')
+                last_comma = None
+            if stack:
+                pieces.append(_CLOSERS[stack.pop()])
+            if not stack:
+                return pieces, repairs, None
+            safe = (len(pieces), tuple(stack))
+        elif char == ',':
+            safe = (len(pieces), tuple(stack))
+            last_comma = len(pieces)
+            pieces.append(char)
+        elif text.startswith('/', pos):
+            newline = text.find('\n', pos)
+            pos = end if newline == -1 else newline
+            repairs.add('comment')
+        elif text.startswith('*', pos):
+            close = text.find('*/', pos + 1)
+            pos = end if close == -1 else close + 2
+            repairs.add('comment')
+        else:
+            pieces.append(char)
+
+    return pieces, repairs, (in_string, stack, safe[0], safe[1])
+
+
+def extract_object(text):
+    """
+    Returns (data, json_text, repairs) for the outermost JSON object in an LLM
+    reply: the parsed dict, its (repaired) JSON text and a sorted tuple of the
+    repairs applied ('comment', 'trailing_comma', 'truncated'), empty if none.
+
+    Raises:
+        json.JSONDecodeError: If the reply holds no object, or it can't be
+            parsed even after repair.
+    """
+    text = text or ''
+    start = text.find('{')
+    if start == -1:
+        raise json.JSONDecodeError("No JSON object found", text, 0)
+    # Most replies are an intact object, perhaps fenced: let the C parser try first
+    candidate = text[start:text.rfind('}') + 1]
+    try:
+        data = json.loads(candidate)
+        if isinstance(data, dict):
+            return data, candidate, ()
+    except ValueError:
+        pass  # Scan it, which can also repair it
+    pieces, repairs, state = _scan(text, start)
+    if state is None:
+        json_text = ''.join(pieces)
+        return json.loads(json_text), json_text, tuple(sorted(repairs))
+
+    # Truncated: first try closing what is open, then fall back to the last complete element
+    in_string, stack, safe_pieces, safe_stack = state
+    repairs.add('truncated')
+    candidates = []
+    if not in_string:
+        candidates.append(_strip_trailing_comma(''.join(pieces)) + _closers(stack))
+    candidates.append(_strip_trailing_comma(''.join(pieces[:safe_pieces])) + _closers(safe_stack))
+    for json_text in candidates[:-1]:
+        try:
+            return json.loads(json_text), json_text, tuple(sorted(repairs))
+        except ValueError:
+            pass
+    json_text = candidates[-1]
+    return json.loads(json_text), json_text, tuple(sorted(repairs))
@@ -0,0 +1,144 @@
+# api/services/json_stream.py
+"""
+Incremental parsing of a streamed packing list completion.
+
+The model writes {"categories": [{"name": ..., "items": [{...}, ...]}, ...]}
+a few characters at a time. PackingItemParser scans the text as it arrives,
+tracking just enough JSON structure (nesting, strings, object keys) to spot
+when an object inside a category's "items" array closes, and parses that
+object on its own. Items can therefore be saved and shown while the rest of
+the list is still being generated.
+
+Text before the first '{' (a ```json fence or a preamble) is skipped.
+"""
+
+import json
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Container path (key that opened each container) at which item objects live
+_ITEM_PATH = ('categories', None, 'items')
+
+
+class _Container:
+    __slots__ = ('kind', 'key', 'expect_key', 'pending_key', 'values')
+
+    def __init__(self, kind, key):
+        self.kind = kind            # '{' or '['
+        self.key = key              # Key this container is the value of (None inside arrays)
+        self.expect_key = kind == '{'
+        self.pending_key = None     # Last key read in this object
+        self.values = {}            # Scalar string values read in this object, by key
+
+
+class PackingItemParser:
+    """
+    Feed completion text with feed(); each call returns the (category_name,
+    item_dict) pairs completed by that text, in order.
+    """
+
+    def __init__(self):
+        self._text = []             # Characters of the object currently being captured
+        self._capturing = False
+        self._stack = []
+        self._started = False
+        self._in_string = False
+        self._escape = False
+        self._string = []
+        self.items_parsed = 0
+        self.items_skipped = 0
+
+    def feed(self, chunk):
+        completed = []
+        for char in chunk:
+            if not self._started:
+                if char != '{':
+                    continue
+                self._started = True
+            if self._capturing:
+                self._text.append(char)
+
+            if self._in_string:
+                self._read_string_char(char)
+                continue
+
+            if char == '"':
+                self._in_string = True
+                self._string = []
+            elif char in '{[':
+                self._open(char)
+            elif char in '}]':
+                item = self._close()
+                if item is not None:
+                    completed.append(item)
+            elif char == ':':
+                if self._stack:
+                    self._stack[-1].expect_key = False
+            elif char == ',':
+                if self._stack and self._stack[-1].kind == '{':
+                    self._stack[-1].expect_key = True
+        return completed
+
+    def _read_string_char(self, char):
+        if self._escape:
+            self._escape = False
+            self._string.append('\\' + char)
+        elif char == '\\':
+            self._escape = True
+        elif char == '"':
+            self._in_string = False
+            self._string_done(''.join(self._string))
+        else:
+            self._string.append(char)
+
+    def _string_done(self, raw):
+        if not self._stack:
+            return
+        container = self._stack[-1]
+        if container.kind != '{':
+            return
+        try:
+            value = json.loads(f'"{raw}"')
+        except ValueError:
+            value = raw
+        if container.expect_key:
+            container.pending_key = value
+        else:
+            container.values[container.pending_key] = value
+
+    def _path(self):
+        return tuple(container.key for container in self._stack[1:])
+
+    def _open(self, char):
+        key = None
+        if self._stack and self._stack[-1].kind == '{':
+            key = self._stack[-1].pending_key
+        self._stack.append(_Container(char, key))
+        if char == '{' and not self._capturing and self._path()[:-1] == _ITEM_PATH:
+            self._capturing = True
+            self._text = ['{']
+
+    def _close(self):
+        if not self._stack:
+            return None
+        is_item = self._capturing and self._stack[-1].kind == '{' and self._path()[:-1] == _ITEM_PATH
+        self._stack.pop()
+        if not is_item:
+            return None
+
+        self._capturing = False
+        raw = ''.join(self._text)
+        self._text = []
+        try:
+            item = json.loads(raw)
+        except ValueError as e:
+            self.items_skipped += 1
+            logger.warning(f"Skipping unparsable streamed packing item ({e}): {raw[:200]}")
+            return None
+        if not isinstance(item, dict):
+            self.items_skipped += 1
+            return None
+        self.items_parsed += 1
+        category = self._stack[-2].values.get('name') if len(self._stack) >= 2 else None
+        return category or 'Miscellaneous', item
@@ -0,0 +1,160 @@
+# api/services/llm.py
+"""
+Shared OpenAI-compatible (OpenRouter) clients.
+
+Building an OpenAI client per call means a fresh connection pool, and so a
+new TCP/TLS handshake, for every AI request. Instead each process keeps one
+pooled HTTP client per base URL and one OpenAI client per (base URL, API key)
+on top of it, created on first use. Timeouts, pool sizes and retries come from
+the LLM_CLIENT setting. Interactive calls, where a user waits on the reply,
+get their own clients with INTERACTIVE_MAX_RETRIES (default none): a retried
+30s chat timeout would otherwise keep them waiting for a minute and a half.
+
+Like http_client, the pools are per process: after a fork (gunicorn workers)
+they are rebuilt rather than shared with the parent.
+"""
+
+import logging
+import os
+import threading
+
+import httpx
+from django.conf import settings
+from openai import DefaultHttpxClient, OpenAI, Timeout
+
+from . import telemetry
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BASE_URL = "https://openrouter.ai/api/v1"
+
+DEFAULTS = {
+    'CONNECT_TIMEOUT': 5,            # Seconds to establish the TCP/TLS connection
+    'READ_TIMEOUT': 60,              # Seconds to wait for response data; completions are slow
+    'MAX_CONNECTIONS': 20,           # Concurrent connections per base URL
+    'MAX_KEEPALIVE_CONNECTIONS': 10,
+    'MAX_RETRIES': 2,                # Retried by the OpenAI client on connection errors, 429 and 5xx
+    'INTERACTIVE_MAX_RETRIES': 0,    # Same, for calls a user is waiting on
+}
+
+_http_clients = {}
+_clients = {}
+_lock = threading.Lock()
+_pid = os.getpid()
+
+
+def _option(name):
+    return getattr(settings, 'LLM_CLIENT', {}).get(name, DEFAULTS[name])
+
+
+def base_url():
+    return getattr(settings, 'OPENROUTER_BASE_URL', DEFAULT_BASE_URL)
+
+
+def extra_headers():
+    """Optional OpenRouter attribution headers, from YOUR_SITE_URL_SETTING / YOUR_SITE_NAME_SETTING."""
+    headers = {}
+    site_url = getattr(settings, 'YOUR_SITE_URL_SETTING', None)
+    site_name = getattr(settings, 'YOUR_SITE_NAME_SETTING', None)
+    if site_url:
+        headers["HTTP-Referer"] = site_url
+    if site_name:
+        headers["X-Title"] = site_name
+    return headers
+
+
+def timeout(read=None):
+    """The configured request timeout, optionally with a different read timeout."""
+    return Timeout(read or _option('READ_TIMEOUT'), connect=_option('CONNECT_TIMEOUT'))
+
+
+def _build_http_client():
+    return DefaultHttpxClient(
+        timeout=timeout(),
+        limits=httpx.Limits(
+            max_connections=_option('MAX_CONNECTIONS'),
+            max_keepalive_connections=_option('MAX_KEEPALIVE_CONNECTIONS'),
+        ),
+        event_hooks={'request': [telemetry.count_attempt]},  # Counts client retries per call
+    )
+
+
+def _check_fork():
+    """Forgets the parent's pools after a fork; callers hold _lock."""
+    global _pid
+    if os.getpid() != _pid:
+        _http_clients.clear()
+        _clients.clear()
+        _pid = os.getpid()
+
+
+def get_client(url=None, api_key=None, interactive=False):
+    """
+    Returns the shared OpenAI client for the base URL (default
+    OPENROUTER_BASE_URL) and API key (default OPENROUTER_API_KEY). Pass
+    interactive=True for requests a user is waiting on, which are retried
+    INTERACTIVE_MAX_RETRIES instead of MAX_RETRIES times.
+
+    Raises:
+        ValueError: If no API key is configured.
+    """
+    url = (url or base_url()).rstrip('/')
+    api_key = api_key or getattr(settings, 'OPENROUTER_API_KEY', None)
+    if not api_key:
+        raise ValueError("AI service API key not configured.")
+
+    with _lock:
+        _check_fork()
+        client = _clients.get((url, api_key, interactive))
+        if client is None:
+            http_client = _http_clients.get(url)
+            if http_client is None:
+                http_client = _http_clients[url] = _build_http_client()
+            client = _clients[(url, api_key, interactive)] = OpenAI(
+                base_url=url,
+                api_key=api_key,
+                http_client=http_client,
+                max_retries=_option('INTERACTIVE_MAX_RETRIES' if interactive else 'MAX_RETRIES'),
+            )
+        return client
+
+
+def warmup(background=True):
+    """
+    Opens a keep-alive connection to the OpenRouter base URL in the shared
+    HTTP client, so a worker's first AI call skips the TCP/TLS handshake.
+    Like http_client.warmup, runs in a daemon thread by default and only logs
+    failures.
+    """
+    url = base_url().rstrip('/')
+
+    def _warm():
+        with _lock:
+            _check_fork()
+            http_client = _http_clients.get(url)
+            if http_client is None:
+                http_client = _http_clients[url] = _build_http_client()
+        try:
+            http_client.head(url + '/', timeout=Timeout(2, connect=_option('CONNECT_TIMEOUT')))
+        except Exception as e:
+            logger.info(f"Connection warmup to {url} failed: {e}")
+
+    if background:
+        threading.Thread(target=_warm, name='llm-warmup', daemon=True).start()
+    else:
+        _warm()
+
+
+def reset():
+    """Closes and forgets every pooled client (e.g. right after a fork)."""
+    global _pid
+    with _lock:
+        http_clients = list(_http_clients.values())
+        _http_clients.clear()
+        _clients.clear()
+        _pid = os.getpid()
+    for http_client in http_clients:
+        try:
+            http_client.close()
+        except Exception as e:
+            logger.info(f"Closing LLM HTTP client failed: {e}")
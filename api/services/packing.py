@@ -2,73 +2,141 @@
 
 import json
 import logging
-import re  # Import regular expressions for advanced cleaning
 from django.conf import settings
 # Ensure you have the correct imports for your OpenAI library version
 # (typically `openai` >= 1.0)
 try:
-    from openai import OpenAI, OpenAIError, APIError # Include APIError for more specific network/API issues
+    from openai import OpenAIError, APIError, APIConnectionError, APIStatusError, APITimeoutError # Include APIError for more specific network/API issues
 except ImportError:
     # Handle potential older versions or inform the user
     raise ImportError("Please ensure the 'openai' library (version 1.0 or later) is installed: pip install --upgrade openai")
 
+from . import hedging, json_extract, llm, packing_cache, prompts, telemetry
+from .json_stream import PackingItemParser
+from .singleflight import SingleFlight
+
 logger = logging.getLogger(__name__)
 
+
+def _is_success(raw_json):
+    """True unless the generator returned its {"error": ...} JSON."""
+    try:
+        return "error" not in json.loads(raw_json)
+    except (TypeError, ValueError):
+        return False
+
+
+# Cached lists made with another version of the prompt are not served
+PROMPT_VERSION = prompts.PACKING_VERSION
+
+# Identical concurrent generations (same trip details and weather) share one LLM call
+_packing_flight = SingleFlight('packing_list', lock_timeout=90, result_ttl=30, share_if=_is_success)
+
+
 class PackingListGenerator:
     @staticmethod
-    def generate_packing_list(trip, weather_summary):
+    def generate_packing_list(trip, weather_summary, force_fresh=False):
         """
-        Generates a packing list using an OpenAI compatible API (like OpenRouter)
-        based on trip details and weather, attempting to force JSON output.
+        Generates a packing list, reusing a cached list for a near-identical
+        trip (see packing_cache) and coalescing identical concurrent requests.
 
         Args:
-            trip: The Trip object (assuming it has attributes like id, destination,
-                  date_leaving, date_returning, activities).
-            weather_summary (str): A concise string describing the weather forecast.
+            force_fresh (bool): Skip the cache lookup and generate a new list
+                (which then replaces the cached one).
 
-        Returns:
-            str: A JSON string representing the packing list if successful,
-                 otherwise a JSON string containing an error message.
+        See _generate_packing_list for the other arguments and return value.
         """
-        if not hasattr(settings, 'OPENROUTER_API_KEY') or not settings.OPENROUTER_API_KEY:
-            logger.error("OPENROUTER_API_KEY not configured in Django settings.")
-            # Return a valid JSON string indicating the error
-            return json.dumps({"error": "Configuration error: AI service API key not configured."})
+        model_name = getattr(settings, 'OPENROUTER_MODEL', None)
+        features = packing_cache.fingerprint(trip, weather_summary, model_name, PROMPT_VERSION)
+        if force_fresh:
+            packing_cache.record('bypassed')
+        else:
+            cached = packing_cache.get(features, trip)
+            if cached is not None:
+                logger.info(f"Serving cached packing list for trip {trip.id} ({features['destination']}, {features['duration']}, {features['weather']})")
+                return cached
+
+        key = (
+            trip.destination, trip.date_leaving, trip.date_returning, trip.activities,
+            weather_summary, model_name, force_fresh,
+        )
+        raw_json, answered_by = _packing_flight.do(key, PackingListGenerator._generate_packing_list, trip, weather_summary)
+        if _is_success(raw_json):
+            if answered_by != model_name:  # A fallback model won the hedge; keep it apart from the primary's lists
+                features = packing_cache.fingerprint(trip, weather_summary, answered_by, PROMPT_VERSION)
+            packing_cache.store(features, trip, raw_json)
+        return raw_json
 
-        # --- Initialize OpenAI Client for OpenRouter ---
+    @staticmethod
+    def stream_packing_list(trip, weather_summary, force_fresh=False):
+        """
+        Yields (category_name, item_dict) pairs as soon as each item object is
+        complete in the streamed completion, so items can be saved and shown
+        while the rest of the list is generated. A cached list for a similar
+        trip (see generate_packing_list) is replayed instead when available.
+
+        Raises:
+            ValueError: If the API key is missing.
+            TimeoutError / ConnectionError: If OpenRouter can't be reached or
+                fails mid-stream.
+        """
+        model_name = getattr(settings, 'OPENROUTER_MODEL', None)
+        features = packing_cache.fingerprint(trip, weather_summary, model_name, PROMPT_VERSION)
+        if force_fresh:
+            packing_cache.record('bypassed')
+        else:
+            cached = packing_cache.get(features, trip)
+            if cached is not None:
+                for category in json.loads(cached).get('categories', []):
+                    for item in category.get('items', []):
+                        yield category.get('name') or 'Miscellaneous', item
+                return
+
+        client = llm.get_client(interactive=True)  # Streamed to a waiting user; see llm.py
+        model_name, completion_params = PackingListGenerator._completion_params(trip, weather_summary, llm.extra_headers())
+        parser = PackingItemParser()
+        parts = []
         try:
-            client = OpenAI(
-              base_url=getattr(settings, 'OPENROUTER_BASE_URL', "https://openrouter.ai/api/v1"), # Allow overriding base URL via settings
-              api_key=settings.OPENROUTER_API_KEY,
-              # Consider adding timeouts if needed:
-              # timeout=30.0, # Timeout for establishing connection
-              # max_retries=2 # Number of retries on transient errors
-            )
-
-            # Optional OpenRouter Headers (get from Django settings)
-            # Replace 'YOUR_SITE_URL_SETTING' and 'YOUR_SITE_NAME_SETTING' below
-            # with the actual names of your Django settings variables if you use them.
-            site_url = getattr(settings, 'YOUR_SITE_URL_SETTING', None)
-            site_name = getattr(settings, 'YOUR_SITE_NAME_SETTING', None)
-            extra_headers = {}
-            if site_url:
-                extra_headers["HTTP-Referer"] = site_url
-            if site_name:
-                extra_headers["X-Title"] = site_name
-            # Add any other custom headers required by OpenRouter or your setup
-            # extra_headers["Your-Custom-Header"] = "Value"
-
-        except Exception as e:
-            logger.error(f"Failed to initialize OpenAI client for OpenRouter: {e}", exc_info=True)
-            return json.dumps({"error": f"Configuration error: Failed to initialize AI client: {e}"})
-        # ----------------------------------------------------
+            with telemetry.track('packing_list', model_name, completion_params.get('max_tokens'), streamed=True,
+                                 prompt_version=PROMPT_VERSION) as call:
+                logger.info(f"Streaming packing list from OpenRouter ({model_name}) for trip {trip.id} to {trip.destination}")
+                stream = client.chat.completions.create(
+                    **completion_params, stream=True, stream_options={"include_usage": True})
+                with stream:
+                    for chunk in stream:
+                        call.chunk(chunk)
+                        if not chunk.choices:
+                            continue
+                        text = chunk.choices[0].delta.content
+                        if text:
+                            parts.append(text)
+                            yield from parser.feed(text)
+                call.parsed('ok' if parser.items_parsed else 'failed')
+        except APITimeoutError:
+            logger.error(f"Packing list stream from OpenRouter timed out for trip {trip.id}.")
+            raise TimeoutError("The request to the AI service timed out.")
+        except (APIStatusError, APIConnectionError) as e:
+            logger.error(f"Packing list stream from OpenRouter failed for trip {trip.id}: {e}")
+            raise ConnectionError(f"AI service communication failed: {e}")
+
+        logger.info(f"Streamed {parser.items_parsed} packing items for trip {trip.id} ({parser.items_skipped} skipped)")
+        # Keep the complete list for similar trips, as generate_packing_list does
+        try:
+            _, raw_json, _ = json_extract.extract_object("".join(parts))
+        except ValueError:
+            raw_json = None
+        if parser.items_parsed and raw_json and _is_success(raw_json):
+            packing_cache.store(features, trip, raw_json)
 
+    @staticmethod
+    def _completion_params(trip, weather_summary, extra_headers, model_name=None):
+        """Returns (model_name, chat completion kwargs) for a packing list request."""
         # --- Define Model and Prompt ---
         # Use the model specified in settings, default to Gemini Flash
-        model_name = getattr(settings, 'OPENROUTER_MODEL', "google/gemini-flash-1.5")
+        model_name = model_name or getattr(settings, 'OPENROUTER_MODEL', "google/gemini-flash-1.5")
         logger.info(f"Using OpenRouter model: {model_name} for trip {trip.id}")
 
-        # Improved, stricter prompt
+        # Trip details only; the instructions and schema are the cacheable system prompt (see prompts.py)
         prompt = f"""Generate a detailed packing list strictly in JSON format for a trip to {trip.destination} from {trip.date_leaving.strftime('%Y-%m-%d')} to {trip.date_returning.strftime('%Y-%m-%d')}.
 
 Consider these details:
@@ -77,175 +145,180 @@ Dates: {trip.date_leaving.strftime('%b %d, %Y')} to {trip.date_returning.strftim
 Planned Activities: {trip.activities or 'General tourism and leisure'}
 Weather Forecast Summary: {weather_summary}
 
-**IMPORTANT INSTRUCTIONS:**
-1.  Your *entire* response MUST be **ONLY** a valid JSON object.
-2.  The JSON object must contain a single top-level key: "categories".
-3.  The "categories" value must be a list of category objects.
-4.  Each category object must have "name" (string) and "items" (list) keys.
-5.  Each item object must have "name" (string, required) and can optionally have "quantity" (integer, default 1), "essential" (boolean, default false), "notes" (string), "for_day" (string 'YYYY-MM-DD'). Mark essentials like passports/visas/meds as true.
-6.  **DO NOT** include *any* introductory text, concluding text, explanations, apologies, code comments (like // ...), or markdown formatting (like ```json ... ```) in your response.
-7.  The response **must** start directly with `{{` and end directly with `}}`. Your output should be parsable by Python's `json.loads()`.
-
-Example structure:
-{{
-    "categories": [
-        {{
-            "name": "Documents & Money",
-            "items": [
-                {{"name": "Passport", "quantity": 1, "essential": true}},
-                {{"name": "Visa (if required)", "quantity": 1, "essential": true, "notes": "Check requirements for nationality"}},
-                {{"name": "Local Currency", "quantity": 1, "essential": true, "notes": "Some cash recommended"}}
-            ]
-        }},
-        {{
-            "name": "Clothing",
-            "items": [
-                {{"name": "T-shirts", "quantity": 4, "essential": false, "notes": "Breathable fabric"}},
-                {{"name": "Comfortable Walking Shoes", "quantity": 1, "essential": true}}
-            ]
-        }},
-        {{
-            "name": "Toiletries",
-            "items": [
-                {{"name": "Toothbrush", "quantity": 1, "essential": true}},
-                {{"name": "Sunscreen", "quantity": 1, "essential": false}}
-            ]
-        }}
-        // Add other relevant categories like Electronics, Medications, Gear etc. based on trip details.
-    ]
-}}
-
 Generate the JSON packing list now based *only* on the trip details provided. Ensure the output is ONLY the JSON object.
 """
         # -------------------------------------
 
+        # --- Prepare API Call Parameters ---
+        completion_params = {
+            "model": model_name,
+            "messages": prompts.cached_messages(model_name, prompts.PACKING_SYSTEM, prompt),
+            "temperature": 0.5, # Lower temperature for more deterministic JSON
+            "max_tokens": 2500, # Generous limit, adjust based on typical list size
+            "extra_headers": extra_headers # Pass optional headers
+        }
+
+        # Attempt to use JSON Mode (check model compatibility/OpenRouter support)
+        # Common OpenAI models (GPT-3.5/4) and Gemini models generally support this.
+        # Add other model families if known to support it via OpenRouter.
+        if any(m in model_name.lower() for m in ["gpt", "gemini"]):
+             try:
+                 logger.info(f"Attempting to use JSON response format for model {model_name}")
+                 completion_params["response_format"] = {"type": "json_object"}
+             except Exception as rf_err:
+                 # Log if setting the format itself fails (e.g., library version issue)
+                 logger.warning(f"Could not set response_format parameter for {model_name}, proceeding without it. Check library compatibility or model support. Error: {rf_err}")
+                 # Ensure the parameter is removed if it caused an error during setup
+                 if "response_format" in completion_params:
+                     del completion_params["response_format"]
+        else:
+            logger.info(f"Model {model_name} not in known list for JSON mode, relying on prompt instructions.")
+        # ---------------------------------
+
+        return model_name, completion_params
+
+    @staticmethod
+    def _generate_packing_list(trip, weather_summary):
+        """
+        Generates a packing list using an OpenAI compatible API (like OpenRouter)
+        based on trip details and weather, attempting to force JSON output.
+
+        Args:
+            trip: The Trip object (assuming it has attributes like id, destination,
+                  date_leaving, date_returning, activities).
+            weather_summary (str): A concise string describing the weather forecast.
+
+        Returns:
+            tuple: (raw_json, model_name). raw_json is a JSON string representing
+                   the packing list if successful, otherwise a JSON string
+                   containing an error message; model_name is the model that
+                   answered (None if no request was made).
+        """
+        if not hasattr(settings, 'OPENROUTER_API_KEY') or not settings.OPENROUTER_API_KEY:
+            logger.error("OPENROUTER_API_KEY not configured in Django settings.")
+            # Return a valid JSON string indicating the error
+            return json.dumps({"error": "Configuration error: AI service API key not configured."}), None
+
+        # --- Shared OpenAI client for OpenRouter (pooled connections, see llm.py) ---
+        try:
+            client = llm.get_client()
+            extra_headers = llm.extra_headers()
+        except Exception as e:
+            logger.error(f"Failed to initialize OpenAI client for OpenRouter: {e}", exc_info=True)
+            return json.dumps({"error": f"Configuration error: Failed to initialize AI client: {e}"}), None
+        # ----------------------------------------------------
+
+        # Slow or failing calls are hedged with the fallback models (see hedging.py)
+        primary_model = getattr(settings, 'OPENROUTER_MODEL', "google/gemini-flash-1.5")
+        models = hedging.model_chain(primary_model)
+        if len(models) > 1:
+            client = client.with_options(max_retries=0)  # The fallback chain is the retry
+        return hedging.first_valid(
+            'packing_list', models,
+            lambda model_name, cancel: PackingListGenerator._request_packing_list(
+                client, trip, weather_summary, extra_headers, model_name, cancel),
+            _is_success,
+        )
+
+    @staticmethod
+    def _request_packing_list(client, trip, weather_summary, extra_headers, model_name, cancel):
+        """
+        One attempt at generating the packing list with the given model; returns
+        the raw_json described in _generate_packing_list. The completion is
+        streamed, and closed as soon as `cancel` (a hedging.CancelEvent) is set.
+
+        Raises:
+            hedging.Cancelled: If cancelled before the completion finished.
+        """
+        model_name, completion_params = PackingListGenerator._completion_params(
+            trip, weather_summary, extra_headers, model_name)
+
         try:
-            logger.info(f"Sending packing list request to OpenRouter ({model_name}) for trip {trip.id} to {trip.destination}")
-
-            # --- Prepare API Call Parameters ---
-            completion_params = {
-                "model": model_name,
-                "messages": [
-                    {"role": "system", "content": "You are an expert travel assistant. Your sole task is to generate a packing list in a specific JSON format based on user-provided trip details, activities, and weather. Your output MUST be a single, valid JSON object conforming exactly to the structure requested by the user. Do not include any text outside of the JSON structure itself."},
-                    {"role": "user", "content": prompt}
-                ],
-                "temperature": 0.5, # Lower temperature for more deterministic JSON
-                "max_tokens": 2500, # Generous limit, adjust based on typical list size
-                "extra_headers": extra_headers # Pass optional headers
-            }
-
-            # Attempt to use JSON Mode (check model compatibility/OpenRouter support)
-            # Common OpenAI models (GPT-3.5/4) and Gemini models generally support this.
-            # Add other model families if known to support it via OpenRouter.
-            if any(m in model_name.lower() for m in ["gpt", "gemini"]):
-                 try:
-                     logger.info(f"Attempting to use JSON response format for model {model_name}")
-                     completion_params["response_format"] = {"type": "json_object"}
-                 except Exception as rf_err:
-                     # Log if setting the format itself fails (e.g., library version issue)
-                     logger.warning(f"Could not set response_format parameter for {model_name}, proceeding without it. Check library compatibility or model support. Error: {rf_err}")
-                     # Ensure the parameter is removed if it caused an error during setup
-                     if "response_format" in completion_params:
-                         del completion_params["response_format"]
-            else:
-                logger.info(f"Model {model_name} not in known list for JSON mode, relying on prompt instructions.")
-            # ---------------------------------
-
-            # --- Make the API Call ---
-            completion = client.chat.completions.create(**completion_params)
-            # -------------------------
-
-            # --- Process the Response ---
-            if not completion.choices:
-                 logger.error(f"No choices returned from OpenRouter ({model_name}) for trip {trip.id}.")
-                 return json.dumps({"error": "AI service returned an empty response."})
-
-            raw_content = completion.choices[0].message.content
-            if not raw_content:
-                logger.error(f"Empty content received from OpenRouter ({model_name}) choice for trip {trip.id}.")
-                return json.dumps({"error": "AI service returned empty content."})
-
-            raw_content = raw_content.strip()
-            logger.debug(f"Raw response received from OpenRouter for trip {trip.id} (len={len(raw_content)}): {repr(raw_content)}")
-
-            # --- JSON Cleaning/Extraction ---
-            cleaned_content = raw_content
-            original_content_for_log = raw_content # Keep a copy for error logging
-
-            # 1. Regex to find JSON within optional markdown fences (```json ... ``` or ``` ... ```)
-            # Handles potential leading/trailing whitespace within the fences. DOTALL allows '.' to match newlines.
-            match = re.search(r"```(?:json)?\s*(\{.*?\})\s*```", cleaned_content, re.DOTALL | re.IGNORECASE)
-            if match:
-                cleaned_content = match.group(1).strip()
-                logger.info(f"Extracted JSON using regex from markdown fences for trip {trip.id}")
-            else:
-                # 2. If no fences, look for the first '{' and the last '}'
-                # This assumes the primary content is the JSON, possibly with leading/trailing text.
-                json_start = cleaned_content.find('{')
-                json_end = cleaned_content.rfind('}')
-
-                if json_start != -1 and json_end != -1 and json_start < json_end:
-                    potential_json = cleaned_content[json_start : json_end + 1]
-                    # Basic check: does it look like JSON? (Starts/ends with braces)
-                    if potential_json.startswith('{') and potential_json.endswith('}'):
-                         cleaned_content = potential_json
-                         # Log only if we actually extracted a substring
-                         if len(cleaned_content) < len(raw_content):
-                              logger.info(f"Extracted potential JSON block using brace finding for trip {trip.id}")
-                         # else: it was already just the JSON block
-                    else:
-                         # If the extraction looks wrong (e.g., found braces inside text but not valid JSON)
-                         logger.warning(f"Brace finding yielded non-JSON-like block for trip {trip.id}. Proceeding with original (cleaned) content.")
-                         # Revert to the stripped raw content if extraction failed sanity check
-                         cleaned_content = raw_content
-                else:
-                    # If we couldn't find any braces, it's very unlikely to be JSON.
-                    # Log a warning but proceed; parsing will likely fail, triggering error handling.
-                    logger.warning(f"Response for trip {trip.id} doesn't appear to contain JSON braces. Content starts: {cleaned_content[:200]}...")
-                    # Keep cleaned_content as is (it's the stripped raw content)
-            # -----------------------------
-
-            # --- Attempt to Parse the Cleaned JSON ---
-            logger.debug(f"Attempting to parse cleaned content for trip {trip.id} (len={len(cleaned_content)}): {repr(cleaned_content)}")
-            try:
-                # Load the JSON to validate its structure
-                parsed_json = json.loads(cleaned_content)
-
-                # Optional: Add a basic structure check if needed
-                if not isinstance(parsed_json, dict) or "categories" not in parsed_json or not isinstance(parsed_json["categories"], list):
-                    logger.error(f"Parsed JSON for trip {trip.id} lacks expected root structure ('categories' list).")
-                    # Log the problematic structure
-                    logger.error(f"--- Problematic Parsed Structure --- Trip {trip.id} ---\n{json.dumps(parsed_json, indent=2)}\n--- End Structure ---")
-                    return json.dumps({"error": "AI response was valid JSON but lacked the expected structure (missing 'categories' list)."})
-
-                logger.info(f"Successfully parsed and validated JSON response from OpenRouter for trip {trip.id}")
-                # Return the validated, cleaned JSON string
-                return cleaned_content
-
-            except json.JSONDecodeError as json_err:
-                logger.error(f"Failed to decode JSON response from AI ({model_name}) for trip {trip.id}: {json_err}", exc_info=False) # Keep traceback minimal here
-
-                # Provide context from the content being parsed
-                error_context = ""
+            with telemetry.track('packing_list', model_name, completion_params.get('max_tokens'), streamed=True,
+                                 prompt_version=PROMPT_VERSION) as call:
+                logger.info(f"Sending packing list request to OpenRouter ({model_name}) for trip {trip.id} to {trip.destination}")
+
+                # --- Make the API Call ---
+                parts = []
+                stream = client.chat.completions.create(
+                    **completion_params, stream=True, stream_options={"include_usage": True})
+                cancel.on_set(stream.close)  # Unblocks a read waiting on a stalled generation
+                with stream:
+                    try:
+                        for chunk in stream:
+                            if cancel.is_set():
+                                raise hedging.Cancelled(f"Packing list request to {model_name} cancelled")
+                            call.chunk(chunk)
+                            if chunk.choices and chunk.choices[0].delta.content:
+                                parts.append(chunk.choices[0].delta.content)
+                    except hedging.Cancelled:
+                        raise
+                    except Exception as e:
+                        if cancel.is_set():  # The read failed because the stream was closed on cancel
+                            raise hedging.Cancelled(f"Packing list request to {model_name} cancelled") from e
+                        raise
+                # -------------------------
+
+                # --- Process the Response ---
+                raw_content = "".join(parts)
+                if not raw_content:
+                    logger.error(f"Empty content received from OpenRouter ({model_name}) choice for trip {trip.id}.")
+                    return json.dumps({"error": "AI service returned empty content."})
+
+                raw_content = raw_content.strip()
+                logger.debug(f"Raw response received from OpenRouter for trip {trip.id} (len={len(raw_content)}): {repr(raw_content)}")
+
+                # --- JSON Extraction/Repair ---
+                # Finds the object past any fences or preamble and repairs trailing commas,
+                # comments and truncation (finish_reason 'length') in one pass; see json_extract
+                cleaned_content = raw_content
+                original_content_for_log = raw_content # Keep a copy for error logging
                 try:
-                    # Use json_err attributes to pinpoint the error location
-                    line_start_index = max(0, json_err.pos - 40) # Show context before error
-                    line_end_index = min(len(cleaned_content), json_err.pos + 40) # Show context after error
-                    error_snippet = cleaned_content[line_start_index:line_end_index]
-                    pointer = " " * (json_err.pos - line_start_index) + "^" # Point to the error char
-                    error_context = f"Error near character {json_err.pos} (line ~{json_err.lineno}, col ~{json_err.colno}). Context:\n...\n{error_snippet}\n{pointer}\n..."
-                except Exception as context_err:
-                    logger.warning(f"Could not extract error context snippet: {context_err}")
-                    error_context = f"Error at char {json_err.pos} (line ~{json_err.lineno}, col ~{json_err.colno})."
-
-                # Log the content that failed parsing and the original raw response
-                logger.error(f"--- Problematic Content (Cleaned) --- Trip {trip.id} ---\n{repr(cleaned_content)}\n--- End Problematic Content ---")
-                logger.error(f"--- Original Raw Content --- Trip {trip.id} ---\n{repr(original_content_for_log)}\n--- End Original Raw Content ---")
-
-                return json.dumps({"error": f"AI response could not be parsed as valid JSON. {error_context}. Details: {json_err.msg}"})
-            # -----------------------------------------
+                    parsed_json, cleaned_content, repairs = json_extract.extract_object(raw_content)
+                    if repairs:
+                        logger.warning(f"Repaired JSON response for trip {trip.id} ({', '.join(repairs)}); finish_reason={call.finish_reason or 'unknown'}")
+
+                    # Optional: Add a basic structure check if needed
+                    if not isinstance(parsed_json, dict) or "categories" not in parsed_json or not isinstance(parsed_json["categories"], list):
+                        logger.error(f"Parsed JSON for trip {trip.id} lacks expected root structure ('categories' list).")
+                        # Log the problematic structure
+                        logger.error(f"--- Problematic Parsed Structure --- Trip {trip.id} ---\n{json.dumps(parsed_json, indent=2)}\n--- End Structure ---")
+                        call.parsed('failed')
+                        return json.dumps({"error": "AI response was valid JSON but lacked the expected structure (missing 'categories' list)."})
+
+                    logger.info(f"Successfully parsed and validated JSON response from OpenRouter for trip {trip.id}")
+                    # Return the validated, cleaned JSON string
+                    call.parsed('repaired' if repairs else 'ok')
+                    return cleaned_content
+
+                except json.JSONDecodeError as json_err:
+                    call.parsed('failed')
+                    cleaned_content = json_err.doc # The text that failed to parse, which the position refers to
+                    logger.error(f"Failed to decode JSON response from AI ({model_name}) for trip {trip.id}: {json_err}", exc_info=False) # Keep traceback minimal here
+
+                    # Provide context from the content being parsed
+                    error_context = ""
+                    try:
+                        # Use json_err attributes to pinpoint the error location
+                        line_start_index = max(0, json_err.pos - 40) # Show context before error
+                        line_end_index = min(len(cleaned_content), json_err.pos + 40) # Show context after error
+                        error_snippet = cleaned_content[line_start_index:line_end_index]
+                        pointer = " " * (json_err.pos - line_start_index) + "^" # Point to the error char
+                        error_context = f"Error near character {json_err.pos} (line ~{json_err.lineno}, col ~{json_err.colno}). Context:\n...\n{error_snippet}\n{pointer}\n..."
+                    except Exception as context_err:
+                        logger.warning(f"Could not extract error context snippet: {context_err}")
+                        error_context = f"Error at char {json_err.pos} (line ~{json_err.lineno}, col ~{json_err.colno})."
+
+                    # Log the content that failed parsing and the original raw response
+                    logger.error(f"--- Problematic Content (Cleaned) --- Trip {trip.id} ---\n{repr(cleaned_content)}\n--- End Problematic Content ---")
+                    logger.error(f"--- Original Raw Content --- Trip {trip.id} ---\n{repr(original_content_for_log)}\n--- End Original Raw Content ---")
+
+                    return json.dumps({"error": f"AI response could not be parsed as valid JSON. {error_context}. Details: {json_err.msg}"})
+                # -----------------------------------------
 
         # --- Handle API and Other Errors ---
+        except hedging.Cancelled:
+            raise
         except APIError as e: # Catch broader API errors (network, rate limits, etc.)
              logger.error(f"OpenRouter API error ({model_name}) for trip {trip.id}: {e.status_code} - {e.message}", exc_info=True)
              # Try to extract a meaningful message from the response body if available
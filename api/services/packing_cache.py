@@ -0,0 +1,155 @@
+# api/services/packing_cache.py
+"""
+Response cache for generated packing lists.
+
+Most trips look alike to the packing prompt: "Paris, 4 days, museums, mild and
+rainy" produces much the same list whoever asks. Generated lists are stored
+under a fingerprint of the trip features that shape the prompt (normalized
+destination, duration bucket, activity set, weather bucket, model and prompt
+version) in the 'shared' cache, and near-identical trips reuse them.
+
+Lists can pin items to trip days ('for_day'); those dates are shifted onto
+the requesting trip's dates when a cached list is served.
+
+Hit/miss counters are ServiceCounter rows, incremented atomically in the
+database, so stats() covers all workers.
+"""
+
+import hashlib
+import json
+import logging
+import re
+from datetime import date
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import DatabaseError
+from django.db.models import F
+
+from .trip_features import activity_set, normalize
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = "packing_list"
+COUNTERS = ('hits', 'misses', 'bypassed')
+
+# Upper bounds (days) of the trip length buckets; longer trips share the last one
+DURATION_BUCKETS = (2, 4, 7, 14)
+# Upper bounds (°C) of the temperature bands, matched against the summary's average temperature
+TEMPERATURE_BANDS = ((5, 'cold'), (15, 'cool'), (22, 'mild'), (28, 'warm'))
+
+_AVG_TEMP_RE = re.compile(r"Average temperature around (-?\d+(?:\.\d+)?)°C")
+_CONDITIONS_RE = re.compile(r"Conditions mainly ([^.]*)\.")
+
+
+def _cache():
+    return caches['shared']
+
+
+def duration_bucket(days):
+    for upper in DURATION_BUCKETS:
+        if days <= upper:
+            return f"<={upper}d"
+    return f">{DURATION_BUCKETS[-1]}d"
+
+
+def weather_bucket(weather_summary):
+    """
+    Coarse weather class of a summary from weather.services: temperature band,
+    wet or dry, and snow. Summaries without figures fall into 'unknown'.
+    """
+    match = _AVG_TEMP_RE.search(weather_summary or "")
+    if not match:
+        return "unknown"
+    temperature = float(match.group(1))
+    band = next((name for upper, name in TEMPERATURE_BANDS if temperature < upper), 'hot')
+    wet = "wet" if "Possibility of precipitation" in weather_summary else "dry"
+    conditions = _CONDITIONS_RE.search(weather_summary)
+    snow = "-snow" if conditions and "Snow" in conditions.group(1) else ""
+    return f"{band}-{wet}{snow}"
+
+
+def fingerprint(trip, weather_summary, model, prompt_version):
+    """Normalized features of a packing request that determine the generated list."""
+    return {
+        'destination': normalize(trip.destination),
+        'duration': duration_bucket((trip.date_returning - trip.date_leaving).days + 1),
+        'activities': list(activity_set(trip.activities)),
+        'weather': weather_bucket(weather_summary),
+        'model': model,
+        'prompt_version': prompt_version,
+    }
+
+
+def cache_key(features):
+    digest = hashlib.sha1(json.dumps(features, sort_keys=True).encode('utf-8')).hexdigest()
+    return f"{KEY_PREFIX}:{digest}"
+
+
+def get(features, trip):
+    """Returns the cached packing list JSON for the fingerprint, rebased onto the trip's dates, or None."""
+    try:
+        entry = _cache().get(cache_key(features))
+    except Exception as e:
+        logger.warning(f"Packing list cache read failed: {e}")
+        return None
+    record('hits' if entry is not None else 'misses')
+    if entry is None:
+        return None
+    return _rebase_days(entry['json'], date.fromisoformat(entry['start_date']), trip)
+
+
+def store(features, trip, raw_json):
+    entry = {'json': raw_json, 'start_date': trip.date_leaving.isoformat()}
+    try:
+        _cache().set(cache_key(features), entry, getattr(settings, 'PACKING_CACHE_TTL', 7 * 24 * 60 * 60))
+    except Exception as e:
+        logger.warning(f"Packing list cache write failed: {e}")
+
+
+def _rebase_days(raw_json, source_start, trip):
+    """Moves 'for_day' dates by the offset between the trips; drops those that fall outside the trip."""
+    offset = trip.date_leaving - source_start
+    if not offset:
+        return raw_json
+    packing_data = json.loads(raw_json)
+    for category in packing_data.get('categories', []):
+        for item in category.get('items', []):
+            if not item.get('for_day'):
+                continue
+            try:
+                day = date.fromisoformat(item['for_day']) + offset
+            except (TypeError, ValueError):
+                day = None
+            item['for_day'] = day.isoformat() if day and trip.date_leaving <= day <= trip.date_returning else None
+    return json.dumps(packing_data)
+
+
+def record(counter):
+    from api.models import ServiceCounter  # Late import, like telemetry: services load before the app registry
+
+    name = f"{KEY_PREFIX}:{counter}"
+    try:
+        # A single UPDATE ... SET value = value + 1, so concurrent workers don't lose counts
+        if not ServiceCounter.objects.filter(name=name).update(value=F('value') + 1):
+            _, created = ServiceCounter.objects.get_or_create(name=name, defaults={'value': 1})
+            if not created:
+                ServiceCounter.objects.filter(name=name).update(value=F('value') + 1)
+    except DatabaseError as e:
+        logger.debug(f"Packing list cache counter {counter} not updated: {e}")
+
+
+def stats():
+    """Hit, miss and bypass counts across all workers, plus the hit rate of cache lookups."""
+    from api.models import ServiceCounter
+
+    try:
+        values = dict(ServiceCounter.objects.filter(
+            name__in=[f"{KEY_PREFIX}:{counter}" for counter in COUNTERS]).values_list('name', 'value'))
+    except DatabaseError as e:
+        logger.warning(f"Packing list cache stats unavailable: {e}")
+        values = {}
+    counts = {counter: values.get(f"{KEY_PREFIX}:{counter}", 0) for counter in COUNTERS}
+    lookups = counts['hits'] + counts['misses']
+    counts['hit_rate'] = round(counts['hits'] / lookups, 3) if lookups else None
+    return counts
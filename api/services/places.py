@@ -1,8 +1,33 @@
 import requests
+import httpx
 import json
 from django.conf import settings
 from django.core.cache import cache
 
+from . import async_http, http_client
+from .singleflight import AsyncSingleFlight, SingleFlight
+
+# Identical concurrent lookups (same cache key) share one Google call. The remotes
+# return (data, error); fallback answers carry an error and stay per-process.
+_places_flight = SingleFlight('google_places', lock_timeout=15, share_if=lambda result: result[1] is None)
+_async_places_flight = AsyncSingleFlight('google_places_async')
+
+
+def _location_bias(location, radius):
+    """Builds a circular locationBias from a "lat,lng" string, or None if it can't be parsed."""
+    if not location:
+        return None
+    try:
+        lat, lng = map(float, location.split(','))
+    except (ValueError, AttributeError):
+        return None  # Skip invalid location formats
+    return {
+        'circle': {
+            'center': {'latitude': lat, 'longitude': lng},
+            'radius': radius or 5000  # Default 5km radius
+        }
+    }
+
 
 class GooglePlacesService:
     BASE_URL = "https://places.googleapis.com/v1"
@@ -27,6 +52,13 @@ class GooglePlacesService:
         if cached_result:
             return cached_result
 
+        data, _ = _places_flight.do(cache_key, cls._autocomplete_remote, cache_key, query, location, radius,
+                                    include_query_predictions)
+        return data
+
+    @classmethod
+    def _autocomplete_request(cls, query, location=None, radius=None, include_query_predictions=False):
+        """Returns (url, headers, body) for an autocomplete call."""
         headers = {
             'Content-Type': 'application/json',
             'X-Goog-Api-Key': settings.GOOGLE_API_KEY,
@@ -39,34 +71,28 @@ class GooglePlacesService:
         }
 
         # Add location bias if provided
-        if location:
-            try:
-                lat, lng = map(float, location.split(','))
-                request_body['locationBias'] = {
-                    'circle': {
-                        'center': {'latitude': lat, 'longitude': lng},
-                        'radius': radius or 5000  # Default 5km radius
-                    }
-                }
-            except (ValueError, AttributeError):
-                pass  # Skip invalid location formats
+        location_bias = _location_bias(location, radius)
+        if location_bias:
+            request_body['locationBias'] = location_bias
+
+        return f"{cls.BASE_URL}/places:autocomplete", headers, json.dumps(request_body)
 
+    @classmethod
+    def _autocomplete_remote(cls, cache_key, query, location=None, radius=None, include_query_predictions=False):
+        """Calls the autocomplete endpoint and caches a successful response. Returns (data, error)."""
+        url, headers, body = cls._autocomplete_request(query, location, radius, include_query_predictions)
         try:
-            response = requests.post(
-                f"{cls.BASE_URL}/places:autocomplete",
-                headers=headers,
-                data=json.dumps(request_body)
-            )
+            response = http_client.post(url, headers=headers, data=body)
             response.raise_for_status()
             data = response.json()
 
             # Cache the successful response
             cache.set(cache_key, data, cls.CACHE_TIMEOUT)
-            return data
+            return data, None
 
         except requests.exceptions.RequestException as e:
             # Fallback to old autocomplete if new one fails
-            return cls._fallback_autocomplete(query, location, radius)
+            return cls._fallback_autocomplete(query, location, radius), str(e)
 
     @classmethod
     def search_places(cls, query, location=None, radius=None):
@@ -86,6 +112,12 @@ class GooglePlacesService:
         if cached_result:
             return cached_result
 
+        data, _ = _places_flight.do(cache_key, cls._search_remote, cache_key, query, location, radius)
+        return data
+
+    @classmethod
+    def _search_request(cls, query, location=None, radius=None):
+        """Returns (url, headers, body) for a text search call."""
         headers = {
             'Content-Type': 'application/json',
             'X-Goog-Api-Key': settings.GOOGLE_API_KEY,
@@ -98,38 +130,32 @@ class GooglePlacesService:
         }
 
         # Add location bias if provided
-        if location:
-            try:
-                lat, lng = map(float, location.split(','))
-                request_body['locationBias'] = {
-                    'circle': {
-                        'center': {'latitude': lat, 'longitude': lng},
-                        'radius': radius or 5000  # Default 5km radius
-                    }
-                }
-            except (ValueError, AttributeError):
-                pass  # Skip invalid location formats
+        location_bias = _location_bias(location, radius)
+        if location_bias:
+            request_body['locationBias'] = location_bias
+
+        return f"{cls.BASE_URL}/places:searchText", headers, json.dumps(request_body)
 
+    @classmethod
+    def _search_remote(cls, cache_key, query, location=None, radius=None):
+        """Calls the text search endpoint and caches a successful response. Returns (data, error)."""
+        url, headers, body = cls._search_request(query, location, radius)
         try:
-            response = requests.post(
-                f"{cls.BASE_URL}/places:searchText",
-                headers=headers,
-                data=json.dumps(request_body)
-            )
+            response = http_client.post(url, headers=headers, data=body)
             response.raise_for_status()
             data = response.json()
 
             # Cache the successful response
             cache.set(cache_key, data, cls.CACHE_TIMEOUT)
-            return data
+            return data, None
 
         except requests.exceptions.RequestException as e:
             # Fallback to old API if new one fails
-            return cls._fallback_search(query, location, radius)
+            return cls._fallback_search(query, location, radius), str(e)
 
     @classmethod
-    def _fallback_autocomplete(cls, query, location=None, radius=None):
-        """Fallback to the old Places Autocomplete API if new one fails"""
+    def _fallback_autocomplete_request(cls, query, location=None, radius=None):
+        """Returns (url, params) for the old Places Autocomplete API."""
         old_api_url = "https://maps.googleapis.com/maps/api/place/autocomplete/json"
         params = {
             'key': settings.GOOGLE_API_KEY,
@@ -143,31 +169,38 @@ class GooglePlacesService:
                 'location': location,
                 'radius': radius or 5000
             })
+        return old_api_url, params
+
+    @staticmethod
+    def _convert_fallback_autocomplete(data):
+        """Converts an old Autocomplete API response to the new API format."""
+        return {
+            'suggestions': [{
+                'placePrediction': {
+                    'text': {'text': prediction['description']},
+                    'placeId': prediction['place_id'],
+                    'structuredFormat': {
+                        'mainText': prediction['structured_formatting']['main_text'],
+                        'secondaryText': prediction['structured_formatting'].get('secondary_text', '')
+                    }
+                }
+            } for prediction in data.get('predictions', [])]
+        }
 
+    @classmethod
+    def _fallback_autocomplete(cls, query, location=None, radius=None):
+        """Fallback to the old Places Autocomplete API if new one fails"""
+        url, params = cls._fallback_autocomplete_request(query, location, radius)
         try:
-            response = requests.get(old_api_url, params=params)
+            response = http_client.get(url, params=params)
             response.raise_for_status()
-            data = response.json()
-
-            # Convert old API format to new API format
-            return {
-                'suggestions': [{
-                    'placePrediction': {
-                        'text': {'text': prediction['description']},
-                        'placeId': prediction['place_id'],
-                        'structuredFormat': {
-                            'mainText': prediction['structured_formatting']['main_text'],
-                            'secondaryText': prediction['structured_formatting'].get('secondary_text', '')
-                        }
-                    }
-                } for prediction in data.get('predictions', [])]
-            }
+            return cls._convert_fallback_autocomplete(response.json())
         except Exception:
             return {'suggestions': []}
 
     @classmethod
-    def _fallback_search(cls, query, location=None, radius=None):
-        """Fallback to the old Places API if new one fails"""
+    def _fallback_search_request(cls, query, location=None, radius=None):
+        """Returns (url, params) for the old Places Text Search API."""
         old_api_url = "https://maps.googleapis.com/maps/api/place/textsearch/json"
         params = {
             'key': settings.GOOGLE_API_KEY,
@@ -180,23 +213,30 @@ class GooglePlacesService:
                 'location': location,
                 'radius': radius or 5000
             })
+        return old_api_url, params
+
+    @staticmethod
+    def _convert_fallback_search(data):
+        """Converts an old Text Search API response to the new API format."""
+        return {
+            'places': [{
+                'displayName': {'text': place.get('name', '')},
+                'formattedAddress': place.get('formatted_address', ''),
+                'location': {
+                    'latitude': place['geometry']['location']['lat'],
+                    'longitude': place['geometry']['location']['lng']
+                } if 'geometry' in place else None
+            } for place in data.get('results', [])]
+        }
 
+    @classmethod
+    def _fallback_search(cls, query, location=None, radius=None):
+        """Fallback to the old Places API if new one fails"""
+        url, params = cls._fallback_search_request(query, location, radius)
         try:
-            response = requests.get(old_api_url, params=params)
+            response = http_client.get(url, params=params)
             response.raise_for_status()
-            data = response.json()
-
-            # Convert old API format to new API format
-            return {
-                'places': [{
-                    'displayName': {'text': place.get('name', '')},
-                    'formattedAddress': place.get('formatted_address', ''),
-                    'location': {
-                        'latitude': place['geometry']['location']['lat'],
-                        'longitude': place['geometry']['location']['lng']
-                    } if 'geometry' in place else None
-                } for place in data.get('results', [])]
-            }
+            return cls._convert_fallback_search(response.json())
         except Exception:
             return {'places': []}
 
@@ -208,31 +248,39 @@ class GooglePlacesService:
         if cached_result:
             return cached_result
 
+        data, _ = _places_flight.do(cache_key, cls._place_details_remote, cache_key, place_id)
+        return data
+
+    @classmethod
+    def _place_details_request(cls, place_id):
+        """Returns (url, headers) for a place details call."""
         headers = {
             'Content-Type': 'application/json',
             'X-Goog-Api-Key': settings.GOOGLE_API_KEY,
             'X-Goog-FieldMask': 'id,displayName,formattedAddress,location,rating,userRatingCount,'
                                 'photos,regularOpeningHours,websiteUri,addressComponents',
         }
+        return f"{cls.BASE_URL}/places/{place_id}", headers
 
+    @classmethod
+    def _place_details_remote(cls, cache_key, place_id):
+        """Calls the place details endpoint and caches a successful response. Returns (data, error)."""
+        url, headers = cls._place_details_request(place_id)
         try:
-            response = requests.get(
-                f"{cls.BASE_URL}/places/{place_id}",
-                headers=headers
-            )
+            response = http_client.get(url, headers=headers)
             response.raise_for_status()
             data = response.json()
 
             # Cache the successful response
             cache.set(cache_key, data, cls.CACHE_TIMEOUT)
-            return data
+            return data, None
 
-        except requests.exceptions.RequestException:
-            return cls._fallback_place_details(place_id)
+        except requests.exceptions.RequestException as e:
+            return cls._fallback_place_details(place_id), str(e)
 
     @classmethod
-    def _fallback_place_details(cls, place_id):
-        """Fallback to old Places Details API if new one fails"""
+    def _fallback_place_details_request(cls, place_id):
+        """Returns (url, params) for the old Place Details API."""
         old_api_url = "https://maps.googleapis.com/maps/api/place/details/json"
         params = {
             'key': settings.GOOGLE_API_KEY,
@@ -240,27 +288,107 @@ class GooglePlacesService:
             'fields': 'name,formatted_address,geometry,rating,user_ratings_total,'
                       'photos,opening_hours,website,address_components'
         }
+        return old_api_url, params
+
+    @staticmethod
+    def _convert_fallback_place_details(place_id, data):
+        """Converts an old Place Details 'result' to the new API format."""
+        return {
+            'id': place_id,
+            'displayName': {'text': data.get('name', '')},
+            'formattedAddress': data.get('formatted_address', ''),
+            'location': {
+                'latitude': data['geometry']['location']['lat'],
+                'longitude': data['geometry']['location']['lng']
+            } if 'geometry' in data else None,
+            'rating': data.get('rating'),
+            'userRatingCount': data.get('user_ratings_total'),
+            'photos': data.get('photos', []),
+            'regularOpeningHours': data.get('opening_hours', {}),
+            'websiteUri': data.get('website', ''),
+            'addressComponents': data.get('address_components', [])
+        }
 
+    @classmethod
+    def _fallback_place_details(cls, place_id):
+        """Fallback to old Places Details API if new one fails"""
+        url, params = cls._fallback_place_details_request(place_id)
         try:
-            response = requests.get(old_api_url, params=params)
+            response = http_client.get(url, params=params)
             response.raise_for_status()
-            data = response.json().get('result', {})
+            return cls._convert_fallback_place_details(place_id, response.json().get('result', {}))
+        except Exception:
+            return {}
 
-            # Convert old API format to new API format
-            return {
-                'id': place_id,
-                'displayName': {'text': data.get('name', '')},
-                'formattedAddress': data.get('formatted_address', ''),
-                'location': {
-                    'latitude': data['geometry']['location']['lat'],
-                    'longitude': data['geometry']['location']['lng']
-                } if 'geometry' in data else None,
-                'rating': data.get('rating'),
-                'userRatingCount': data.get('user_ratings_total'),
-                'photos': data.get('photos', []),
-                'regularOpeningHours': data.get('opening_hours', {}),
-                'websiteUri': data.get('website', ''),
-                'addressComponents': data.get('address_components', [])
-            }
+    # --- Async variants for the ASGI views: same requests and caching, sent via httpx ---
+
+    @classmethod
+    async def aautocomplete(cls, query, location=None, radius=None, include_query_predictions=False):
+        """Async counterpart of autocomplete()."""
+        cache_key = f"places_autocomplete:{query}:{location}:{radius}:{include_query_predictions}"
+        cached_result = await cache.aget(cache_key)
+        if cached_result:
+            return cached_result
+
+        url, headers, body = cls._autocomplete_request(query, location, radius, include_query_predictions)
+        fallback = cls._fallback_autocomplete_request(query, location, radius)
+        return await _async_places_flight.do(
+            cache_key, cls._async_remote, cache_key, 'POST', url, {'headers': headers, 'content': body},
+            fallback, cls._convert_fallback_autocomplete, {'suggestions': []},
+        )
+
+    @classmethod
+    async def asearch_places(cls, query, location=None, radius=None):
+        """Async counterpart of search_places()."""
+        cache_key = f"places_search:{query}:{location}:{radius}"
+        cached_result = await cache.aget(cache_key)
+        if cached_result:
+            return cached_result
+
+        url, headers, body = cls._search_request(query, location, radius)
+        fallback = cls._fallback_search_request(query, location, radius)
+        return await _async_places_flight.do(
+            cache_key, cls._async_remote, cache_key, 'POST', url, {'headers': headers, 'content': body},
+            fallback, cls._convert_fallback_search, {'places': []},
+        )
+
+    @classmethod
+    async def aget_place_details(cls, place_id):
+        """Async counterpart of get_place_details()."""
+        cache_key = f"place_details:{place_id}"
+        cached_result = await cache.aget(cache_key)
+        if cached_result:
+            return cached_result
+
+        url, headers = cls._place_details_request(place_id)
+        fallback = cls._fallback_place_details_request(place_id)
+        return await _async_places_flight.do(
+            cache_key, cls._async_remote, cache_key, 'GET', url, {'headers': headers},
+            fallback, lambda data: cls._convert_fallback_place_details(place_id, data.get('result', {})), {},
+        )
+
+    @classmethod
+    async def _async_remote(cls, cache_key, method, url, request_kwargs, fallback, convert_fallback, empty):
+        """
+        Calls the new Places API and caches a successful response; on failure
+        falls back to the old API (fallback is its (url, params)), converting
+        its response with convert_fallback or returning `empty`.
+        """
+        try:
+            response = await async_http.request(method, url, **request_kwargs)
+            response.raise_for_status()
+            data = response.json()
+
+            # Cache the successful response
+            await cache.aset(cache_key, data, cls.CACHE_TIMEOUT)
+            return data
+        except httpx.HTTPError:
+            pass
+
+        fallback_url, fallback_params = fallback
+        try:
+            response = await async_http.get(fallback_url, params=fallback_params)
+            response.raise_for_status()
+            return convert_fallback(response.json())
         except Exception:
-            return {}
\ No newline at end of file
+            return empty
@@ -0,0 +1,124 @@
+# api/services/prompts.py
+"""
+Prompts of the JSON generators, laid out for provider prompt caching.
+
+Providers cache the start of a prompt and bill those tokens at a discount,
+with a shorter time to first token: OpenAI and DeepSeek models do it on
+their own, while Anthropic and Gemini models behind OpenRouter need a
+cache_control breakpoint on the content to cache. Each generator therefore
+sends its instructions, schema and example as a system message that is
+identical on every call and puts the trip details in the user message after
+it. cached_messages() adds the breakpoint for the models that need one.
+Providers don't cache prefixes below a minimum length (about 1024 tokens for
+most of them). The cached_tokens column of the LLM call telemetry shows
+whether the prefix is being hit.
+
+Bump a prompt's version whenever its text changes. Each call records it
+(LLMCall.prompt_version), so hit rates and parse outcomes can be compared
+across versions, and the packing list cache doesn't serve lists made with an
+older prompt.
+"""
+
+# OpenRouter model prefixes that only cache content marked with cache_control
+CACHE_CONTROL_PREFIXES = ('anthropic/', 'google/gemini')
+
+PACKING_VERSION = 2
+
+PACKING_SYSTEM = """You are an expert travel assistant. Your sole task is to generate a packing list in a specific JSON format based on user-provided trip details, activities, and weather. Your output MUST be a single, valid JSON object conforming exactly to the structure below. Do not include any text outside of the JSON structure itself.
+
+**IMPORTANT INSTRUCTIONS:**
+1.  Your *entire* response MUST be **ONLY** a valid JSON object.
+2.  The JSON object must contain a single top-level key: "categories".
+3.  The "categories" value must be a list of category objects.
+4.  Each category object must have "name" (string) and "items" (list) keys.
+5.  Each item object must have "name" (string, required) and can optionally have "quantity" (integer, default 1), "essential" (boolean, default false), "notes" (string), "for_day" (string 'YYYY-MM-DD'). Mark essentials like passports/visas/meds as true.
+6.  **DO NOT** include *any* introductory text, concluding text, explanations, apologies, code comments (like // ...), or markdown formatting (like ```json ... ```) in your response.
+7.  The response **must** start directly with `{` and end directly with `}`. Your output should be parsable by Python's `json.loads()`.
+8.  Add other relevant categories like Electronics, Medications, Gear etc. based on the trip details.
+
+Example structure:
+{
+    "categories": [
+        {
+            "name": "Documents & Money",
+            "items": [
+                {"name": "Passport", "quantity": 1, "essential": true},
+                {"name": "Visa (if required)", "quantity": 1, "essential": true, "notes": "Check requirements for nationality"},
+                {"name": "Local Currency", "quantity": 1, "essential": true, "notes": "Some cash recommended"}
+            ]
+        },
+        {
+            "name": "Clothing",
+            "items": [
+                {"name": "T-shirts", "quantity": 4, "essential": false, "notes": "Breathable fabric"},
+                {"name": "Comfortable Walking Shoes", "quantity": 1, "essential": true}
+            ]
+        },
+        {
+            "name": "Toiletries",
+            "items": [
+                {"name": "Toothbrush", "quantity": 1, "essential": true},
+                {"name": "Sunscreen", "quantity": 1, "essential": false}
+            ]
+        }
+    ]
+}"""
+
+TIPS_VERSION = 3
+
+TIPS_SYSTEM = """You are a helpful travel assistant. Your task is to generate travel tips in JSON format based on the user's trip details and activities. Output ONLY the JSON object with categories: 'Cultural Advice', 'Local Information', 'Must Have Items'.
+
+The output MUST be a valid JSON object containing a single key "categories".
+The "categories" key should hold a list of category objects.
+Each category object should have a "name" (string) and an "items" (list) key.
+The "name" should be one of: "Cultural Advice", "Local Information", "Must Have Items".
+Each item object in the "items" list should have a single key:
+- "tip" (string, required): The text of the travel tip.
+Add other relevant tips based on destination/activities. Do not use bracketed placeholders like [Number].
+
+Example JSON structure:
+{
+    "categories": [
+        {
+            "name": "Cultural Advice",
+            "items": [
+                {"tip": "Learn a few basic local phrases like 'hello' and 'thank you'."},
+                {"tip": "Dress modestly when visiting religious sites."}
+            ]
+        },
+        {
+            "name": "Local Information",
+            "items": [
+                {"tip": "The local currency is the euro. Credit cards are widely accepted, but carry some cash."},
+                {"tip": "Public transport is efficient. Consider buying a multi-day pass."},
+                {"tip": "The emergency number is 112."}
+            ]
+        },
+        {
+            "name": "Must Have Items",
+            "items": [
+                {"tip": "Comfortable walking shoes are essential."},
+                {"tip": "A universal travel adapter if coming from abroad."},
+                {"tip": "Sunscreen and a hat, especially during summer months."}
+            ]
+        }
+    ]
+}"""
+
+
+def needs_cache_control(model):
+    return (model or '').lower().startswith(CACHE_CONTROL_PREFIXES)
+
+
+def cached_messages(model, system, user):
+    """
+    Chat messages with the static `system` prompt first, marked as a cache
+    breakpoint for models that need one, followed by the per-call `user` prompt.
+    """
+    if needs_cache_control(model):
+        system_message = {"role": "system", "content": [
+            {"type": "text", "text": system, "cache_control": {"type": "ephemeral"}},
+        ]}
+    else:
+        system_message = {"role": "system", "content": system}
+    return [system_message, {"role": "user", "content": user}]
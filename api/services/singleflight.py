@@ -0,0 +1,210 @@
+# api/services/singleflight.py
+"""
+Single-flight coalescing for expensive upstream calls.
+
+When several requests ask for the same thing at once, only one of them (the
+leader) calls the upstream service and the others wait for and share its
+result. Coalescing happens at two levels:
+
+* inside a process, with a per-key in-memory call record, and
+* across gunicorn workers, with a short-lived lock in the shared cache. A
+  worker that loses the lock polls for the leader's published result instead
+  of making its own call.
+"""
+
+import asyncio
+import hashlib
+import logging
+import threading
+import time
+import uuid
+import weakref
+
+from django.conf import settings
+from django.core.cache import caches
+
+logger = logging.getLogger(__name__)
+
+_MISSING = object()
+_registry = {}
+_registry_lock = threading.Lock()
+
+
+class _Call:
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls that share a key.
+
+    Args:
+        name (str): Identifies the flight in cache keys, logs and stats.
+        lock_timeout (float): Upper bound on how long a leader may hold the
+            cross-worker lock; should exceed the upstream call's own timeout.
+        result_ttl (float): How long a leader's result stays visible to
+            waiters in other workers.
+        share_if (callable, optional): Predicate deciding whether a result may
+            be published to other workers (e.g. skip error results).
+    """
+
+    def __init__(self, name, lock_timeout=30, result_ttl=10, share_if=None):
+        self.name = name
+        self.lock_timeout = lock_timeout
+        self.result_ttl = result_ttl
+        self.share_if = share_if
+        self._calls = {}
+        self._lock = threading.Lock()
+        self._counters = {'leader': 0, 'coalesced': 0, 'coalesced_remote': 0}
+        with _registry_lock:
+            _registry[name] = self
+
+    def do(self, key, fn, *args, **kwargs):
+        """Runs fn(*args, **kwargs) unless an identical call is already in flight."""
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = _Call()
+                self._calls[key] = call
+
+        if not leader:
+            call.event.wait()
+            self._count('coalesced')
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = self._lead(key, fn, args, kwargs)
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.event.set()
+
+    def stats(self):
+        """Returns a snapshot of this flight's counters."""
+        with self._lock:
+            return dict(self._counters)
+
+    def _count(self, counter):
+        with self._lock:
+            self._counters[counter] += 1
+
+    def _lead(self, key, fn, args, kwargs):
+        cache = _shared_cache()
+        digest = hashlib.sha1(str(key).encode('utf-8')).hexdigest()
+        lock_key = f"singleflight:{self.name}:{digest}:lock"
+        result_key = f"singleflight:{self.name}:{digest}:result"
+        token = uuid.uuid4().hex
+
+        acquired = False
+        if cache is not None:
+            try:
+                acquired = cache.add(lock_key, token, self.lock_timeout)
+            except Exception as e:
+                logger.warning(f"Single-flight lock unavailable for {self.name}: {e}")
+                cache = None
+
+            if cache is not None and not acquired:
+                shared = self._wait_for_remote(cache, lock_key, result_key)
+                if shared is not _MISSING:
+                    self._count('coalesced_remote')
+                    return shared
+                # The other worker failed or gave up; make the call ourselves.
+
+        self._count('leader')
+        try:
+            result = fn(*args, **kwargs)
+            if cache is not None and (self.share_if is None or self.share_if(result)):
+                try:
+                    cache.set(result_key, result, self.result_ttl)
+                except Exception as e:
+                    logger.warning(f"Could not publish single-flight result for {self.name}: {e}")
+            return result
+        finally:
+            if acquired:
+                try:
+                    if cache.get(lock_key) == token:
+                        cache.delete(lock_key)
+                except Exception:
+                    pass  # The lock expires on its own
+
+    def _wait_for_remote(self, cache, lock_key, result_key):
+        deadline = time.monotonic() + self.lock_timeout
+        delay = 0.05
+        while time.monotonic() < deadline:
+            try:
+                result = cache.get(result_key, _MISSING)
+                if result is not _MISSING:
+                    return result
+                if cache.get(lock_key) is None:
+                    # The leader finished without publishing; check once more for a late write
+                    return cache.get(result_key, _MISSING)
+            except Exception as e:
+                logger.warning(f"Single-flight wait failed for {self.name}: {e}")
+                return _MISSING
+            time.sleep(delay)
+            delay = min(delay * 2, 0.25)
+        logger.warning(f"Timed out waiting for another worker's {self.name} call; calling upstream directly.")
+        return _MISSING
+
+
+def _shared_cache():
+    alias = getattr(settings, 'SINGLEFLIGHT_CACHE_ALIAS', 'shared')
+    if not alias:
+        return None
+    try:
+        return caches[alias]
+    except Exception as e:
+        logger.warning(f"Single-flight cache alias '{alias}' unavailable: {e}")
+        return None
+
+
+def stats():
+    """Returns counters for every registered flight, keyed by flight name."""
+    with _registry_lock:
+        flights = list(_registry.values())
+    return {flight.name: flight.stats() for flight in flights}
+
+
+class AsyncSingleFlight:
+    """
+    Coalesces concurrent coroutine calls that share a key within one event loop.
+
+    The async views' counterpart of SingleFlight. Only in-process coalescing is
+    done: waiting on the cross-worker lock would mean polling the database
+    cache from the event loop.
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self._calls = weakref.WeakKeyDictionary()  # Event loop -> {key: task}
+        self._counters = {'leader': 0, 'coalesced': 0}
+        with _registry_lock:
+            _registry[name] = self
+
+    async def do(self, key, fn, *args, **kwargs):
+        """Awaits fn(*args, **kwargs) unless an identical call is already in flight."""
+        calls = self._calls.setdefault(asyncio.get_running_loop(), {})
+        task = calls.get(key)
+        if task is not None:
+            self._counters['coalesced'] += 1
+            # shield: one waiter being cancelled must not cancel the shared call
+            return await asyncio.shield(task)
+
+        self._counters['leader'] += 1
+        task = asyncio.ensure_future(fn(*args, **kwargs))
+        calls[key] = task
+        task.add_done_callback(lambda _: calls.pop(key, None))
+        return await asyncio.shield(task)
+
+    def stats(self):
+        return dict(self._counters)
@@ -0,0 +1,229 @@
+# api/services/telemetry.py
+"""
+Per-call telemetry for OpenRouter chat completions.
+
+Every LLM call runs inside track(), which records one LLMCall row: feature,
+model, latency, HTTP attempts (the OpenAI client retries on its own; the
+shared HTTP client counts each request through count_attempt), token usage,
+finish reason, prompt version and prompt tokens served from the provider's
+prompt cache (see prompts.py), how parsing the reply went and an estimated
+cost from the LLM_PRICES setting. Recording never interferes with the call
+itself.
+
+`manage.py llm_rollup` aggregates the rows into daily LLMCallRollup reports
+(latency percentiles, failure and truncation counts, tokens and cost). The
+recent latencies also set when hedged requests start (see hedging.py).
+"""
+
+import contextvars
+import logging
+import math
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from datetime import datetime, time as dt_time, timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from openai import APIConnectionError, APIStatusError, APITimeoutError
+
+logger = logging.getLogger(__name__)
+
+_current = contextvars.ContextVar('llm_call', default=None)
+
+
+class CallRecord:
+    """What track() has learned about the call in progress."""
+
+    def __init__(self, feature, model, max_tokens=None, streamed=False, prompt_version=''):
+        self.feature = feature
+        self.model = model or ''
+        self.max_tokens = max_tokens
+        self.streamed = streamed
+        self.prompt_version = str(prompt_version or '')
+        self.outcome = 'ok'
+        self.parse_outcome = ''
+        self.finish_reason = ''
+        self.attempts = 0
+        self.prompt_tokens = None
+        self.completion_tokens = None
+        self.cached_tokens = None
+
+    def completion(self, completion):
+        """Takes usage and finish reason from a completion (or a streamed chunk)."""
+        usage = getattr(completion, 'usage', None)
+        if usage is not None:
+            self.prompt_tokens = getattr(usage, 'prompt_tokens', None)
+            self.completion_tokens = getattr(usage, 'completion_tokens', None)
+            details = getattr(usage, 'prompt_tokens_details', None)
+            if details is not None:
+                self.cached_tokens = getattr(details, 'cached_tokens', None)
+        choices = getattr(completion, 'choices', None)
+        if isinstance(choices, list) and choices:
+            reason = getattr(choices[0], 'finish_reason', None)
+            if isinstance(reason, str):
+                self.finish_reason = reason
+        return completion
+
+    chunk = completion
+
+    def parsed(self, outcome):
+        """Records how extracting JSON from the reply went: 'ok', 'repaired' or 'failed'."""
+        self.parse_outcome = outcome
+
+
+def count_attempt(request):
+    """httpx request hook on the shared LLM HTTP client; counts retries of the current call."""
+    record = _current.get()
+    if record is not None:
+        record.attempts += 1
+
+
+def outcome_for(error):
+    from .hedging import Cancelled  # Late import: hedging uses this module
+    if isinstance(error, Cancelled):
+        return 'cancelled'
+    if isinstance(error, (APITimeoutError, TimeoutError)):
+        return 'timeout'
+    if isinstance(error, APIStatusError):
+        return 'rate_limited' if error.status_code == 429 else 'http_error'
+    if isinstance(error, (APIConnectionError, ConnectionError)):
+        return 'connection_error'
+    return 'error'
+
+
+def estimate_cost(model, prompt_tokens, completion_tokens, cached_tokens=None):
+    """
+    USD cost from LLM_PRICES ({model: (prompt, completion[, cached prompt]) USD
+    per million tokens}), or None. Without a cached price, cached prompt tokens
+    are charged as ordinary ones.
+    """
+    prices = getattr(settings, 'LLM_PRICES', {}).get(model)
+    if prices is None or prompt_tokens is None or completion_tokens is None:
+        return None
+    prompt_price, completion_price = Decimal(str(prices[0])), Decimal(str(prices[1]))
+    cached_price = Decimal(str(prices[2])) if len(prices) > 2 else prompt_price
+    cached_tokens = min(cached_tokens or 0, prompt_tokens)
+    return (prompt_price * (prompt_tokens - cached_tokens) + cached_price * cached_tokens
+            + completion_price * completion_tokens) / 1_000_000
+
+
+@contextmanager
+def track(feature, model, max_tokens=None, streamed=False, prompt_version=''):
+    """
+    Records the LLM call made inside the block. Yields a CallRecord; pass the
+    completion (or streamed chunks) to record.completion() and the parse
+    result to record.parsed().
+    """
+    record = CallRecord(feature, model, max_tokens, streamed, prompt_version)
+    token = _current.set(record)
+    started = time.monotonic()
+    try:
+        yield record
+    except BaseException as e:
+        if not isinstance(e, GeneratorExit):  # A client that stops reading a stream isn't a failure
+            record.outcome = outcome_for(e)
+        raise
+    finally:
+        try:
+            _current.reset(token)
+        except ValueError:
+            pass  # Stream finished in another context
+        _save(record, time.monotonic() - started)
+
+
+def _tokens(value):
+    return value if isinstance(value, int) else None
+
+
+def _save(record, elapsed):
+    if not getattr(settings, 'LLM_TELEMETRY_ENABLED', True):
+        return
+    from api.models import LLMCall  # Late import: llm.py imports this module before apps load (gunicorn post_fork)
+    try:
+        with transaction.atomic():  # A failed insert mustn't break the caller's transaction
+            LLMCall.objects.create(
+                feature=record.feature,
+                model=record.model[:100],
+                streamed=record.streamed,
+                prompt_version=record.prompt_version[:16],
+                outcome=record.outcome,
+                parse_outcome=record.parse_outcome,
+                finish_reason=(record.finish_reason or '')[:16],
+                latency_ms=int(elapsed * 1000),
+                attempts=max(record.attempts, 1),
+                max_tokens=record.max_tokens,
+                prompt_tokens=_tokens(record.prompt_tokens),
+                completion_tokens=_tokens(record.completion_tokens),
+                cached_tokens=_tokens(record.cached_tokens),
+                cost_usd=estimate_cost(record.model, _tokens(record.prompt_tokens), _tokens(record.completion_tokens),
+                                       _tokens(record.cached_tokens)),
+            )
+    except Exception as e:
+        logger.warning(f"Could not record LLM call telemetry for {record.feature}: {e}")
+
+
+def percentile(sorted_values, fraction):
+    """Nearest-rank percentile of an ascending list."""
+    if not sorted_values:
+        return 0
+    return sorted_values[max(0, math.ceil(fraction * len(sorted_values)) - 1)]
+
+
+def recent_latencies(feature, model, limit):
+    """Latencies (ms) of the feature's latest successful calls to the model, newest first."""
+    from api.models import LLMCall
+
+    calls = LLMCall.objects.filter(feature=feature, model=model, outcome='ok').order_by('-created_at')
+    return list(calls.values_list('latency_ms', flat=True)[:limit])
+
+
+def rollup(day):
+    """Rebuilds the LLMCallRollup rows for a day from its LLMCall rows. Returns how many were written."""
+    from api.models import LLMCall, LLMCallRollup
+
+    start = timezone.make_aware(datetime.combine(day, dt_time.min))
+    calls = LLMCall.objects.filter(created_at__gte=start, created_at__lt=start + timedelta(days=1))
+    groups = defaultdict(list)
+    for call in calls.only('feature', 'model', 'prompt_version', 'outcome', 'parse_outcome', 'finish_reason',
+                           'latency_ms', 'attempts', 'prompt_tokens', 'completion_tokens', 'cached_tokens',
+                           'cost_usd'):
+        groups[(call.feature, call.model, call.prompt_version)].append(call)
+
+    rows = []
+    for (feature, model, prompt_version), group in groups.items():
+        latencies = sorted(call.latency_ms for call in group)
+        rows.append(LLMCallRollup(
+            day=day, feature=feature, model=model, prompt_version=prompt_version,
+            calls=len(group),
+            failures=sum(call.outcome not in ('ok', 'cancelled') for call in group),
+            cancelled=sum(call.outcome == 'cancelled' for call in group),
+            timeouts=sum(call.outcome == 'timeout' for call in group),
+            parse_failures=sum(call.parse_outcome == 'failed' for call in group),
+            truncated=sum(call.finish_reason == 'length' for call in group),
+            retries=sum(call.attempts - 1 for call in group),
+            latency_p50_ms=percentile(latencies, 0.50),
+            latency_p95_ms=percentile(latencies, 0.95),
+            latency_p99_ms=percentile(latencies, 0.99),
+            prompt_tokens=sum(call.prompt_tokens or 0 for call in group),
+            completion_tokens=sum(call.completion_tokens or 0 for call in group),
+            cached_tokens=sum(call.cached_tokens or 0 for call in group),
+            max_completion_tokens=max(call.completion_tokens or 0 for call in group),
+            cost_usd=sum((call.cost_usd or Decimal(0) for call in group), Decimal(0)),
+        ))
+    with transaction.atomic():
+        LLMCallRollup.objects.filter(day=day).delete()
+        LLMCallRollup.objects.bulk_create(rows)
+    return len(groups)
+
+
+def prune(keep_days):
+    """Deletes LLMCall rows older than keep_days. Returns how many."""
+    from api.models import LLMCall
+
+    cutoff = timezone.now() - timedelta(days=keep_days)
+    deleted, _ = LLMCall.objects.filter(created_at__lt=cutoff).delete()
+    return deleted
+
@@ -0,0 +1,17 @@
+# api/services/trip_features.py
+"""
+Normalized trip features shared by the caches keyed on them: the packing list
+cache (packing_cache) and the travel tips corpus (tips.corpus).
+"""
+
+import re
+
+
+def normalize(text):
+    """Lowercased words without punctuation: ' Paris.' -> 'paris'."""
+    return " ".join(re.sub(r"[^\w\s]", " ", (text or "").lower()).split())
+
+
+def activity_set(activities):
+    """Activities (one per line or comma-separated) as a sorted, de-duplicated tuple."""
+    return tuple(sorted({normalize(a) for a in re.split(r"[\n,;]", activities or "") if normalize(a)}))
@@ -1,6 +1,8 @@
-import requests
 from django.conf import settings
 
+from . import http_client
+
+
 class WeatherService:
     BASE_URL = "https://api.openweathermap.org/data/2.5"
 
@@ -13,6 +15,6 @@ class WeatherService:
             'appid': settings.OWM_API_KEY,
             'units': 'metric'
         }
-        response = requests.get(f"{cls.BASE_URL}/forecast", params=params)
+        response = http_client.get(f"{cls.BASE_URL}/forecast", params=params)
         response.raise_for_status()
         return response.json()
\ No newline at end of file
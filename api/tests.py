@@ -1,13 +1,521 @@
-from django.test import TestCase
-from unittest.mock import patch
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+from unittest.mock import AsyncMock, patch
+import asyncio
+import hashlib
+import httpx
+import requests
+import threading
+import json
+import time
+from datetime import date
+
+from django.core.cache import caches
+from django.core.management import call_command
+from trips.models import Trip
+from .models import LLMCall, LLMCallRollup
+from .services import circuit, hedging, http_client, json_extract, llm, packing, packing_cache, prompts, telemetry
+from .services.ai import DeepSeekService
+from .services.json_stream import PackingItemParser
+from .services.packing import PackingListGenerator
+from .services.places import GooglePlacesService
+from .services.singleflight import AsyncSingleFlight, SingleFlight
 from .services.weather import WeatherService
 
 
 class WeatherAPITests(TestCase):
-    @patch('requests.get')
+    @patch('api.services.http_client.get')
     def test_get_forecast(self, mock_get):
         mock_get.return_value.status_code = 200
         mock_get.return_value.json.return_value = {'temp': 25}
 
         result = WeatherService.get_forecast(40.71, -74.01, '2023-12-01')
-        self.assertEqual(result['temp'], 25)
\ No newline at end of file
+        self.assertEqual(result['temp'], 25)
+
+
+class HttpClientTests(TestCase):
+    def tearDown(self):
+        http_client.reset()
+
+    def test_sessions_are_pooled_per_host(self):
+        radar = http_client.get_session('https://api.radar.io/v1/geocode/forward')
+        self.assertIs(radar, http_client.get_session('https://api.radar.io/v1/other'))
+        self.assertIsNot(radar, http_client.get_session('https://api.openweathermap.org/data/2.5'))
+
+    @override_settings(OUTBOUND_HTTP={'CONNECT_TIMEOUT': 1, 'READ_TIMEOUT': 2})
+    def test_timeout_is_always_set(self):
+        with patch('requests.Session.request') as mock_request:
+            http_client.get('https://api.radar.io/v1/geocode/forward')
+        self.assertEqual(mock_request.call_args.kwargs['timeout'], (1, 2))
+
+    def test_read_timeouts_not_retried(self):
+        retry = http_client.get_session('https://api.radar.io/').get_adapter('https://api.radar.io/').max_retries
+        self.assertEqual(retry.read, 0)
+        self.assertEqual((retry.connect, retry.status), (2, 2))
+        self.assertIn(503, retry.status_forcelist)
+
+
+@override_settings(OPENROUTER_API_KEY='key-a')
+class LLMClientTests(TestCase):
+    def tearDown(self):
+        llm.reset()
+
+    def test_clients_share_one_pool_per_base_url(self):
+        client = llm.get_client()
+        self.assertIs(client, llm.get_client(llm.base_url() + '/'))
+        other_key = llm.get_client(api_key='key-b')
+        self.assertIsNot(client, other_key)
+        self.assertIs(client._client, other_key._client)
+        self.assertIsNot(client._client, llm.get_client('https://example.com/v1')._client)
+
+    def test_interactive_calls_not_retried(self):
+        background = llm.get_client()
+        interactive = llm.get_client(interactive=True)
+        self.assertEqual((background.max_retries, interactive.max_retries), (2, 0))
+        self.assertIs(background._client, interactive._client)
+
+    def test_pools_rebuilt_after_fork(self):
+        client = llm.get_client()
+        with patch('api.services.llm.os.getpid', return_value=-1):
+            self.assertIsNot(client, llm.get_client())
+
+    def test_warmup_opens_the_shared_pool(self):
+        self.assertNotIn('https://openrouter.ai/', http_client.WARMUP_URLS)
+        pool = llm.get_client()._client
+        with patch.object(pool, 'head') as mock_head:
+            llm.warmup(background=False)
+        mock_head.assert_called_once()
+        self.assertEqual(mock_head.call_args.args[0], llm.base_url() + '/')
+
+    @override_settings(OPENROUTER_API_KEY=None)
+    def test_missing_api_key(self):
+        with self.assertRaises(ValueError):
+            llm.get_client()
+
+    @patch('api.services.llm.get_client')
+    def test_chat_completion_uses_shared_client(self, mock_get_client):
+        create = mock_get_client.return_value.chat.completions.create
+        create.return_value.error = None
+        create.return_value.choices[0].message.content = 'Bring an umbrella.'
+        self.assertEqual(DeepSeekService.chat_completion([{'role': 'user', 'content': 'Rain?'}]), 'Bring an umbrella.')
+        self.assertEqual(create.call_args.kwargs['model'], DeepSeekService.MODEL)
+
+
+@override_settings(SINGLEFLIGHT_CACHE_ALIAS='default')
+class SingleFlightTests(TestCase):
+    def test_concurrent_calls_share_one_upstream_call(self):
+        flight = SingleFlight('test_concurrent')
+        calls = []
+        start = threading.Barrier(5)
+
+        def slow_fetch():
+            calls.append(1)
+            time.sleep(0.2)
+            return {'temp': 21}
+
+        results = []
+
+        def worker():
+            start.wait()
+            results.append(flight.do('paris', slow_fetch))
+
+        threads = [threading.Thread(target=worker) for _ in range(5)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(results, [{'temp': 21}] * 5)
+        self.assertEqual(flight.stats(), {'leader': 1, 'coalesced': 4, 'coalesced_remote': 0})
+
+    def test_errors_are_not_remembered(self):
+        flight = SingleFlight('test_errors')
+
+        def failing():
+            raise ConnectionError("upstream down")
+
+        with self.assertRaises(ConnectionError):
+            flight.do('paris', failing)
+        self.assertEqual(flight.do('paris', lambda: 'ok'), 'ok')
+
+
+class AsyncSingleFlightTests(TestCase):
+    def test_concurrent_coroutines_share_one_call(self):
+        flight = AsyncSingleFlight('test_async')
+        calls = []
+
+        async def upstream(value):
+            calls.append(value)
+            await asyncio.sleep(0.05)
+            return value * 2
+
+        async def run():
+            return await asyncio.gather(*(flight.do('key', upstream, 21) for _ in range(5)))
+
+        self.assertEqual(asyncio.run(run()), [42] * 5)
+        self.assertEqual(calls, [21])
+        self.assertEqual(flight.stats(), {'leader': 1, 'coalesced': 4})
+
+
+@override_settings(GOOGLE_API_KEY='test-key', SINGLEFLIGHT_CACHE_ALIAS='default')
+class PlacesServiceTests(TestCase):
+    def published(self, cache_key):
+        digest = hashlib.sha1(cache_key.encode('utf-8')).hexdigest()
+        return caches['default'].get(f"singleflight:google_places:{digest}:result")
+
+    def setUp(self):
+        caches['default'].clear()
+
+    @patch('api.services.places.http_client.get', side_effect=requests.exceptions.ConnectionError())
+    @patch('api.services.places.http_client.post', side_effect=requests.exceptions.ConnectionError())
+    def test_fallback_results_not_shared_with_other_workers(self, mock_post, mock_get):
+        self.assertEqual(GooglePlacesService.search_places('louvre'), {'places': []})
+        self.assertIsNone(self.published('places_search:louvre:None:None'))
+
+    @patch('api.services.places.http_client.post')
+    def test_successful_results_shared(self, mock_post):
+        mock_post.return_value.json.return_value = {'places': [{'displayName': {'text': 'Louvre'}}]}
+        data = GooglePlacesService.search_places('louvre')
+        self.assertEqual(self.published('places_search:louvre:None:None'), (data, None))
+
+
+@override_settings(GOOGLE_API_KEY='test-key')
+class AsyncPlacesViewTests(TestCase):
+    def setUp(self):
+        User.objects.create_user('async-user', password='pw')
+
+    def test_requires_login(self):
+        response = self.client.get('/api/async/places/', {'q': 'louvre'})
+        self.assertEqual(response.status_code, 403)
+
+    @patch('api.services.places.async_http.request', new_callable=AsyncMock)
+    def test_place_search_matches_sync_format(self, mock_request):
+        mock_request.return_value = httpx.Response(
+            200,
+            json={'places': [{'displayName': {'text': 'Louvre'}, 'formattedAddress': 'Paris', 'location': {}}]},
+            request=httpx.Request('POST', 'https://places.googleapis.com/v1/places:searchText'),
+        )
+        self.client.login(username='async-user', password='pw')
+
+        response = self.client.get('/api/async/places/', {'q': 'louvre'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {
+            'results': [{'name': 'Louvre', 'formatted_address': 'Paris', 'location': {}}]
+        })
+        self.assertEqual(mock_request.call_args.args[:2], ('POST', 'https://places.googleapis.com/v1/places:searchText'))
+
+
+class CircuitBreakerTests(TestCase):
+    def make_breaker(self):
+        return circuit.CircuitBreaker('test', window=4, min_calls=4, failure_rate=0.5,
+                                      slow_call_seconds=1.0, open_seconds=60, half_open_probes=1)
+
+    def failed_call(self, breaker):
+        with self.assertRaises(requests.exceptions.ConnectionError):
+            with breaker.guard():
+                raise requests.exceptions.ConnectionError()
+
+    def test_opens_on_error_rate_and_fails_fast(self):
+        breaker = self.make_breaker()
+        for _ in range(2):
+            with breaker.guard():
+                pass
+        self.failed_call(breaker)
+        self.assertEqual(breaker.state, circuit.CLOSED)
+        self.failed_call(breaker)
+        self.assertEqual(breaker.state, circuit.OPEN)
+        with self.assertRaises(circuit.CircuitOpenError):
+            with breaker.guard():
+                pass
+
+    def test_half_open_probe_closes_circuit(self):
+        breaker = self.make_breaker()
+        for _ in range(4):
+            self.failed_call(breaker)
+        with patch('api.services.circuit.time.monotonic', return_value=time.monotonic() + 61):
+            self.assertEqual(breaker.state, circuit.HALF_OPEN)
+            self.assertTrue(breaker.allow())
+            self.assertFalse(breaker.allow())  # Only one probe at a time
+            breaker.record(False)
+            self.assertEqual(breaker.state, circuit.CLOSED)
+
+    def test_cancelled_probe_frees_its_slot(self):
+        breaker = self.make_breaker()
+        for _ in range(4):
+            self.failed_call(breaker)
+        with patch('api.services.circuit.time.monotonic', return_value=time.monotonic() + 61):
+            with self.assertRaises(asyncio.CancelledError):
+                with breaker.guard():
+                    raise asyncio.CancelledError()
+            self.assertEqual(breaker.state, circuit.HALF_OPEN)
+            self.assertTrue(breaker.allow())
+
+    def test_client_errors_do_not_count(self):
+        breaker = self.make_breaker()
+        response = requests.Response()
+        response.status_code = 404
+        for _ in range(4):
+            with self.assertRaises(requests.exceptions.HTTPError):
+                with breaker.guard():
+                    raise requests.exceptions.HTTPError(response=response)
+        self.assertEqual(breaker.state, circuit.CLOSED)
+
+
+
+class PackingCacheTests(TestCase):
+    SUMMARY = "Weather forecast for Paris: Average temperature around 16.2°C (feels like 15.0°C). Conditions mainly Rain. Possibility of precipitation (rain/snow). "
+
+    def setUp(self):
+        self.user = User.objects.create_user('packer', password='pw')
+        self.trip = Trip.objects.create(user=self.user, destination='Paris', date_leaving=date(2026, 5, 1),
+                                        date_returning=date(2026, 5, 4), activities='Museums\nwalking tours')
+        self.similar = Trip.objects.create(user=self.user, destination=' paris.', date_leaving=date(2026, 6, 10),
+                                           date_returning=date(2026, 6, 13), activities='walking tours, museums')
+
+    def test_fingerprint_normalizes_trip_features(self):
+        features = packing_cache.fingerprint(self.trip, self.SUMMARY, 'model', 1)
+        self.assertEqual(features, packing_cache.fingerprint(self.similar, self.SUMMARY, 'model', 1))
+        self.assertEqual(features['duration'], '<=4d')
+        self.assertEqual(features['activities'], ['museums', 'walking tours'])
+        self.assertEqual(features['weather'], 'mild-wet')
+        self.assertEqual(packing_cache.weather_bucket("Weather unavailable: no data"), 'unknown')
+
+    @override_settings(OPENROUTER_MODEL='primary')
+    @patch('api.services.packing.PackingListGenerator._generate_packing_list')
+    def test_similar_trip_served_from_cache(self, mock_generate):
+        mock_generate.return_value = json.dumps({'categories': [{'name': 'Clothing', 'items': [
+            {'name': 'Umbrella'}, {'name': 'Smart outfit', 'for_day': '2026-05-02'},
+        ]}]}), 'primary'
+        PackingListGenerator.generate_packing_list(self.trip, self.SUMMARY)
+        cached = json.loads(PackingListGenerator.generate_packing_list(self.similar, self.SUMMARY))
+
+        self.assertEqual(mock_generate.call_count, 1)
+        self.assertEqual(cached['categories'][0]['items'][1]['for_day'], '2026-06-11')
+
+        PackingListGenerator.generate_packing_list(self.similar, self.SUMMARY, force_fresh=True)
+        self.assertEqual(mock_generate.call_count, 2)
+        self.assertEqual(packing_cache.stats(), {'hits': 1, 'misses': 1, 'bypassed': 1, 'hit_rate': 0.5})
+
+    @patch('api.services.packing.PackingListGenerator._generate_packing_list', return_value=('{"error": "boom"}', None))
+    def test_errors_not_cached(self, mock_generate):
+        PackingListGenerator.generate_packing_list(self.trip, self.SUMMARY)
+        PackingListGenerator.generate_packing_list(self.trip, self.SUMMARY)
+        self.assertEqual(mock_generate.call_count, 2)
+
+    @override_settings(OPENROUTER_MODEL='primary')
+    @patch('api.services.packing.PackingListGenerator._generate_packing_list',
+           return_value=('{"categories": []}', 'backup'))
+    def test_fallback_answers_not_cached_for_primary(self, mock_generate):
+        PackingListGenerator.generate_packing_list(self.trip, self.SUMMARY)
+        PackingListGenerator.generate_packing_list(self.similar, self.SUMMARY)
+        self.assertEqual(mock_generate.call_count, 2)
+        features = packing_cache.fingerprint(self.trip, self.SUMMARY, 'backup', packing.PROMPT_VERSION)
+        self.assertIsNotNone(packing_cache.get(features, self.trip))
+
+    def test_metrics_are_staff_only(self):
+        self.client.login(username='packer', password='pw')
+        self.assertEqual(self.client.get('/api/metrics/').status_code, 403)
+        self.user.is_staff = True
+        self.user.save()
+        self.assertIn('packing_cache', self.client.get('/api/metrics/').json())
+
+
+class PackingItemParserTests(TestCase):
+    RAW = '```json\n{"categories": [{"name": "Clothing", "items": [{"name": "Rain \\"shell\\" {light}", "quantity": 1}, ' \
+          '{"name": "Socks", "quantity": 4, "notes": "wool, [thick]"}]}, {"items": [{"name": "Passport", "essential": true}]}]}\n```'
+
+    def test_items_emitted_as_they_complete(self):
+        parser = PackingItemParser()
+        items = []
+        for i in range(0, len(self.RAW), 3):  # Chunks split strings, escapes and keys
+            items.extend(parser.feed(self.RAW[i:i + 3]))
+        self.assertEqual(items, [
+            ('Clothing', {'name': 'Rain "shell" {light}', 'quantity': 1}),
+            ('Clothing', {'name': 'Socks', 'quantity': 4, 'notes': 'wool, [thick]'}),
+            ('Miscellaneous', {'name': 'Passport', 'essential': True}),
+        ])
+        self.assertEqual(parser.items_parsed, 3)
+
+    def test_item_available_before_list_finishes(self):
+        parser = PackingItemParser()
+        self.assertEqual(parser.feed('{"categories": [{"name": "Toiletries", "items": [{"name": "Toothbrush"}'),
+                         [('Toiletries', {'name': 'Toothbrush'})])
+        self.assertEqual(parser.feed(', {"name": "Sunscr'), [])
+
+
+
+class JSONExtractTests(TestCase):
+    def test_bare_object_parsed_directly(self):
+        data, text, repairs = json_extract.extract_object('{"categories": []}')
+        self.assertEqual((data, text, repairs), ({'categories': []}, '{"categories": []}', ()))
+
+    def test_fences_preamble_and_braces_in_strings(self):
+        raw = 'Here is your list:\n```json\n{"tips": [{"name": "Use {curly} \\"quotes\\"", "x": "a}b"}]}\n```\nEnjoy {trip}!'
+        data, _, repairs = json_extract.extract_object(raw)
+        self.assertEqual(data, {'tips': [{'name': 'Use {curly} "quotes"', 'x': 'a}b'}]})
+        self.assertEqual(repairs, ())
+
+    def test_trailing_commas_and_comments_removed(self):
+        raw = '{"categories": [{"name": "Clothing", "items": [{"name": "Hat",},],},\n  // Add other relevant categories\n]}'
+        data, _, repairs = json_extract.extract_object(raw)
+        self.assertEqual(data, {'categories': [{'name': 'Clothing', 'items': [{'name': 'Hat'}]}]})
+        self.assertEqual(repairs, ('comment', 'trailing_comma'))
+
+    def test_truncated_output_keeps_complete_items(self):
+        raw = '{"categories": [{"name": "Clothing", "items": [{"name": "Hat", "quantity": 1}, {"name": "Sock'
+        data, _, repairs = json_extract.extract_object(raw)
+        self.assertEqual(data, {'categories': [{'name': 'Clothing', 'items': [{'name': 'Hat', 'quantity': 1}]}]})
+        self.assertEqual(repairs, ('truncated',))
+
+        data, _, _ = json_extract.extract_object('{"categories": [{"name": "Clothing", "items": [{"name": "Hat"}')
+        self.assertEqual(data, {'categories': [{'name': 'Clothing', 'items': [{'name': 'Hat'}]}]})
+
+    def test_unrepairable_text_raises(self):
+        for raw in ('Sorry, I cannot help with that.', '{"categories": [nonsense]}'):
+            with self.assertRaises(json.JSONDecodeError):
+                json_extract.extract_object(raw)
+
+
+
+class HedgingTests(TestCase):
+    VALID = '{"categories": []}'
+
+    def setUp(self):
+        hedging._delays.clear()
+
+    def _slow(self, cancelled):
+        def attempt(model, cancel):
+            closed = threading.Event()
+            cancel.on_set(closed.set)  # Like closing a stalled stream
+            if closed.wait(5):
+                cancelled.set()
+                raise hedging.Cancelled(model)
+            return self.VALID
+        return attempt
+
+    @patch('api.services.hedging.hedge_delay', return_value=0.05)
+    def test_slow_model_hedged_and_loser_cancelled(self, mock_delay):
+        cancelled = threading.Event()
+        slow = self._slow(cancelled)
+
+        def attempt(model, cancel):
+            return slow(model, cancel) if model == 'primary' else '{"categories": ["fast"]}'
+
+        started = time.monotonic()
+        result = hedging.first_valid('packing_list', ['primary', 'secondary'], attempt, packing._is_success)
+        self.assertEqual(result, ('{"categories": ["fast"]}', 'secondary'))
+        self.assertLess(time.monotonic() - started, 2)
+        self.assertTrue(cancelled.wait(2))
+        self.assertEqual(telemetry.outcome_for(hedging.Cancelled()), 'cancelled')
+
+    @patch('api.services.hedging.hedge_delay', return_value=30)
+    def test_failed_model_falls_back_without_waiting(self, mock_delay):
+        def attempt(model, cancel):
+            if model == 'primary':
+                raise ConnectionError('boom')
+            if model == 'secondary':
+                return '{"error": "unparsable"}'
+            return self.VALID
+
+        started = time.monotonic()
+        self.assertEqual(hedging.first_valid('packing_list', ['primary', 'secondary', 'third'], attempt,
+                                             packing._is_success), (self.VALID, 'third'))
+        self.assertLess(time.monotonic() - started, 2)
+        self.assertEqual(hedging.first_valid('packing_list', ['primary', 'secondary'], attempt, packing._is_success),
+                         ('{"error": "unparsable"}', 'secondary'))
+
+    @override_settings(LLM_HEDGING={'FALLBACK_MODELS': ['backup', 'primary'], 'MIN_SAMPLES': 10, 'MAX_DELAY': 15})
+    def test_delay_from_recent_latencies(self):
+        self.assertEqual(hedging.model_chain('primary'), ['primary', 'backup'])
+        self.assertEqual(hedging.hedge_delay('packing_list', 'primary'), 10.0)  # Default until there are samples
+        hedging._delays.clear()
+        for latency in range(1000, 11000, 1000):
+            LLMCall.objects.create(feature='packing_list', model='primary', latency_ms=latency)
+        LLMCall.objects.create(feature='packing_list', model='primary', latency_ms=99000, outcome='timeout')
+        self.assertEqual(hedging.hedge_delay('packing_list', 'primary'), 9.0)
+
+
+@override_settings(OPENROUTER_API_KEY='key-a', LLM_PRICES={DeepSeekService.MODEL: (1.0, 4.0)})
+class LLMTelemetryTests(TestCase):
+    COMPLETION = {
+        'id': 'c1', 'object': 'chat.completion', 'created': 0, 'model': DeepSeekService.MODEL,
+        'choices': [{'index': 0, 'finish_reason': 'length', 'message': {'role': 'assistant', 'content': 'Bring layers.'}}],
+        'usage': {'prompt_tokens': 1000, 'completion_tokens': 500, 'total_tokens': 1500},
+    }
+
+    def tearDown(self):
+        llm.reset()
+
+    def _client_with(self, handler):
+        """Builds the shared client on a mock transport, keeping llm.py's hooks."""
+        def build(**kwargs):
+            kwargs.pop('limits')
+            return httpx.Client(transport=httpx.MockTransport(handler), **kwargs)
+        return patch('api.services.llm.DefaultHttpxClient', side_effect=build)
+
+    def test_call_recorded_with_usage_retries_and_cost(self):
+        responses = iter([
+            httpx.Response(429, json={'error': {'message': 'slow down'}}, headers={'retry-after-ms': '1'}),
+            httpx.Response(200, json=self.COMPLETION),
+        ])
+        with self._client_with(lambda request: next(responses)):
+            DeepSeekService.chat_completion([{'role': 'user', 'content': 'Cold?'}], feature='chat_summary',
+                                            interactive=False)
+
+        call = LLMCall.objects.get()
+        self.assertEqual((call.feature, call.outcome, call.attempts), ('chat_summary', 'ok', 2))
+        self.assertEqual((call.prompt_tokens, call.completion_tokens, call.finish_reason), (1000, 500, 'length'))
+        self.assertEqual(float(call.cost_usd), 0.003)
+
+    @override_settings(LLM_CLIENT={'MAX_RETRIES': 0})
+    def test_failures_recorded(self):
+        with self._client_with(lambda request: httpx.Response(500, json={'error': {'message': 'boom'}})):
+            with self.assertRaises(ConnectionError):
+                DeepSeekService.chat_completion([{'role': 'user', 'content': 'Hi'}])
+        self.assertEqual(LLMCall.objects.get().outcome, 'http_error')
+
+    def test_rollup_percentiles(self):
+        for latency in range(1, 101):
+            LLMCall.objects.create(feature='packing_list', model='m', latency_ms=latency, prompt_tokens=10,
+                                   completion_tokens=latency, parse_outcome='failed' if latency > 98 else 'ok')
+        call_command('llm_rollup', days=1, stdout=open('/dev/null', 'w'))
+        report = LLMCallRollup.objects.get()
+        self.assertEqual((report.calls, report.parse_failures), (100, 2))
+        self.assertEqual((report.latency_p50_ms, report.latency_p95_ms, report.latency_p99_ms), (50, 95, 99))
+        self.assertEqual((report.prompt_tokens, report.max_completion_tokens), (1000, 100))
+        self.assertEqual(telemetry.percentile([], 0.5), 0)
+
+
+    @override_settings(OPENROUTER_MODEL='google/gemini-2.5-flash-preview-09-2025', LLM_HEDGING={'FALLBACK_MODELS': []},
+                       LLM_PRICES={'google/gemini-2.5-flash-preview-09-2025': (1.0, 4.0, 0.25)})
+    def test_static_prompt_prefix_marked_for_caching(self):
+        user = User.objects.create_user('cacher', password='pw')
+        trips = [Trip.objects.create(user=user, destination=city, date_leaving=date(2026, 5, 1),
+                                     date_returning=date(2026, 5, 4)) for city in ('Oslo', 'Lima')]
+        chunk = {'id': 'c1', 'object': 'chat.completion.chunk', 'created': 0,
+                 'model': 'google/gemini-2.5-flash-preview-09-2025'}
+        stream = ''.join(f'data: {json.dumps(dict(chunk, **fields))}\n\n' for fields in (
+            {'choices': [{'index': 0, 'delta': {'content': '{"categories": []}'}, 'finish_reason': 'stop'}]},
+            {'choices': [], 'usage': {'prompt_tokens': 1000, 'completion_tokens': 500, 'total_tokens': 1500,
+                                      'prompt_tokens_details': {'cached_tokens': 800}}},
+        )) + 'data: [DONE]\n\n'
+        requests_sent = []
+
+        def handler(request):
+            requests_sent.append(json.loads(request.content))
+            return httpx.Response(200, text=stream, headers={'content-type': 'text/event-stream'})
+
+        with self._client_with(handler):
+            for trip in trips:
+                PackingListGenerator._generate_packing_list(trip, 'Mild')
+
+        system, user_message = requests_sent[0]['messages']
+        self.assertEqual(system['content'][0]['cache_control'], {'type': 'ephemeral'})
+        self.assertEqual(requests_sent[1]['messages'][0], system)  # Identical prefix for every trip
+        self.assertIn('Oslo', user_message['content'])
+        call = LLMCall.objects.first()
+        self.assertEqual((call.prompt_version, call.cached_tokens), ('2', 800))
+        self.assertEqual(float(call.cost_usd), (200 * 1.0 + 800 * 0.25 + 500 * 4.0) / 1_000_000)
+        self.assertEqual(prompts.cached_messages('deepseek/deepseek-chat', 'Static', 'Trip')[0],
+                         {'role': 'system', 'content': 'Static'})
@@ -1,5 +1,5 @@
 from django.urls import path
-from . import views
+from . import async_views, views
 
 app_name = 'api'
 urlpatterns = [
@@ -7,5 +7,10 @@ urlpatterns = [
     path('places/', views.place_search, name='places_api'),
     path('places/autocomplete/', views.place_autocomplete, name='places_autocomplete'),
     path('places/<str:place_id>/', views.place_details, name='place_details'),
+    # Async (ASGI) versions of the places endpoints
+    path('async/places/', async_views.place_search, name='places_api_async'),
+    path('async/places/autocomplete/', async_views.place_autocomplete, name='places_autocomplete_async'),
+    path('async/places/<str:place_id>/', async_views.place_details, name='place_details_async'),
     path('chat/', views.chatbot, name='chatbot_api'),
+    path('metrics/', views.service_metrics, name='service_metrics'),
 ]
\ No newline at end of file
@@ -1,8 +1,9 @@
-from rest_framework.decorators import api_view
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.permissions import IsAdminUser
 from rest_framework.response import Response
 from rest_framework.decorators import throttle_classes
 from rest_framework.throttling import UserRateThrottle, AnonRateThrottle
-from .services import weather
+from .services import circuit, packing_cache, singleflight, weather
 from .services.places import GooglePlacesService
 from .services.ai import DeepSeekService
 from django.views.decorators.cache import cache_page
@@ -23,6 +24,44 @@ def weather_forecast(request):
     return Response(data)
 
 
+def _user_location(request):
+    """The user's approximate "lat,lng" from their profile, used to bias place results."""
+    if request.user.is_authenticated and hasattr(request.user, 'profile'):
+        profile = request.user.profile
+        if profile.location_lat and profile.location_lng:
+            return f"{profile.location_lat},{profile.location_lng}"
+    return None
+
+
+def _format_place_results(data):
+    # Format results consistently
+    results = []
+    for place in data.get('places', [])[:8]:  # Use new API format
+        results.append({
+            'name': place.get('displayName', {}).get('text', ''),
+            'formatted_address': place.get('formattedAddress', ''),
+            'location': place.get('location', {})
+        })
+    return results
+
+
+def _format_autocomplete_suggestions(data):
+    suggestions = []
+    for suggestion in data.get('suggestions', []):
+        if 'placePrediction' in suggestion:
+            suggestions.append({
+                'type': 'place',
+                'text': suggestion['placePrediction']['text']['text'],
+                'place_id': suggestion['placePrediction']['placeId']
+            })
+        elif 'queryPrediction' in suggestion:
+            suggestions.append({
+                'type': 'query',
+                'text': suggestion['queryPrediction']['text']['text']
+            })
+    return suggestions
+
+
 @api_view(['GET'])
 @cache_page(60 * 15)
 @throttle_classes([UserRateThrottle, AnonRateThrottle])
@@ -33,25 +72,12 @@ def place_search(request):
 
     try:
         # Get user's approximate location if available
-        location = None
-        if request.user.is_authenticated and hasattr(request.user, 'profile'):
-            profile = request.user.profile
-            if profile.location_lat and profile.location_lng:
-                location = f"{profile.location_lat},{profile.location_lng}"
+        location = _user_location(request)
 
         # Get places from Google
         data = GooglePlacesService.search_places(query, location)
 
-        # Format results consistently
-        results = []
-        for place in data.get('places', [])[:8]:  # Use new API format
-            results.append({
-                'name': place.get('displayName', {}).get('text', ''),
-                'formatted_address': place.get('formattedAddress', ''),
-                'location': place.get('location', {})
-            })
-
-        return Response({'results': results})
+        return Response({'results': _format_place_results(data)})
     except Exception as e:
         return Response({'error': str(e)}, status=500)
 
@@ -69,29 +95,10 @@ def place_autocomplete(request):
         if not settings.GOOGLE_API_KEY:
             return Response({'error': 'API key not configured'}, status=500)
 
-        location = None
-        if request.user.is_authenticated and hasattr(request.user, 'profile'):
-            profile = request.user.profile
-            if profile.location_lat and profile.location_lng:
-                location = f"{profile.location_lat},{profile.location_lng}"
+        location = _user_location(request)
 
         data = GooglePlacesService.autocomplete(query, location)
-        suggestions = []
-
-        for suggestion in data.get('suggestions', []):
-            if 'placePrediction' in suggestion:
-                suggestions.append({
-                    'type': 'place',
-                    'text': suggestion['placePrediction']['text']['text'],
-                    'place_id': suggestion['placePrediction']['placeId']
-                })
-            elif 'queryPrediction' in suggestion:
-                suggestions.append({
-                    'type': 'query',
-                    'text': suggestion['queryPrediction']['text']['text']
-                })
-
-        return Response({'suggestions': suggestions})
+        return Response({'suggestions': _format_autocomplete_suggestions(data)})
     except Exception as e:
         return Response({'error': str(e)}, status=500)
 
@@ -137,3 +144,14 @@ def generate_packing_list(request, trip_id):
         return Response(packing_data)
     except Exception as e:
         return Response({'error': str(e)}, status=400)
+
+
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def service_metrics(request):
+    """Cache hit rates, single-flight counters and circuit breaker states (staff only)."""
+    return Response({
+        'packing_cache': packing_cache.stats(),
+        'singleflight': singleflight.stats(),
+        'circuits': circuit.states(),
+    })
@@ -0,0 +1,114 @@
+"""
+Concurrent-request throughput of the sync (WSGI) vs async (ASGI) upstream views.
+
+Start the app twice with the same number of workers and the benchmark
+settings, which turn off the API throttles and the caches (cache_page and the
+service caches) so that every request waits on the upstream:
+
+    export DJANGO_SETTINGS_MODULE=benchmarks.settings
+    gunicorn TravelMate.wsgi:application -w 2 -b 127.0.0.1:8001
+    gunicorn TravelMate.asgi:application -w 2 -k uvicorn.workers.UvicornWorker -b 127.0.0.1:8002
+
+then compare the sync endpoints on the WSGI server with their async versions
+on the ASGI server:
+
+    python benchmarks/async_views.py --wsgi http://127.0.0.1:8001 --asgi http://127.0.0.1:8002 \\
+        --sessionid <session cookie> --concurrency 200 --requests 2000
+
+Each request asks for something different (the places query gets a per-run,
+per-request suffix and the weather requests cycle through the gazetteer's
+cities), so concurrent requests aren't coalesced into one upstream call
+either. Check the status column: throughput only compares like with like if
+both servers answered (almost) everything with 200.
+"""
+
+import argparse
+import asyncio
+import csv
+import os
+import statistics
+import time
+import uuid
+from collections import Counter
+
+import httpx
+
+CITIES_CSV = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'weather', 'data', 'cities.csv')
+
+# (label, sync path, async path)
+ENDPOINTS = [
+    ('weather', '/weather/api/weather/', '/weather/api/async/weather/'),
+    ('places search', '/api/places/', '/api/async/places/'),
+    ('places autocomplete', '/api/places/autocomplete/', '/api/async/places/autocomplete/'),
+]
+
+
+def _cities():
+    with open(CITIES_CSV, newline='', encoding='utf-8') as f:
+        return [f"{row['name']}, {row['country']}" for row in csv.DictReader(f)]
+
+
+async def _run(base_url, path, params_for, cookies, concurrency, total):
+    """params_for(n) gives the query parameters of the n-th request."""
+    latencies = []
+    statuses = Counter()
+    semaphore = asyncio.Semaphore(concurrency)
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    async with httpx.AsyncClient(base_url=base_url, cookies=cookies, limits=limits, timeout=60) as client:
+        async def one(n):
+            async with semaphore:
+                started = time.perf_counter()
+                try:
+                    response = await client.get(path, params=params_for(n))
+                    statuses[str(response.status_code)] += 1
+                except httpx.HTTPError as e:
+                    statuses[type(e).__name__] += 1
+                latencies.append(time.perf_counter() - started)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(one(n) for n in range(total)))
+        elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        'rps': total / elapsed,
+        'p50': statistics.median(latencies) * 1000,
+        'p95': latencies[int(len(latencies) * 0.95) - 1] * 1000,
+        'errors': total - statuses['200'],
+        'statuses': statuses,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--wsgi', required=True, help="Base URL of the WSGI server")
+    parser.add_argument('--asgi', required=True, help="Base URL of the ASGI server")
+    parser.add_argument('--sessionid', default='', help="Session cookie of a logged-in user (places endpoints)")
+    parser.add_argument('--concurrency', type=int, default=100)
+    parser.add_argument('--requests', type=int, default=1000)
+    parser.add_argument('--query', default='museum', help="Places query, suffixed per request")
+    args = parser.parse_args()
+
+    cities = _cities()
+    today = time.strftime('%Y-%m-%d')
+    cookies = {'sessionid': args.sessionid} if args.sessionid else None
+
+    print(f"{'endpoint':<22}{'server':<7}{'req/s':>9}{'p50 ms':>9}{'p95 ms':>9}{'errors':>8}  statuses")
+    for label, sync_path, async_path in ENDPOINTS:
+        for server, base_url, path in (('wsgi', args.wsgi, sync_path), ('asgi', args.asgi, async_path)):
+            run = uuid.uuid4().hex[:6]  # Fresh queries for every run, even against a warm server
+            params_for = {
+                'weather': lambda n: {'city': cities[n % len(cities)], 'start_date': today, 'end_date': today,
+                                      'resolution': 'daily'},
+                'places search': lambda n: {'q': f"{args.query} {run}{n}"},
+                'places autocomplete': lambda n: {'q': f"{args.query} {run}{n}"},
+            }[label]
+            result = asyncio.run(_run(base_url, path, params_for, cookies, args.concurrency, args.requests))
+            statuses = " ".join(f"{status}:{count}" for status, count in sorted(result['statuses'].items()))
+            print(f"{label:<22}{server:<7}{result['rps']:>9.1f}{result['p50']:>9.1f}{result['p95']:>9.1f}"
+                  f"{result['errors']:>8}  {statuses}")
+
+
+if __name__ == '__main__':
+    main()
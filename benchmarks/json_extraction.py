@@ -0,0 +1,112 @@
+"""
+JSON extraction from LLM replies: the old fence-regex / find-rfind approach vs
+api.services.json_extract.
+
+Runs both over a corpus of replies (one JSON object per line with "kind" and
+"response"; benchmarks/data/llm_responses.jsonl has clean, fenced, preamble,
+trailing-comma, commented, truncated and non-JSON replies) and reports, per
+kind, how many replies each approach parsed into a packing list and the mean
+time per reply:
+
+    python benchmarks/json_extraction.py
+    python benchmarks/json_extraction.py --corpus my_responses.jsonl --repeat 2000
+
+--scale N repeats each reply's category list N times to check that the time
+grows linearly with the reply length.
+"""
+
+import argparse
+import json
+import os
+import re
+import sys
+import time
+from collections import defaultdict
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from api.services import json_extract  # noqa: E402
+
+DEFAULT_CORPUS = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'llm_responses.jsonl')
+
+
+def old_extract(content):
+    """The extraction PackingListGenerator used before json_extract."""
+    content = content.strip()
+    match = re.search(r"```(?:json)?\s*(\{.*?\})\s*```", content, re.DOTALL | re.IGNORECASE)
+    if match:
+        content = match.group(1).strip()
+    else:
+        json_start = content.find('{')
+        json_end = content.rfind('}')
+        if json_start != -1 and json_end != -1 and json_start < json_end:
+            content = content[json_start:json_end + 1]
+    return json.loads(content)
+
+
+def new_extract(content):
+    return json_extract.extract_object(content)[0]
+
+
+def _is_packing_list(data):
+    return isinstance(data, dict) and isinstance(data.get('categories'), list) and bool(data['categories'])
+
+
+def _scaled(response, scale):
+    """Repeats the category list `scale` times (clean replies only)."""
+    if scale == 1:
+        return response
+    try:
+        data = json.loads(response)
+    except ValueError:
+        return response
+    data['categories'] = data['categories'] * scale
+    return json.dumps(data, indent=2)
+
+
+def _measure(extract, response, repeat):
+    try:
+        ok = _is_packing_list(extract(response))
+    except ValueError:
+        ok = False
+    started = time.perf_counter()
+    for _ in range(repeat):
+        try:
+            extract(response)
+        except ValueError:
+            pass
+    return ok, (time.perf_counter() - started) / repeat * 1_000_000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--corpus', default=DEFAULT_CORPUS, help="JSONL file of recorded replies")
+    parser.add_argument('--repeat', type=int, default=500, help="Timed runs per reply")
+    parser.add_argument('--scale', type=int, default=1, help="Repeat clean replies' categories this many times")
+    args = parser.parse_args()
+
+    with open(args.corpus, encoding='utf-8') as f:
+        corpus = [json.loads(line) for line in f if line.strip()]
+
+    # kind -> approach -> [replies, parsed, total microseconds]
+    results = defaultdict(lambda: {'old': [0, 0, 0.0], 'new': [0, 0, 0.0]})
+    for entry in corpus:
+        response = _scaled(entry['response'], args.scale)
+        for approach, extract in (('old', old_extract), ('new', new_extract)):
+            ok, micros = _measure(extract, response, args.repeat)
+            totals = results[entry['kind']][approach]
+            totals[0] += 1
+            totals[1] += ok
+            totals[2] += micros
+
+    print(f"{'kind':<16}{'replies':>8}{'old parsed':>12}{'new parsed':>12}{'old µs':>10}{'new µs':>10}")
+    for kind, by_approach in results.items():
+        old, new = by_approach['old'], by_approach['new']
+        print(f"{kind:<16}{old[0]:>8}{old[1]:>12}{new[1]:>12}{old[2] / old[0]:>10.1f}{new[2] / new[0]:>10.1f}")
+    old = [sum(r['old'][i] for r in results.values()) for i in range(3)]
+    new = [sum(r['new'][i] for r in results.values()) for i in range(3)]
+    print(f"{'total':<16}{old[0]:>8}{old[1]:>12}{new[1]:>12}{old[2] / old[0]:>10.1f}{new[2] / new[0]:>10.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,18 @@
+"""
+Settings for the servers under benchmarks/async_views.py.
+
+Every request has to reach the upstream for the sync/async comparison to mean
+anything, so this turns off what would otherwise answer it locally: the DRF
+user/anon throttles (100/hour would make most async responses 429s), and the
+caches behind cache_page and the places, geocode and forecast services.
+"""
+
+from TravelMate.settings import *  # noqa: F401,F403
+from TravelMate.settings import CACHES, REST_FRAMEWORK
+
+CACHES = {alias: {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'} for alias in CACHES}
+
+REST_FRAMEWORK = {
+    **REST_FRAMEWORK,
+    'DEFAULT_THROTTLE_RATES': {scope: None for scope in REST_FRAMEWORK['DEFAULT_THROTTLE_RATES']},
+}
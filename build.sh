@@ -12,6 +12,8 @@ pip install -r requirements.txt
 echo "🗄️  Running database migrations..."
 python manage.py makemigrations --noinput
 python manage.py migrate --noinput
+python manage.py createcachetable
+python manage.py build_gazetteer
 
 # Create superuser if it doesn't exist (optional)
 echo "👤 Creating superuser..."
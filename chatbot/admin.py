@@ -1,3 +1,9 @@
 from django.contrib import admin
 
-# Register your models here.
+from .models import ConversationSummary
+
+
+@admin.register(ConversationSummary)
+class ConversationSummaryAdmin(admin.ModelAdmin):
+    list_display = ('trip', 'message_count', 'last_message_id', 'updated_at')
+    search_fields = ('trip__destination', 'summary')
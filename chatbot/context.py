@@ -0,0 +1,151 @@
+# chatbot/context.py
+"""
+Conversation context for the trip chatbot.
+
+Each prompt carries the most recent messages verbatim, newest first, until
+CHAT_CONTEXT['HISTORY_TOKENS'] is used up. Messages that have dropped out of
+that window are folded into a per-trip rolling summary (ConversationSummary)
+by a background 'chat_summary' job, a few at a time, so the prompt stays
+roughly the same size however long the conversation gets and no request
+waits for a summarization call.
+
+Token counts are estimated from text length (about four characters per
+token), which is close enough for budgeting.
+"""
+
+import logging
+
+from django.conf import settings
+
+from api.services.ai import DeepSeekService
+from jobs.queue import enqueue
+from .models import ChatMessage, ConversationSummary
+
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {
+    'HISTORY_TOKENS': 1500,     # Budget for recent messages sent verbatim
+    'MESSAGE_TOKENS': 400,      # Longer messages are truncated in the context
+    'SUMMARY_TOKENS': 300,      # Maximum length of the rolling summary
+    'SUMMARIZE_AFTER': 4,       # Messages outside the window before the summary is updated
+}
+
+CHARS_PER_TOKEN = 4
+
+SYSTEM_PROMPT = "You are a travel planning assistant"
+
+
+def option(name):
+    return getattr(settings, 'CHAT_CONTEXT', {}).get(name, DEFAULTS[name])
+
+
+def estimate_tokens(text):
+    return len(text or '') // CHARS_PER_TOKEN + 1
+
+
+def _truncate(text, tokens):
+    limit = tokens * CHARS_PER_TOKEN
+    return text if len(text) <= limit else text[:limit].rstrip() + " ..."
+
+
+def _turn(message):
+    return {
+        'role': 'user' if message.is_user_message else 'assistant',
+        'content': _truncate(message.message, option('MESSAGE_TOKENS')),
+    }
+
+
+def split_history(trip):
+    """
+    Returns (summary, older, recent): the trip's ConversationSummary (or None),
+    unsummarized messages that no longer fit the history budget (oldest first),
+    and the messages that do (oldest first).
+    """
+    summary = ConversationSummary.objects.filter(trip=trip).first()
+    last_summarized = summary.last_message_id if summary else 0
+    messages = list(ChatMessage.objects.filter(trip=trip, id__gt=last_summarized).order_by('-id'))
+
+    budget = option('HISTORY_TOKENS')
+    recent = []
+    for message in messages:
+        tokens = estimate_tokens(_turn(message)['content'])
+        if tokens > budget:
+            break
+        budget -= tokens
+        recent.append(message)
+    older = messages[len(recent):]
+    return summary, older[::-1], recent[::-1]
+
+
+def _trip_context(trip, user_message):
+    return f"""
+        Trip Context:
+        - Destination: {trip.destination}
+        - Dates: {trip.date_leaving} to {trip.date_returning}
+        - Activities: {trip.activities or 'Not specified'}
+        - User's question: {user_message}
+        
+        You are TravelMate AI, a helpful travel assistant. 
+        Provide specific, actionable advice based on the trip details.
+        """
+
+
+def build_messages(trip, user, user_message):
+    """
+    The messages sent to the model for a new question: system prompt, the
+    rolling summary of older turns, recent turns within the token budget and
+    the question with the trip details. Queues a summary update when enough
+    messages have fallen out of the window.
+    """
+    summary, older, recent = split_history(trip)
+    messages = [{"role": "system", "content": SYSTEM_PROMPT}]
+    if summary and summary.summary:
+        messages.append({"role": "system", "content": f"Summary of the earlier conversation: {summary.summary}"})
+    messages.extend(_turn(message) for message in recent)
+    messages.append({"role": "user", "content": _trip_context(trip, user_message)})
+
+    if len(older) >= option('SUMMARIZE_AFTER'):
+        enqueue('chat_summary', trip, user)
+    return messages
+
+
+def update_summary(trip):
+    """
+    Folds the messages that have fallen out of the history window into the
+    trip's rolling summary. Returns the number of messages folded in.
+    """
+    summary, older, _ = split_history(trip)
+    if not older:
+        return 0
+    if summary is None:
+        summary = ConversationSummary(trip=trip)
+
+    transcript = "\n".join(f"{turn['role'].capitalize()}: {turn['content']}" for turn in map(_turn, older))
+    max_tokens = option('SUMMARY_TOKENS')
+    prompt = (
+        f"Summary of the conversation so far:\n{summary.summary or '(none)'}\n\n"
+        f"New messages:\n{transcript}\n\n"
+        f"Update the summary to include the new messages. Keep the traveller's plans, preferences, "
+        f"constraints and any advice already given. Reply with the summary only, in under {max_tokens * 3 // 4} words."
+    )
+    text = DeepSeekService.chat_completion(
+        [
+            {"role": "system", "content": "You summarize conversations between a traveller and a travel assistant."},
+            {"role": "user", "content": prompt},
+        ],
+        temperature=0.2,
+        max_tokens=max_tokens,
+        feature='chat_summary',
+        interactive=False,  # Runs as a background job
+    )
+    summary.summary = _truncate(text.strip(), max_tokens)
+    summary.last_message_id = older[-1].id
+    summary.message_count += len(older)
+    summary.save()
+    logger.info(f"Folded {len(older)} chat messages into the summary for trip {trip.id}")
+    return len(older)
+
+
+def run_job(job):
+    """Job handler for 'chat_summary' jobs (see jobs.queue)."""
+    return {'messages': update_summary(job.trip)}
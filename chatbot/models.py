@@ -14,4 +14,18 @@ class ChatMessage(models.Model):
         ordering = ['timestamp']
 
     def __str__(self):
-        return f"{self.user.username} - {self.trip.destination}"
\ No newline at end of file
+        return f"{self.user.username} - {self.trip.destination}"
+
+class ConversationSummary(models.Model):
+    """
+    Rolling summary of a trip's older chat messages, so prompts carry the gist
+    of the conversation without resending all of it. See chatbot/context.py.
+    """
+    trip = models.OneToOneField(Trip, on_delete=models.CASCADE, related_name='conversation_summary')
+    summary = models.TextField(blank=True)
+    last_message_id = models.BigIntegerField(default=0)  # Newest ChatMessage folded into the summary
+    message_count = models.PositiveIntegerField(default=0)  # Messages folded in so far
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Conversation summary for {self.trip.destination} ({self.message_count} messages)"
@@ -1,7 +1,15 @@
-from django.test import TestCase
+import json
+from unittest.mock import patch
+
+from django.test import TestCase, override_settings
 from django.contrib.auth.models import User
+from rest_framework.test import APIRequestFactory, force_authenticate
 from trips.models import Trip
-from .models import ChatMessage
+from jobs import queue
+from jobs.models import Job
+from . import context
+from .models import ChatMessage, ConversationSummary
+from .views import chat
 
 
 class ChatbotTests(TestCase):
@@ -21,4 +29,74 @@ class ChatbotTests(TestCase):
             message="Test",
             response="Test response"
         )
-        self.assertEqual(str(msg), "testuser - Paris")
\ No newline at end of file
+        self.assertEqual(str(msg), "testuser - Paris")
+
+class ChatStreamTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='streamer', password='12345')
+        self.trip = Trip.objects.create(user=self.user, destination="Lisbon", date_leaving="2026-05-01", date_returning="2026-05-05")
+        self.client.login(username='streamer', password='12345')
+        self.url = f'/trips/{self.trip.id}/chat/stream/'
+
+    def _post(self, message):
+        response = self.client.post(self.url, json.dumps({'message': message}), content_type='application/json')
+        return response, b''.join(response.streaming_content).decode()
+
+    @patch('chatbot.views.DeepSeekService.stream_chat_completion', return_value=iter(['Pack ', 'a jacket.']))
+    def test_reply_streamed_then_saved(self, mock_stream):
+        response, body = self._post('What should I wear?')
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        self.assertIn('data: {"delta": "Pack "}', body)
+        reply = ChatMessage.objects.get(trip=self.trip, is_user_message=False)
+        self.assertEqual(reply.message, 'Pack a jacket.')
+        self.assertIn(f'event: done\ndata: {{"id": {reply.id}}}', body)
+        self.assertTrue(ChatMessage.objects.filter(message='What should I wear?', is_user_message=True).exists())
+
+    @patch('chatbot.views.DeepSeekService.stream_chat_completion', side_effect=TimeoutError("The request to the AI service timed out."))
+    def test_failure_ends_with_error_event(self, mock_stream):
+        response, body = self._post('Hello?')
+        self.assertIn('event: error', body)
+        self.assertFalse(ChatMessage.objects.filter(is_user_message=False).exists())
+
+    @patch('chatbot.views.DeepSeekService.chat_completion', return_value='Bring sunscreen.')
+    def test_non_streaming_chat_saves_reply_text(self, mock_completion):
+        # trips/<id>/ is matched by the trip dashboard first, so call the view directly
+        request = APIRequestFactory().post('/', {'message': 'Sun?'}, format='json')
+        force_authenticate(request, user=self.user)
+        response = chat(request, trip_id=self.trip.id)
+        self.assertEqual(response.data, {'response': 'Bring sunscreen.'})
+        self.assertTrue(ChatMessage.objects.filter(message='Bring sunscreen.', is_user_message=False).exists())
+
+
+@override_settings(CHAT_CONTEXT={'HISTORY_TOKENS': 25, 'SUMMARIZE_AFTER': 2})
+class ConversationContextTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='talker', password='12345')
+        self.trip = Trip.objects.create(user=self.user, destination="Kyoto", date_leaving="2026-04-01", date_returning="2026-04-08")
+        for i in range(6):  # 10 tokens each, so only the last two fit the window
+            ChatMessage.objects.create(trip=self.trip, user=self.user, message=f"message number {i} " + "x" * 20,
+                                       is_user_message=i % 2 == 0)
+
+    def test_recent_turns_within_budget(self):
+        messages = context.build_messages(self.trip, self.user, 'And temples?')
+        self.assertEqual([m['role'] for m in messages], ['system', 'user', 'assistant', 'user'])
+        self.assertTrue(messages[1]['content'].startswith('message number 4'))
+        self.assertIn("User's question: And temples?", messages[-1]['content'])
+        # Four messages fell out of the window, so a summary update is queued (once)
+        context.build_messages(self.trip, self.user, 'And food?')
+        self.assertEqual(Job.objects.filter(kind='chat_summary', trip=self.trip).count(), 1)
+
+    @patch('chatbot.context.DeepSeekService.chat_completion', return_value='Planning temples in Kyoto.')
+    def test_older_turns_folded_into_summary(self, mock_completion):
+        context.build_messages(self.trip, self.user, 'Hi')
+        queue.work('test', once=True)
+
+        summary = ConversationSummary.objects.get(trip=self.trip)
+        self.assertEqual(summary.message_count, 4)
+        self.assertIn('message number 3', mock_completion.call_args.args[0][1]['content'])
+        messages = context.build_messages(self.trip, self.user, 'Hi again')
+        self.assertEqual(messages[1]['content'], 'Summary of the earlier conversation: Planning temples in Kyoto.')
+        self.assertEqual(len(messages), 5)
+        # Only new messages are summarized next time
+        self.assertEqual(context.update_summary(self.trip), 0)
+
@@ -6,4 +6,5 @@ app_name = "chatbot"
 urlpatterns = [
     path('', views.chat, name='chatbot'),
     path('chat/', views.chat_view, name='chat_view'),
+    path('chat/stream/', views.chat_stream, name='chat_stream'),
 ]
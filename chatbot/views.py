@@ -1,18 +1,28 @@
+import json
+import logging
+
+from django.http import JsonResponse, StreamingHttpResponse
 from django.shortcuts import render, get_object_or_404
+from django.views.decorators.http import require_POST
 from rest_framework.decorators import api_view
 from rest_framework.response import Response
+from .context import build_messages
 from .models import ChatMessage
 from trips.models import Trip
 from api.services.ai import DeepSeekService
 from .serializers import ChatMessageSerializer
 from django.contrib.auth.decorators import login_required
 
+logger = logging.getLogger(__name__)
+
 
 @api_view(['POST'])
 def chat(request, trip_id):
     try:
         trip = Trip.objects.get(pk=trip_id, user=request.user)
         user_message = request.data.get('message', '')
+        # Recent turns and the summary of older ones, built before this question is stored
+        messages = build_messages(trip, request.user, user_message)
 
         # save user message
         ChatMessage.objects.create(
@@ -22,26 +32,10 @@ def chat(request, trip_id):
             is_user_message=True
         )
 
-        # create prompt
-        prompt = f"""
-        Trip Context:
-        - Destination: {trip.destination}
-        - Dates: {trip.date_leaving} to {trip.date_returning}
-        - Activities: {trip.activities or 'Not specified'}
-        - User's question: {user_message}
-        
-        You are TravelMate AI, a helpful travel assistant. 
-        Provide specific, actionable advice based on the trip details.
-        """
-
-        # get AI response
-        ai_response = DeepSeekService.chat_completion([
-            {"role": "system", "content": "You are a travel planning assistant"},
-            {"role": "user", "content": prompt}
-        ])
+        # get AI response (the reply text)
+        response_text = DeepSeekService.chat_completion(messages)
 
         # save response
-        response_text = ai_response['choices'][0]['message']['content']
         ChatMessage.objects.create(
             trip=trip,
             user=request.user,
@@ -55,6 +49,61 @@ def chat(request, trip_id):
     except Exception as e:
         return Response({'error': str(e)}, status=400)
 
+
+def _sse(data, event=None):
+    """Formats one server-sent event."""
+    lines = [f"event: {event}"] if event else []
+    lines.append(f"data: {json.dumps(data)}")
+    return "\n".join(lines) + "\n\n"
+
+
+@login_required
+@require_POST
+def chat_stream(request, trip_id):
+    """
+    Streams the assistant's reply as server-sent events while it is generated.
+
+    Each text fragment is sent as a 'data: {"delta": ...}' event. When the
+    reply is complete it is saved as a ChatMessage and a 'done' event carries
+    its id; failures end the stream with an 'error' event.
+    """
+    trip = get_object_or_404(Trip, pk=trip_id, user=request.user)
+    try:
+        user_message = json.loads(request.body or b'{}').get('message', '').strip()
+    except (ValueError, AttributeError):
+        return JsonResponse({'error': 'Invalid JSON body.'}, status=400)
+    if not user_message:
+        return JsonResponse({'error': 'message is required.'}, status=400)
+
+    messages = build_messages(trip, request.user, user_message)
+    ChatMessage.objects.create(trip=trip, user=request.user, message=user_message, is_user_message=True)
+
+    def events():
+        parts = []
+        try:
+            for delta in DeepSeekService.stream_chat_completion(messages):
+                parts.append(delta)
+                yield _sse({'delta': delta})
+        except Exception as e:
+            logger.error(f"Chat stream failed for trip {trip.id}: {e}")
+            yield _sse({'error': str(e)}, event='error')
+            return
+
+        response_text = "".join(parts)
+        reply = ChatMessage.objects.create(
+            trip=trip,
+            user=request.user,
+            message=response_text,
+            response=response_text,
+            is_user_message=False
+        )
+        yield _sse({'id': reply.id}, event='done')
+
+    response = StreamingHttpResponse(events(), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'  # Stop nginx from buffering the stream
+    return response
+
 @api_view(['GET'])
 def chat_history(request, trip_id):
     messages = ChatMessage.objects.filter(
@@ -0,0 +1,15 @@
+# gunicorn.conf.py
+# Gunicorn reads this file automatically when started from the project root.
+import os
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "TravelMate.settings")
+
+
+def post_fork(server, worker):
+    # Each worker builds its own keep-alive pools and opens them before the first request
+    from api.services import http_client, llm
+
+    http_client.reset()
+    llm.reset()
+    http_client.warmup()
+    llm.warmup()
@@ -0,0 +1,10 @@
+from django.contrib import admin
+
+from .models import Job
+
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display = ('id', 'kind', 'trip', 'user', 'status', 'attempts', 'created_at', 'finished_at')
+    list_filter = ('kind', 'status')
+    search_fields = ('trip__destination', 'user__username', 'error')
@@ -0,0 +1,68 @@
+import logging
+import os
+import signal
+import socket
+import threading
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from jobs import queue
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = "Runs queued background jobs (AI generations) with a pool of worker threads."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=None,
+                            help="Jobs run concurrently (default: JOBS['WORKERS']).")
+        parser.add_argument('--once', action='store_true',
+                            help="Exit once no job is due instead of waiting for new ones.")
+
+    def handle(self, *args, **options):
+        workers = options['workers'] or queue.option('WORKERS')
+        prefix = f"{socket.gethostname()}:{os.getpid()}"
+        stop = threading.Event()
+        counts = []
+
+        def worker(name):
+            try:
+                while True:
+                    try:
+                        counts.append(queue.work(name, stop=stop, once=options['once']))
+                        return
+                    except Exception as e:
+                        # E.g. the database went away while claiming; keep the worker alive
+                        logger.exception(f"Job worker {name} failed, restarting: {e}")
+                        connection.close()
+                        if stop.wait(queue.option('POLL_INTERVAL')):
+                            return
+            finally:
+                connection.close()  # Each thread has its own connection
+
+        def request_stop(signum, frame):
+            # On deploy (SIGTERM) or Ctrl-C: no new jobs, let the running ones finish
+            self.stdout.write("Stopping after the running jobs finish...")
+            stop.set()
+
+        signal.signal(signal.SIGTERM, request_stop)
+        signal.signal(signal.SIGINT, request_stop)
+
+        queue.requeue_stale()
+        threads = [
+            threading.Thread(target=worker, args=(f"{prefix}:{i}",), name=f"job-worker-{i}", daemon=True)
+            for i in range(workers)
+        ]
+        for thread in threads:
+            thread.start()
+        self.stdout.write(f"Started {workers} job worker(s).")
+
+        # Workers re-queue stale jobs themselves; joining with a timeout keeps signals handled
+        while any(thread.is_alive() for thread in threads):
+            for thread in threads:
+                thread.join(timeout=queue.option('POLL_INTERVAL'))
+
+        if options['once']:
+            self.stdout.write(f"Ran {sum(counts)} job(s).")
@@ -0,0 +1,55 @@
+from django.contrib.auth.models import User
+from django.db import models
+from django.db.models import Q
+
+
+class Job(models.Model):
+    """
+    A unit of background work (an AI generation) for a trip, run by
+    `manage.py run_workers`. See jobs.queue.
+    """
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    SUCCEEDED = 'succeeded'
+    FAILED = 'failed'
+    STATUS_CHOICES = [
+        (QUEUED, 'Queued'),
+        (RUNNING, 'Running'),
+        (SUCCEEDED, 'Succeeded'),
+        (FAILED, 'Failed'),
+    ]
+    ACTIVE_STATUSES = (QUEUED, RUNNING)
+
+    kind = models.CharField(max_length=50)  # Key of jobs.queue.HANDLERS
+    trip = models.ForeignKey('trips.Trip', on_delete=models.CASCADE, related_name='jobs')
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='jobs')
+    params = models.JSONField(default=dict, blank=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=QUEUED)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    max_attempts = models.PositiveSmallIntegerField(default=3)
+    run_after = models.DateTimeField()  # Not picked up before this (retry backoff)
+    locked_by = models.CharField(max_length=100, blank=True)  # Worker running the job
+    locked_at = models.DateTimeField(null=True, blank=True)
+    result = models.JSONField(null=True, blank=True)
+    error = models.TextField(blank=True)  # Last failure, kept while retrying
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [models.Index(fields=['status', 'run_after'], name='job_status_run_after')]
+        constraints = [
+            # At most one queued or running job of a kind per trip; repeat clicks join it
+            models.UniqueConstraint(
+                fields=['kind', 'trip'],
+                condition=Q(status__in=('queued', 'running')),
+                name='unique_active_job_per_trip',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.kind} for trip {self.trip_id} ({self.status})"
+
+    @property
+    def is_active(self):
+        return self.status in self.ACTIVE_STATUSES
@@ -0,0 +1,179 @@
+# jobs/queue.py
+"""
+Database-backed job queue for slow AI generations.
+
+Views enqueue a Job and return at once; `manage.py run_workers` claims queued
+jobs and runs their handler, so a 10-30s LLM call occupies a worker thread
+instead of a gunicorn request worker.
+
+- Claiming is a conditional UPDATE (status queued -> running), so several
+  worker processes can share the table without row locks.
+- A failed job is queued again with exponential backoff until it has used
+  max_attempts; running jobs whose worker died are re-queued after
+  STALE_SECONDS.
+- A trip has at most one queued or running job of each kind; enqueueing
+  again returns that job (see the Job constraint).
+
+Handlers take the Job and return a JSON-serializable result; they are listed
+in HANDLERS as dotted paths so this app doesn't import the others.
+"""
+
+import logging
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .models import Job
+
+logger = logging.getLogger(__name__)
+
+HANDLERS = {
+    'packing_list': 'packing.generation.run_job',
+    'travel_tips': 'tips.generation.run_job',
+    'prepare_trip': 'trips.preparation.run_job',
+    'chat_summary': 'chatbot.context.run_job',
+}
+
+DEFAULTS = {
+    'WORKERS': 2,                # Jobs run concurrently by one run_workers process
+    'POLL_INTERVAL': 1.0,        # Seconds an idle worker waits before looking for jobs again
+    'MAX_ATTEMPTS': 3,
+    'RETRY_BACKOFF': 10,         # Seconds before the first retry, doubled for each further one
+    'STALE_SECONDS': 300,        # Running jobs not finished after this are assumed orphaned
+}
+
+
+def option(name):
+    return getattr(settings, 'JOBS', {}).get(name, DEFAULTS[name])
+
+
+def enqueue(kind, trip, user, params=None):
+    """
+    Queues a job for the trip, or returns its queued or running job of the
+    same kind. Returns (job, created).
+    """
+    if kind not in HANDLERS:
+        raise ValueError(f"Unknown job kind: {kind}")
+    active = Job.objects.filter(kind=kind, trip=trip, status__in=Job.ACTIVE_STATUSES)
+    job = active.first()
+    if job is not None:
+        return job, False
+    try:
+        with transaction.atomic():
+            job = Job.objects.create(
+                kind=kind, trip=trip, user=user, params=params or {},
+                max_attempts=option('MAX_ATTEMPTS'), run_after=timezone.now(),
+            )
+    except IntegrityError:
+        # Another request queued one in the meantime
+        job = active.first()
+        if job is None:
+            raise
+        return job, False
+    logger.info(f"Queued {kind} job {job.id} for trip {trip.id}")
+    return job, True
+
+
+def claim(worker):
+    """Marks the next due job as running for this worker and returns it, or None."""
+    now = timezone.now()
+    due = Job.objects.filter(status=Job.QUEUED, run_after__lte=now).order_by('run_after', 'id')
+    for pk in due.values_list('pk', flat=True)[:10]:
+        claimed = Job.objects.filter(pk=pk, status=Job.QUEUED).update(
+            status=Job.RUNNING, locked_by=worker, locked_at=now, attempts=F('attempts') + 1,
+        )
+        if claimed:  # Otherwise another worker got there first
+            return Job.objects.select_related('trip', 'user').get(pk=pk)
+    return None
+
+
+def retry_delay(attempts):
+    return option('RETRY_BACKOFF') * 2 ** max(attempts - 1, 0)
+
+
+def _release(job, **fields):
+    """
+    Updates a running job and unlocks it, but only while it is still locked by
+    the worker that claimed it, like claim() does. Returns whether it was.
+    """
+    released = Job.objects.filter(
+        pk=job.pk, status=Job.RUNNING, locked_by=job.locked_by, locked_at=job.locked_at,
+    ).update(locked_by='', locked_at=None, **fields)
+    return bool(released)
+
+
+def run(job):
+    """Runs a claimed job's handler and records the outcome."""
+    started = time.monotonic()
+    try:
+        result = import_string(HANDLERS[job.kind])(job)
+    except Exception as e:
+        logger.warning(f"{job.kind} job {job.id} failed on attempt {job.attempts}/{job.max_attempts}: {e}", exc_info=True)
+        fields = {'error': str(e) or e.__class__.__name__}
+        if job.attempts < job.max_attempts:
+            fields.update(status=Job.QUEUED, run_after=timezone.now() + timedelta(seconds=retry_delay(job.attempts)))
+        else:
+            fields.update(status=Job.FAILED, finished_at=timezone.now())
+    else:
+        logger.info(f"{job.kind} job {job.id} succeeded in {time.monotonic() - started:.1f}s")
+        fields = {'status': Job.SUCCEEDED, 'result': result, 'error': '', 'finished_at': timezone.now()}
+
+    if not _release(job, **fields):
+        # requeue_stale() gave up on this worker; the job's new state stands
+        logger.warning(f"{job.kind} job {job.id} was re-queued while {job.locked_by} ran it; discarding its outcome")
+        job.refresh_from_db()
+        return job
+    for name, value in fields.items():
+        setattr(job, name, value)
+    job.locked_by = ''
+    job.locked_at = None
+    return job
+
+
+def requeue_stale():
+    """Re-queues (or fails, if out of attempts) running jobs whose worker stopped. Returns how many."""
+    cutoff = timezone.now() - timedelta(seconds=option('STALE_SECONDS'))
+    count = 0
+    for job in Job.objects.filter(status=Job.RUNNING, locked_at__lt=cutoff):
+        status = Job.QUEUED if job.attempts < job.max_attempts else Job.FAILED
+        # Skipped if the worker finished the job in the meantime
+        count += _release(
+            job, status=status, error=f"Worker {job.locked_by} stopped while running the job.",
+            run_after=timezone.now(), finished_at=timezone.now() if status == Job.FAILED else None,
+        )
+    if count:
+        logger.warning(f"Re-queued {count} stale job(s)")
+    return count
+
+
+def work(worker, stop=None, once=False):
+    """
+    Claims and runs jobs until `stop` (a threading.Event) is set, or, with
+    once=True, until no job is due. Returns the number of jobs run.
+
+    Every STALE_SECONDS / 2 the worker also re-queues jobs orphaned by a
+    worker that died, so they don't wait for a restart.
+    """
+    ran = 0
+    next_requeue = time.monotonic() + option('STALE_SECONDS') / 2
+    while stop is None or not stop.is_set():
+        if time.monotonic() >= next_requeue:
+            requeue_stale()
+            next_requeue = time.monotonic() + option('STALE_SECONDS') / 2
+        job = claim(worker)
+        if job is None:
+            if once:
+                break
+            if stop is not None:
+                stop.wait(option('POLL_INTERVAL'))
+            else:
+                time.sleep(option('POLL_INTERVAL'))
+            continue
+        run(job)
+        ran += 1
+    return ran
@@ -0,0 +1,113 @@
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.db import OperationalError
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from unittest.mock import patch
+from datetime import date, timedelta
+from io import StringIO
+import json
+import signal
+
+from packing.models import PackingItem, PackingList
+from trips.models import Trip
+from . import queue
+from .models import Job
+
+PACKING_JSON = json.dumps({'categories': [{'name': 'Clothing', 'items': [{'name': 'Raincoat'}, {'name': 'Boots'}]}]})
+
+
+@patch('packing.generation.trip_weather_summary', return_value='Rainy.')
+class JobQueueTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('worker', password='pw')
+        self.trip = Trip.objects.create(user=self.user, destination='Bergen', date_leaving=date(2026, 9, 1),
+                                        date_returning=date(2026, 9, 4))
+        self.client.login(username='worker', password='pw')
+
+    @patch('packing.generation.PackingListGenerator.generate_packing_list', return_value=PACKING_JSON)
+    def test_generate_enqueues_and_worker_saves_items(self, mock_generate, mock_weather):
+        response = self.client.post(f'/packing/{self.trip.id}/generate/')
+        self.assertEqual(response.status_code, 202)
+        job_id = response.json()['job_id']
+        # A second click while the job is pending joins it
+        self.assertEqual(self.client.post(f'/packing/{self.trip.id}/generate/').json()['job_id'], job_id)
+        mock_generate.assert_not_called()
+
+        self.assertEqual(queue.work('test', once=True), 1)
+        status = self.client.get(response.json()['status_url']).json()
+        self.assertEqual(status['status'], 'succeeded')
+        self.assertEqual(status['result'], {'items': 2})
+        self.assertEqual(PackingItem.objects.filter(packing_list__trip=self.trip).count(), 2)
+        self.assertTrue(PackingList.objects.get(trip=self.trip).generated)
+
+        # Finished jobs don't block a new one
+        self.assertNotEqual(self.client.post(f'/packing/{self.trip.id}/generate/').json()['job_id'], job_id)
+
+    @override_settings(JOBS={'MAX_ATTEMPTS': 2, 'RETRY_BACKOFF': 30})
+    @patch('packing.generation.PackingListGenerator.generate_packing_list', return_value='{"error": "rate limited"}')
+    def test_failed_job_retried_with_backoff(self, mock_generate, mock_weather):
+        job, _ = queue.enqueue('packing_list', self.trip, self.user)
+        queue.work('test', once=True)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (Job.QUEUED, 1))
+        self.assertIn('rate limited', job.error)
+        self.assertGreater(job.run_after, timezone.now() + timedelta(seconds=25))
+        self.assertEqual(queue.work('test', once=True), 0)  # Not due yet
+
+        Job.objects.filter(pk=job.pk).update(run_after=timezone.now())
+        queue.work('test', once=True)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (Job.FAILED, 2))
+
+    def test_stale_running_job_requeued(self, mock_weather):
+        job, _ = queue.enqueue('packing_list', self.trip, self.user)
+        queue.claim('gone')
+        Job.objects.filter(pk=job.pk).update(locked_at=timezone.now() - timedelta(hours=1))
+        self.assertEqual(queue.requeue_stale(), 1)
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.QUEUED)
+
+    @override_settings(JOBS={'STALE_SECONDS': 0})
+    @patch('packing.generation.PackingListGenerator.generate_packing_list', return_value=PACKING_JSON)
+    def test_worker_recovers_jobs_of_crashed_worker(self, mock_generate, mock_weather):
+        job, _ = queue.enqueue('packing_list', self.trip, self.user)
+        queue.claim('crashed')
+        Job.objects.filter(pk=job.pk).update(locked_at=timezone.now() - timedelta(hours=1))
+
+        self.assertEqual(queue.work('test', once=True), 1)
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.SUCCEEDED)
+
+    @patch('packing.generation.PackingListGenerator.generate_packing_list', return_value=PACKING_JSON)
+    def test_slow_worker_does_not_overwrite_requeued_job(self, mock_generate, mock_weather):
+        queue.enqueue('packing_list', self.trip, self.user)
+        job = queue.claim('slow')
+        Job.objects.filter(pk=job.pk).update(locked_at=timezone.now() - timedelta(hours=1))
+        job.refresh_from_db()
+        self.assertEqual(queue.requeue_stale(), 1)
+
+        self.assertEqual(queue.run(job).status, Job.QUEUED)
+        self.assertEqual(Job.objects.get(pk=job.pk).status, Job.QUEUED)
+        self.assertEqual(queue.requeue_stale(), 0)
+
+    def test_status_only_visible_to_owner(self, mock_weather):
+        job, _ = queue.enqueue('travel_tips', self.trip, self.user)
+        User.objects.create_user('other', password='pw')
+        self.client.login(username='other', password='pw')
+        self.assertEqual(self.client.get(f'/jobs/{job.id}/').status_code, 404)
+
+
+class RunWorkersCommandTests(TestCase):
+    @override_settings(JOBS={'POLL_INTERVAL': 0.01})
+    @patch('jobs.management.commands.run_workers.signal.signal')
+    @patch('jobs.queue.claim', side_effect=[OperationalError('database is locked'), None])
+    def test_worker_survives_errors_and_stops_on_sigterm(self, mock_claim, mock_signal):
+        out = StringIO()
+        call_command('run_workers', '--once', '--workers', '1', stdout=out)
+        self.assertEqual(mock_claim.call_count, 2)
+        self.assertIn("Ran 0 job(s).", out.getvalue())
+
+        handlers = {call.args[0]: call.args[1] for call in mock_signal.call_args_list}
+        handlers[signal.SIGTERM](signal.SIGTERM, None)
+        self.assertIn("Stopping after the running jobs finish", out.getvalue())
@@ -0,0 +1,27 @@
+# jobs/views.py
+from django.contrib.auth.decorators import login_required
+from django.http import JsonResponse
+from django.shortcuts import get_object_or_404
+
+from .models import Job
+
+
+def job_payload(job):
+    return {
+        'job_id': job.id,
+        'kind': job.kind,
+        'status': job.status,
+        'attempts': job.attempts,
+        'max_attempts': job.max_attempts,
+        'result': job.result,
+        'error': job.error,
+        'created_at': job.created_at.isoformat(),
+        'finished_at': job.finished_at.isoformat() if job.finished_at else None,
+    }
+
+
+@login_required
+def job_status(request, job_id):
+    """Current state of one of the user's jobs, polled by the generate buttons."""
+    job = get_object_or_404(Job, pk=job_id, user=request.user)
+    return JsonResponse(job_payload(job))
@@ -0,0 +1,132 @@
+# packing/generation.py
+"""
+Turns a generated packing list into PackingItem rows.
+
+Shared by the streaming view and the background job (see jobs.queue) that
+replaced generating inside the request.
+"""
+
+import json
+import logging
+from datetime import date
+
+from django.db import transaction
+
+from api.services.packing import PackingListGenerator
+from weather.services import trip_weather_summary
+from .models import PackingItem, PackingList
+
+logger = logging.getLogger(__name__)
+
+
+def category_code(category_name):
+    """Maps a generated category name to a PackingItem category code (MISC if unknown)."""
+    normalized_name = category_name.upper().replace(' ', '_').replace('-', '_')
+    # Simple mapping (improve if needed)
+    for code, name in PackingItem.CATEGORY_CHOICES:
+         # Match based on code or name (flexible)
+         if normalized_name == code or normalized_name == name.upper().replace(' ', '_'):
+             return code
+    return 'MISC'
+
+
+def build_item(packing_list, category_name, code, item_data):
+    """Unsaved AI-generated PackingItem for one generated item, or None if it has no name."""
+    item_name = str(item_data.get('name') or '').strip()
+    if not item_name:
+        logger.warning(f"Skipping item with no name in category '{category_name}'")
+        return None
+
+    # Handle potential date parsing errors
+    item_for_day = None
+    if item_data.get('for_day'):
+        try:
+            # Attempt ISO format first (YYYY-MM-DD)
+            item_for_day = date.fromisoformat(item_data['for_day'])
+        except (ValueError, TypeError):
+             # Add more formats if needed, or log a warning
+             logger.warning(f"Could not parse date '{item_data['for_day']}' for item '{item_name}'. Skipping date.")
+
+    try:
+        quantity = max(1, int(item_data.get('quantity', 1))) # Ensure quantity is at least 1
+    except (TypeError, ValueError):
+        quantity = 1
+
+    return PackingItem(
+        packing_list=packing_list,
+        name=item_name[:100],
+        category=code, # Use the mapped code
+        quantity=quantity,
+        is_essential=bool(item_data.get('essential', False)), # Default to False if not specified
+        notes=item_data.get('notes', '') or '',
+        for_day=item_for_day,
+        custom_added=False # Mark as AI generated
+    )
+
+
+def weather_for(trip):
+    """
+    Returns (weather_summary, error). When the weather couldn't be fetched the
+    summary is still usable as packing list input ("Weather unavailable: ...").
+    """
+    try:
+        weather_summary = trip_weather_summary(trip)
+    except Exception as e:
+        logger.error(f"Failed to fetch weather for trip {trip.id}: {e}", exc_info=True)
+        return "Weather information could not be retrieved.", str(e)
+    logger.info(f"Weather summary for Trip {trip.id}: {weather_summary}")
+    if weather_summary.startswith("Weather unavailable:"):  # weather.services reports failures in the summary
+        return weather_summary, weather_summary.split(":", 1)[1].strip()
+    return weather_summary, None
+
+
+def weather_summary_for(trip):
+    return weather_for(trip)[0]
+
+
+def generate_items(trip, force_fresh=False, weather_summary=None):
+    """
+    Generates a packing list for the trip and replaces its AI-generated items
+    (custom items are kept). Returns the number of items saved.
+
+    Raises:
+        RuntimeError: If the generator reported an error.
+        json.JSONDecodeError: If the generated list isn't valid JSON.
+    """
+    if weather_summary is None:
+        weather_summary = weather_summary_for(trip)
+    raw_packing_list_json = PackingListGenerator.generate_packing_list(trip, weather_summary, force_fresh=force_fresh)
+    return save_items(trip, raw_packing_list_json)
+
+
+def save_items(trip, raw_packing_list_json):
+    """Replaces the trip's AI-generated items with a generated list; see generate_items."""
+    packing_list, _ = PackingList.objects.get_or_create(trip=trip)
+    packing_data = json.loads(raw_packing_list_json)
+    # Handle potential errors returned within the JSON from the generator itself
+    if isinstance(packing_data, dict) and "error" in packing_data:
+        raise RuntimeError(f"AI generation failed: {packing_data['error']}")
+
+    items = []
+    for category_data in packing_data.get('categories', []):
+        category_name = category_data.get('name', 'Miscellaneous') # Default category name
+        code = category_code(category_name)
+        for item_data in category_data.get('items', []):
+            item = build_item(packing_list, category_name, code, item_data)
+            if item is not None:
+                items.append(item)
+
+    # Clear existing AI-generated items before adding new ones
+    with transaction.atomic():
+        packing_list.items.filter(custom_added=False).delete()
+        PackingItem.objects.bulk_create(items)
+        packing_list.generated = True # Mark the list as having been generated
+        packing_list.save()
+
+    logger.info(f"Successfully generated and saved {len(items)} packing items for trip {trip.id}.")
+    return len(items)
+
+
+def run_job(job):
+    """Job handler for 'packing_list' jobs (see jobs.queue)."""
+    return {'items': generate_items(job.trip, force_fresh=bool(job.params.get('force_fresh')))}
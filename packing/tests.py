@@ -1,3 +1,52 @@
+from django.contrib.auth.models import User
 from django.test import TestCase
+from django.urls import reverse
+from unittest.mock import patch
+from datetime import date
 
-# Create your tests here.
+from trips.models import Trip
+from .models import PackingItem, PackingList
+
+
+class StreamPackingListTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('packer', password='pw')
+        self.trip = Trip.objects.create(user=self.user, destination='Oslo', date_leaving=date(2026, 2, 1),
+                                        date_returning=date(2026, 2, 3))
+        self.packing_list = PackingList.objects.create(trip=self.trip)
+        PackingItem.objects.create(packing_list=self.packing_list, name='Old item', category='MISC')
+        PackingItem.objects.create(packing_list=self.packing_list, name='My camera', category='MISC', custom_added=True)
+        self.client.login(username='packer', password='pw')
+        self.url = reverse('packing:generate_stream', args=[self.trip.id])
+
+    def _events(self, response):
+        body = b''.join(response.streaming_content).decode()
+        return [event for event in body.split('\n\n') if event]
+
+    @patch('packing.generation.trip_weather_summary', return_value='Cold.')
+    @patch('packing.views.PackingListGenerator.stream_packing_list')
+    def test_items_streamed_and_saved(self, mock_stream, mock_weather):
+        mock_stream.return_value = iter([('Clothing', {'name': f'Layer {i}'}) for i in range(7)] +
+                                        [('Documents', {'name': 'Passport', 'essential': True}), ('Documents', {'name': ''})])
+        response = self.client.post(self.url, '{"force_fresh": true}', content_type='application/json')
+
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        events = self._events(response)
+        self.assertTrue(events[0].startswith('event: weather'))
+        self.assertEqual(sum(event.startswith('event: item') for event in events), 8)
+        self.assertEqual(events[-1], 'event: done\ndata: {"count": 8}')
+        self.assertTrue(mock_stream.call_args.args[2])  # force_fresh passed through
+
+        names = set(self.packing_list.items.values_list('name', flat=True))
+        self.assertNotIn('Old item', names)
+        self.assertIn('My camera', names)
+        self.assertEqual(self.packing_list.items.get(name='Passport').category, 'DOCUMENTS')
+        self.packing_list.refresh_from_db()
+        self.assertTrue(self.packing_list.generated)
+
+    @patch('packing.generation.trip_weather_summary', return_value='Cold.')
+    @patch('packing.views.PackingListGenerator.stream_packing_list', side_effect=TimeoutError("timed out"))
+    def test_failure_before_first_item_keeps_old_list(self, mock_stream, mock_weather):
+        events = self._events(self.client.post(self.url))
+        self.assertTrue(events[-1].startswith('event: error'))
+        self.assertTrue(self.packing_list.items.filter(name='Old item').exists())
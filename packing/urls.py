@@ -6,6 +6,7 @@ app_name = 'packing'
 urlpatterns = [
     path('<int:trip_id>/', views.packing_list_view, name='list'),
     path('<int:trip_id>/generate/', views.generate_packing_list, name='generate'),
+    path('<int:trip_id>/generate/stream/', views.stream_packing_list, name='generate_stream'),
     path('item/<int:item_id>/update/', views.update_packing_item, name='update_item'),
     path('<int:trip_id>/add/', views.add_custom_item, name='add_item'),
 ]
\ No newline at end of file
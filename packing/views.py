@@ -1,19 +1,20 @@
 # packing/views.py
 from django.shortcuts import render, get_object_or_404, redirect
+from django.urls import reverse
 from django.contrib.auth.decorators import login_required
-from django.http import JsonResponse
+from django.conf import settings
+from django.http import JsonResponse, StreamingHttpResponse
 from django.views.decorators.http import require_POST, require_http_methods
-from django.core.exceptions import ValidationError
 import json
 from datetime import date
 import logging # Import logging
 
 # Corrected import path for PackingListGenerator based on your structure
 from api.services.packing import PackingListGenerator
+from jobs.queue import enqueue
 from trips.models import Trip
+from .generation import build_item, category_code, weather_summary_for
 from .models import PackingList, PackingItem
-# Import the new weather service function
-from weather.services import fetch_and_summarize_weather
 
 logger = logging.getLogger(__name__) # Add logger
 
@@ -46,121 +47,109 @@ def packing_list_view(request, trip_id):
     })
 
 
+def _force_fresh(request):
+    """True when the client asked to bypass the packing list cache (?force_fresh=1 or {"force_fresh": true})."""
+    if request.GET.get('force_fresh') in ('1', 'true'):
+        return True
+    try:
+        payload = json.loads(request.body or b'{}')
+    except ValueError:
+        return False
+    return isinstance(payload, dict) and bool(payload.get('force_fresh'))
+
+
 @login_required
 @require_POST
 def generate_packing_list(request, trip_id):
+    """
+    Queues packing list generation as a background job and returns 202 with
+    the job ID; poll jobs:status until it has succeeded or failed.
+    """
+    trip = get_object_or_404(Trip, pk=trip_id, user=request.user)
+    job, created = enqueue('packing_list', trip, request.user, {'force_fresh': _force_fresh(request)})
+    return JsonResponse({
+        'status': 'queued' if created else job.status,
+        'message': 'Packing list generation started.' if created else 'Packing list generation is already in progress.',
+        'job_id': job.id,
+        'status_url': reverse('jobs:status', args=[job.id]),
+    }, status=202)
+
+
+def _sse(data, event=None):
+    """Formats one server-sent event."""
+    lines = [f"event: {event}"] if event else []
+    lines.append(f"data: {json.dumps(data)}")
+    return "\n".join(lines) + "\n\n"
+
+
+@login_required
+@require_POST
+def stream_packing_list(request, trip_id):
+    """
+    Streaming variant of generate_packing_list.
+
+    Items are sent as server-sent 'item' events as soon as each one is parsed
+    from the completion, and saved in batches of PACKING_STREAM_BATCH_SIZE.
+    Previously generated items are removed when the first new item arrives,
+    so a failure before that leaves the old list intact. The stream ends with
+    a 'done' event carrying the item count, or an 'error' event.
+    """
     trip = get_object_or_404(Trip, pk=trip_id, user=request.user)
     packing_list, _ = PackingList.objects.get_or_create(trip=trip)
+    force_fresh = _force_fresh(request)
+    batch_size = getattr(settings, 'PACKING_STREAM_BATCH_SIZE', 5)
 
-    # --- Fetch Weather Summary ---
-    try:
-        weather_summary = fetch_and_summarize_weather(
-            destination=trip.destination,
-            start_date=trip.date_leaving,
-            end_date=trip.date_returning
-        )
-        logger.info(f"Weather summary for Trip {trip_id}: {weather_summary}")
-    except Exception as e:
-        logger.error(f"Failed to fetch weather for trip {trip_id}: {e}", exc_info=True)
-        # Decide if you want to proceed without weather or return an error
-        # Option 1: Proceed with a placeholder
-        weather_summary = "Weather information could not be retrieved."
-        # Option 2: Return error immediately (uncomment below)
-        # return JsonResponse({
-        #     'status': 'error',
-        #     'message': f"Failed to retrieve weather information: {e}"
-        # }, status=500)
-
-    # --- Generate Packing List ---
-    try:
-        # Generate new items, passing the weather summary
-        # Ensure PackingListGenerator expects weather_summary
-        raw_packing_list_json = PackingListGenerator.generate_packing_list(trip, weather_summary)
-
-        # Log the raw response for debugging if needed
-        # logger.debug(f"Raw OpenAI response for trip {trip_id}: {raw_packing_list_json}")
-
-        packing_data = json.loads(raw_packing_list_json)
-
-        # Handle potential errors returned within the JSON from the generator itself
-        if isinstance(packing_data, dict) and "error" in packing_data:
-             logger.error(f"Packing list generation failed (reported by generator): {packing_data['error']}")
-             return JsonResponse({
-                 'status': 'error',
-                 'message': f"AI generation failed: {packing_data['error']}"
-                 }, status=500)
-
-        # --- Save Packing List Items ---
-        # Clear existing AI-generated items before adding new ones
-        packing_list.items.filter(custom_added=False).delete()
-
-        items_created_count = 0
-        for category_data in packing_data.get('categories', []):
-            category_name = category_data.get('name', 'Miscellaneous') # Default category name
-            # Map category name to your choices enum/code
-            category_code = 'MISC' # Default
-            normalized_name = category_name.upper().replace(' ', '_').replace('-', '_')
-            # Simple mapping (improve if needed)
-            for code, name in PackingItem.CATEGORY_CHOICES:
-                 # Match based on code or name (flexible)
-                 if normalized_name == code or normalized_name == name.upper().replace(' ', '_'):
-                     category_code = code
-                     break
-
-            for item_data in category_data.get('items', []):
-                item_name = item_data.get('name', '').strip()
-                if not item_name:
-                    logger.warning(f"Skipping item with no name in category '{category_name}'")
-                    continue # Skip items without a name
-
-                # Handle potential date parsing errors
-                item_for_day = None
-                if item_data.get('for_day'):
-                    try:
-                        # Attempt ISO format first (YYYY-MM-DD)
-                        item_for_day = date.fromisoformat(item_data['for_day'])
-                    except (ValueError, TypeError):
-                         # Add more formats if needed, or log a warning
-                         logger.warning(f"Could not parse date '{item_data['for_day']}' for item '{item_name}'. Skipping date.")
-                         pass # Keep item_for_day as None
-
-                PackingItem.objects.create(
-                    packing_list=packing_list,
-                    name=item_name,
-                    category=category_code, # Use the mapped code
-                    quantity=max(1, int(item_data.get('quantity', 1))), # Ensure quantity is at least 1
-                    is_essential=bool(item_data.get('essential', False)), # Default to False if not specified
-                    notes=item_data.get('notes', '') or '',
-                    for_day=item_for_day,
-                    custom_added=False # Mark as AI generated
-                )
-                items_created_count += 1
-
-        packing_list.generated = True # Mark the list as having been generated
-        packing_list.save()
+    def events():
+        weather_summary = weather_summary_for(trip)
+        yield _sse({'weather_summary': weather_summary}, event='weather')
 
-        logger.info(f"Successfully generated and saved {items_created_count} packing items for trip {trip_id}.")
-        return JsonResponse({'status': 'success', 'message': 'Packing list generated successfully!'})
+        batch = []
+        saved = 0
+        cleared = False
+        try:
+            for category_name, item_data in PackingListGenerator.stream_packing_list(trip, weather_summary, force_fresh):
+                item = build_item(packing_list, category_name, category_code(category_name), item_data)
+                if item is None:
+                    continue
+                if not cleared:
+                    packing_list.items.filter(custom_added=False).delete()
+                    cleared = True
+                batch.append(item)
+                yield _sse({
+                    'name': item.name,
+                    'category': item.category,
+                    'category_display': item.get_category_display(),
+                    'quantity': item.quantity,
+                    'is_essential': item.is_essential,
+                    'notes': item.notes,
+                    'for_day': item.for_day.isoformat() if item.for_day else None,
+                }, event='item')
+                if len(batch) >= batch_size:
+                    PackingItem.objects.bulk_create(batch)
+                    saved += len(batch)
+                    batch = []
+        except Exception as e:
+            logger.error(f"Streaming packing list generation failed for trip {trip_id}: {e}", exc_info=True)
+            yield _sse({'message': f"AI generation failed: {e}"}, event='error')
+            return
+        finally:
+            if batch:
+                PackingItem.objects.bulk_create(batch)  # Keep what was streamed before a failure or disconnect
+                saved += len(batch)
+                batch = []
+
+        if not saved:
+            yield _sse({'message': "AI generation returned no items."}, event='error')
+            return
+        packing_list.generated = True
+        packing_list.save()
+        logger.info(f"Streamed and saved {saved} packing items for trip {trip_id}.")
+        yield _sse({'count': saved}, event='done')
 
-    except json.JSONDecodeError as e:
-        logger.error(f"Failed to decode JSON response from OpenAI for trip {trip_id}: {e}\nRaw response: {raw_packing_list_json}", exc_info=True)
-        return JsonResponse({
-            'status': 'error',
-            'message': 'Failed to understand the response from the AI generator. Invalid format.'
-        }, status=500)
-    except ValidationError as e:
-        logger.error(f"Validation error saving packing item for trip {trip_id}: {e}", exc_info=True)
-        return JsonResponse({
-            'status': 'error',
-            'message': f"Error saving packing item: {e}"
-        }, status=400)
-    except Exception as e:
-        # Catch any other unexpected errors during generation or saving
-        logger.error(f"Unexpected error generating packing list for trip {trip_id}: {e}", exc_info=True) # Log traceback
-        return JsonResponse({
-            'status': 'error',
-            'message': f'An unexpected error occurred: {e}'
-        }, status=500)
+    response = StreamingHttpResponse(events(), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'  # Stop nginx from buffering the stream
+    return response
 
 
 # ... (keep other views: add_custom_item, update_packing_item, toggle_item_completion) ...
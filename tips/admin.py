@@ -1,3 +1,11 @@
 from django.contrib import admin
 
-# Register your models here.
+from .models import DestinationTips
+
+
+@admin.register(DestinationTips)
+class DestinationTipsAdmin(admin.ModelAdmin):
+    """Shared tips corpus (see tips/corpus.py); delete an entry to have it regenerated."""
+    list_display = ('destination', 'month', 'hits', 'model', 'prompt_version', 'generated_at')
+    list_filter = ('month', 'prompt_version')
+    search_fields = ('destination',)
@@ -0,0 +1,75 @@
+# tips/corpus.py
+"""
+Shared corpus of generated travel tips per destination and month.
+
+Cultural advice, local information and must-have items depend on where and
+when someone travels, hardly on who it is: every trip to Tokyo in April can
+share one set of tips. The corpus stores them as DestinationTips rows under
+the normalized destination and the departure month; a row is regenerated once
+it is older than TIPS_CORPUS_TTL_DAYS or was made with another model or
+prompt version.
+
+Trips whose activities go beyond general sightseeing also get a few
+activity-specific tips on top (see tips.generation.tips_json); other trips are
+served straight from the corpus without an LLM call.
+"""
+
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import F
+from django.utils import timezone
+
+from api.services import prompts
+from api.services.trip_features import activity_set, normalize
+from .models import DestinationTips
+
+logger = logging.getLogger(__name__)
+
+# Activities that the destination tips already cover
+GENERIC_ACTIVITIES = frozenset({
+    'general tourism and leisure', 'general tourism', 'tourism', 'sightseeing', 'leisure',
+    'relaxing', 'relaxation', 'holiday', 'vacation', 'city break', 'exploring', 'walking', 'food',
+})
+
+
+def destination_key(destination):
+    return normalize(destination)[:100]
+
+
+def needs_personalization(activities):
+    """True if the trip plans activities the shared destination tips don't cover."""
+    return bool(set(activity_set(activities)) - GENERIC_ACTIVITIES)
+
+
+def _model():
+    return getattr(settings, 'OPENROUTER_MODEL', '') or ''
+
+
+def _is_fresh(entry):
+    ttl = timedelta(days=getattr(settings, 'TIPS_CORPUS_TTL_DAYS', 90))
+    return (entry.generated_at >= timezone.now() - ttl and entry.model == _model()
+            and entry.prompt_version == prompts.TIPS_VERSION)
+
+
+def get(trip):
+    """The shared tips JSON for the trip's destination and month, or None if missing or stale."""
+    entry = DestinationTips.objects.filter(
+        destination=destination_key(trip.destination), month=trip.date_leaving.month,
+    ).first()
+    if entry is None or not _is_fresh(entry):
+        return None
+    DestinationTips.objects.filter(pk=entry.pk).update(hits=F('hits') + 1)
+    logger.info(f"Serving shared tips for {entry.destination} in month {entry.month} to trip {trip.id}")
+    return entry.tips_json
+
+
+def store(trip, tips_json):
+    DestinationTips.objects.update_or_create(
+        destination=destination_key(trip.destination), month=trip.date_leaving.month,
+        defaults={
+            'tips_json': tips_json, 'model': _model(), 'prompt_version': prompts.TIPS_VERSION,
+            'hits': 0, 'generated_at': timezone.now(),
+        },
+    )
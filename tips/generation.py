@@ -0,0 +1,133 @@
+# tips/generation.py
+"""
+Generates travel tips for a trip and saves them as TipItem rows; run in the
+background by the 'travel_tips' job (see jobs.queue).
+
+A trip's tips are the shared tips for its destination and month (see
+tips.corpus), generated only when the corpus has none, plus activity-specific
+tips when its activities call for them.
+"""
+
+import json
+import logging
+
+from django.db import transaction
+
+from api.services.tips import TravelTipsGenerator
+from . import corpus
+from .models import TravelTips, TipItem
+
+logger = logging.getLogger(__name__)
+
+CATEGORY_MAP = { # Map display names from AI to model codes
+    'Cultural Advice': 'CULTURAL',
+    'Local Information': 'LOCAL_INFO',
+    'Must Have Items': 'MUST_HAVE',
+}
+
+
+def _is_success(raw_json):
+    """True unless the generator returned its {"error": ...} JSON."""
+    try:
+        return "error" not in json.loads(raw_json)
+    except (TypeError, ValueError):
+        return False
+
+
+def _merge(base_json, extra_json):
+    """Adds the items of extra_json's categories to base_json's categories of the same name."""
+    tips_data = json.loads(base_json)
+    categories = {category.get('name'): category for category in tips_data.setdefault('categories', [])}
+    for category_data in json.loads(extra_json).get('categories', []):
+        name = category_data.get('name')
+        if name in categories:
+            categories[name].setdefault('items', []).extend(category_data.get('items', []))
+        else:
+            categories[name] = category_data
+            tips_data['categories'].append(category_data)
+    return json.dumps(tips_data)
+
+
+def tips_json(trip):
+    """
+    Tips JSON for the trip: the shared destination tips (generated and stored
+    if the corpus has none) plus tips for its activities if they call for it.
+    Returns the generator's error JSON if the destination tips couldn't be generated.
+    """
+    base_json = corpus.get(trip)
+    if base_json is None:
+        base_json = TravelTipsGenerator.generate_destination_tips(trip.destination, trip.date_leaving.month)
+        if not _is_success(base_json):
+            return base_json
+        corpus.store(trip, base_json)
+
+    if not corpus.needs_personalization(trip.activities):
+        return base_json
+    activity_json = TravelTipsGenerator.generate_activity_tips(trip)
+    if not _is_success(activity_json):
+        # The destination tips are still worth showing
+        logger.warning(f"Activity tips for trip {trip.id} failed; saving destination tips only: {activity_json}")
+        return base_json
+    return _merge(base_json, activity_json)
+
+
+def generate_tips(trip):
+    """
+    Generates tips for the trip, replacing any existing ones. Returns the
+    number of tips saved.
+
+    Raises:
+        RuntimeError: If the generator reported an error.
+        json.JSONDecodeError: If the generated tips aren't valid JSON.
+    """
+    return save_tips(trip, tips_json(trip))
+
+
+def tips_from_corpus(trip):
+    """
+    Saves the trip's tips straight from the corpus when no LLM call is
+    needed. Returns the number of tips saved, or None.
+    """
+    if corpus.needs_personalization(trip.activities):
+        return None
+    base_json = corpus.get(trip)
+    if base_json is None:
+        return None
+    return save_tips(trip, base_json)
+
+
+def save_tips(trip, raw_tips_json):
+    """Replaces the trip's tips with generated ones; see generate_tips."""
+    travel_tips, _ = TravelTips.objects.get_or_create(trip=trip)
+    tips_data = json.loads(raw_tips_json)
+    # Handle errors reported by the generator itself
+    if isinstance(tips_data, dict) and "error" in tips_data:
+        raise RuntimeError(f"AI generation failed: {tips_data['error']}")
+
+    items = []
+    for category_data in tips_data.get('categories', []):
+        category_name = category_data.get('name', 'General Tips')
+        # Map the received name to one of our defined category codes
+        category_code = CATEGORY_MAP.get(category_name, 'GENERAL') # Default to GENERAL
+
+        for item_data in category_data.get('items', []):
+            tip_content = str(item_data.get('tip') or '').strip()
+            if not tip_content:
+                logger.warning(f"Skipping empty tip in category '{category_name}' for trip {trip.id}")
+                continue # Skip items without content
+            items.append(TipItem(travel_tips=travel_tips, category=category_code, content=tip_content))
+
+    # Clear existing tips before adding new ones
+    with transaction.atomic():
+        travel_tips.items.all().delete()
+        TipItem.objects.bulk_create(items)
+        travel_tips.generated = True
+        travel_tips.save()
+
+    logger.info(f"Successfully generated and saved {len(items)} travel tips for trip {trip.id}.")
+    return len(items)
+
+
+def run_job(job):
+    """Job handler for 'travel_tips' jobs (see jobs.queue)."""
+    return {'tips': generate_tips(job.trip)}
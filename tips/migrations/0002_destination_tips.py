@@ -0,0 +1,34 @@
+# Generated by Django 4.2.24 on 2026-10-18 21:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tips', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DestinationTips',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('destination', models.CharField(max_length=100)),
+                ('month', models.PositiveSmallIntegerField()),
+                ('tips_json', models.TextField()),
+                ('model', models.CharField(blank=True, max_length=100)),
+                ('prompt_version', models.PositiveSmallIntegerField()),
+                ('hits', models.PositiveIntegerField(default=0)),
+                ('generated_at', models.DateTimeField()),
+            ],
+            options={
+                'verbose_name_plural': 'Destination Tips',
+                'ordering': ['destination', 'month'],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='destinationtips',
+            constraint=models.UniqueConstraint(fields=('destination', 'month'), name='unique_destination_tips'),
+        ),
+    ]
@@ -48,4 +48,25 @@ class TipItem(models.Model):
 
     def __str__(self):
         # Limit the string representation length
-        return f"{self.get_category_display()}: {self.content[:50]}..."
\ No newline at end of file
+        return f"{self.get_category_display()}: {self.content[:50]}..."
+
+
+class DestinationTips(models.Model):
+    """Generated tips for a destination in a given month, shared by every trip there (see tips/corpus.py)."""
+    destination = models.CharField(max_length=100)  # Normalized, see corpus.destination_key
+    month = models.PositiveSmallIntegerField()  # 1-12, from the trip's departure date
+    tips_json = models.TextField()
+    model = models.CharField(max_length=100, blank=True)
+    prompt_version = models.PositiveSmallIntegerField()
+    hits = models.PositiveIntegerField(default=0)  # Trips served from this entry
+    generated_at = models.DateTimeField()
+
+    class Meta:
+        ordering = ['destination', 'month']
+        verbose_name_plural = "Destination Tips"
+        constraints = [
+            models.UniqueConstraint(fields=['destination', 'month'], name='unique_destination_tips'),
+        ]
+
+    def __str__(self):
+        return f"Tips for {self.destination} in month {self.month}"
@@ -1,3 +1,113 @@
-from django.test import TestCase
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from unittest.mock import patch
+from datetime import date, timedelta
+import json
 
-# Create your tests here.
+from api.services import prompts
+from api.services.tips import TravelTipsGenerator
+from jobs import queue
+from jobs.models import Job
+from trips.models import Trip
+from .models import DestinationTips, TipItem
+from . import corpus
+from .generation import generate_tips
+
+BASE_JSON = json.dumps({'categories': [
+    {'name': 'Cultural Advice', 'items': [{'tip': 'Bow when greeting.'}]},
+    {'name': 'Local Information', 'items': [{'tip': 'Cherry blossoms peak in early April.'}]},
+]})
+ACTIVITY_JSON = json.dumps({'categories': [
+    {'name': 'Must Have Items', 'items': [{'tip': 'Bring your dive certification card.'}]},
+    {'name': 'Local Information', 'items': [{'tip': 'Book dive boats a week ahead.'}]},
+]})
+
+
+@override_settings(OPENROUTER_MODEL='test-model')
+class TipsCorpusTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('tipper', password='pw')
+        self.client.login(username='tipper', password='pw')
+
+    def _trip(self, destination='Tokyo', activities='', leaving=date(2026, 4, 2)):
+        return Trip.objects.create(user=self.user, destination=destination, date_leaving=leaving,
+                                   date_returning=leaving + timedelta(days=5), activities=activities)
+
+    def _store(self, **overrides):
+        fields = dict(destination='tokyo', month=4, tips_json=BASE_JSON, model='test-model',
+                      prompt_version=prompts.TIPS_VERSION, generated_at=timezone.now())
+        fields.update(overrides)
+        return DestinationTips.objects.create(**fields)
+
+    def _tips(self, trip):
+        return list(TipItem.objects.filter(travel_tips__trip=trip).values_list('category', 'content'))
+
+    @patch('tips.generation.TravelTipsGenerator.generate_destination_tips')
+    def test_stored_tips_returned_without_a_job(self, mock_generate):
+        entry = self._store()
+        trip = self._trip(destination=' TOKYO.', activities='Sightseeing')
+
+        response = self.client.post(f'/tips/{trip.id}/generate/')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['status'], 'succeeded')
+        self.assertEqual(len(self._tips(trip)), 2)
+        self.assertFalse(Job.objects.exists())
+        mock_generate.assert_not_called()
+        entry.refresh_from_db()
+        self.assertEqual(entry.hits, 1)
+
+    @patch('tips.generation.TravelTipsGenerator.generate_destination_tips', return_value=BASE_JSON)
+    def test_generated_once_per_destination_and_month(self, mock_generate):
+        first = self._trip()
+        self.assertEqual(self.client.post(f'/tips/{first.id}/generate/').status_code, 202)
+        queue.work('test', once=True)
+
+        mock_generate.assert_called_once_with('Tokyo', 4)
+        self.assertEqual(DestinationTips.objects.get().destination, 'tokyo')
+        second = self._trip(destination='tokyo', leaving=date(2027, 4, 20))
+        self.assertEqual(self.client.post(f'/tips/{second.id}/generate/').status_code, 200)
+        self.assertEqual(self._tips(second), self._tips(first))
+        self.assertEqual(mock_generate.call_count, 1)
+
+        # Another month is generated separately
+        self.assertEqual(self.client.post(f'/tips/{self._trip(leaving=date(2026, 11, 2)).id}/generate/').status_code, 202)
+
+    @patch('tips.generation.TravelTipsGenerator.generate_destination_tips', return_value='{"error": "quota"}')
+    def test_stale_entries_regenerated_and_failures_not_stored(self, mock_generate):
+        self._store(generated_at=timezone.now() - timedelta(days=365))
+        self._store(destination='paris', prompt_version=prompts.TIPS_VERSION - 1)
+        self.assertIsNone(corpus.get(self._trip()))
+        self.assertIsNone(corpus.get(self._trip(destination='Paris')))
+
+        with self.assertRaises(RuntimeError):
+            generate_tips(self._trip())
+        self.assertEqual(DestinationTips.objects.get(destination='tokyo').tips_json, BASE_JSON)
+
+    @patch('tips.generation.TravelTipsGenerator.generate_activity_tips', return_value=ACTIVITY_JSON)
+    @patch('tips.generation.TravelTipsGenerator.generate_destination_tips')
+    def test_activities_add_personalized_tips(self, mock_generate, mock_activities):
+        self._store()
+        trip = self._trip(activities='Scuba diving\nsightseeing')
+
+        self.assertEqual(self.client.post(f'/tips/{trip.id}/generate/').status_code, 202)
+        queue.work('test', once=True)
+
+        mock_generate.assert_not_called()
+        mock_activities.assert_called_once_with(trip)
+        self.assertEqual(sorted(self._tips(trip)), [
+            ('CULTURAL', 'Bow when greeting.'),
+            ('LOCAL_INFO', 'Book dive boats a week ahead.'),
+            ('LOCAL_INFO', 'Cherry blossoms peak in early April.'),
+            ('MUST_HAVE', 'Bring your dive certification card.'),
+        ])
+        self.assertFalse(corpus.needs_personalization('General tourism and leisure'))
+
+    @patch('api.services.tips._tips_flight.do', return_value=BASE_JSON)
+    def test_destination_spellings_share_one_generation(self, mock_flight):
+        TravelTipsGenerator.generate_destination_tips('Paris', 4)
+        TravelTipsGenerator.generate_destination_tips(' paris. ', 4)
+        keys = [call.args[0] for call in mock_flight.call_args_list]
+        self.assertEqual(keys[0], keys[1])
+        self.assertEqual(keys[0][1], corpus.destination_key('Paris'))
@@ -0,0 +1,109 @@
+# trips/preparation.py
+"""
+One-shot preparation of a trip: weather summary, packing list and travel tips.
+
+The stages overlap instead of running one request after another:
+
+    weather -> packing
+    tips
+
+Tips don't depend on the weather, so they are generated while the forecast
+is fetched; packing starts as soon as the weather summary is ready. The
+upstream and LLM calls run on a small thread pool and the results are saved
+on the calling thread, so the wall-clock time approaches the slowest branch
+rather than the sum of the stages. Run as the 'prepare_trip' job (see
+jobs.queue).
+"""
+
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.db import connection
+
+from api.services.packing import PackingListGenerator
+from packing.generation import save_items, weather_for
+from tips.generation import save_tips, tips_json
+
+logger = logging.getLogger(__name__)
+
+
+def _timed(timings, stage, func, *args, **kwargs):
+    started = time.monotonic()
+    try:
+        return func(*args, **kwargs)
+    finally:
+        timings[stage] = round(time.monotonic() - started, 3)
+
+
+def _weather_then_packing(trip, force_fresh, timings, weather):
+    try:
+        weather_summary, error = _timed(timings, 'weather', weather_for, trip)
+        weather['ok'] = error is None
+        if error:
+            weather['error'] = error  # Packing still goes ahead without the forecast
+        return _timed(timings, 'packing', PackingListGenerator.generate_packing_list,
+                      trip, weather_summary, force_fresh=force_fresh)
+    finally:
+        connection.close()  # Pool threads have their own connections
+
+
+def _tips(trip, timings):
+    try:
+        return _timed(timings, 'tips', tips_json, trip)
+    finally:
+        connection.close()
+
+
+def _save(future, save, trip):
+    try:
+        return {'ok': True, 'count': save(trip, future.result())}
+    except Exception as e:
+        logger.warning(f"Preparing trip {trip.id} failed: {e}", exc_info=True)
+        return {'ok': False, 'error': str(e)}
+
+
+def prepare(trip, force_fresh=False):
+    """
+    Fetches the weather summary and generates and saves the packing list and
+    travel tips for the trip. Returns per-stage outcomes and timings:
+
+        {'stages': {'weather': {...}, 'packing': {...}, 'tips': {...}},
+         'total_seconds': ..., 'sequential_seconds': ...}
+
+    where sequential_seconds is the sum of the stage times, i.e. roughly what
+    running them one after another would have taken. A failed generation
+    doesn't stop the other.
+
+    Raises:
+        RuntimeError: If neither the packing list nor the tips could be generated.
+    """
+    timings = {}
+    weather = {'ok': False}
+    started = time.monotonic()
+    with ThreadPoolExecutor(max_workers=2, thread_name_prefix='prepare-trip') as pool:
+        packing_future = pool.submit(_weather_then_packing, trip, force_fresh, timings, weather)
+        tips_future = pool.submit(_tips, trip, timings)
+        # Packing is saved while tips may still be generating
+        outcomes = {
+            'weather': weather,
+            'packing': _save(packing_future, save_items, trip),
+            'tips': _save(tips_future, save_tips, trip),
+        }
+    total = round(time.monotonic() - started, 3)
+
+    if not outcomes['packing']['ok'] and not outcomes['tips']['ok']:
+        raise RuntimeError(f"Packing: {outcomes['packing']['error']} Tips: {outcomes['tips']['error']}")
+
+    for stage, outcome in outcomes.items():
+        outcome['seconds'] = timings.get(stage)
+    logger.info(
+        f"Prepared trip {trip.id} in {total:.1f}s "
+        f"(weather {timings.get('weather')}s, packing {timings.get('packing')}s, tips {timings.get('tips')}s)"
+    )
+    return {'stages': outcomes, 'total_seconds': total, 'sequential_seconds': round(sum(timings.values()), 3)}
+
+
+def run_job(job):
+    """Job handler for 'prepare_trip' jobs (see jobs.queue)."""
+    return prepare(job.trip, force_fresh=bool(job.params.get('force_fresh')))
@@ -1,3 +1,69 @@
+from django.contrib.auth.models import User
 from django.test import TestCase
+from unittest.mock import patch
+from datetime import date
+import json
+import threading
 
-# Create your tests here.
+from jobs import queue
+from packing.models import PackingItem
+from tips.models import TipItem
+from .models import Trip
+from .preparation import prepare
+
+PACKING_JSON = json.dumps({'categories': [{'name': 'Clothing', 'items': [{'name': 'Fleece'}]}]})
+TIPS_JSON = json.dumps({'categories': [{'name': 'Cultural Advice', 'items': [{'tip': 'Tip generously.'}]}]})
+
+
+class PrepareTripTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('traveller', password='pw')
+        self.trip = Trip.objects.create(user=self.user, destination='Reykjavik', date_leaving=date(2026, 3, 1),
+                                        date_returning=date(2026, 3, 5))
+        self.client.login(username='traveller', password='pw')
+
+    @patch('trips.preparation.tips_json')
+    @patch('trips.preparation.PackingListGenerator.generate_packing_list', return_value=PACKING_JSON)
+    @patch('packing.generation.trip_weather_summary')
+    def test_tips_generated_while_weather_is_fetched(self, mock_weather, mock_packing, mock_tips):
+        tips_started = threading.Event()
+
+        def generate_tips(trip):
+            tips_started.set()
+            return TIPS_JSON
+
+        # The weather stage only finishes once tips generation has started alongside it
+        mock_weather.side_effect = lambda trip: 'Cold.' if tips_started.wait(5) else 'Sequential.'
+        mock_tips.side_effect = generate_tips
+
+        response = self.client.post(f'/trips/{self.trip.id}/prepare/')
+        self.assertEqual(response.status_code, 202)
+        queue.work('test', once=True)
+
+        status = self.client.get(response.json()['status_url']).json()
+        self.assertEqual(status['status'], 'succeeded')
+        self.assertEqual(mock_packing.call_args.args[1], 'Cold.')
+        stages = status['result']['stages']
+        self.assertEqual(stages['packing'], {'ok': True, 'count': 1, 'seconds': stages['packing']['seconds']})
+        self.assertEqual(stages['tips']['count'], 1)
+        self.assertIsNotNone(stages['weather']['seconds'])
+        self.assertEqual(PackingItem.objects.filter(packing_list__trip=self.trip).count(), 1)
+        self.assertEqual(TipItem.objects.filter(travel_tips__trip=self.trip).count(), 1)
+
+    @patch('trips.preparation.tips_json', return_value='{"error": "quota"}')
+    @patch('trips.preparation.PackingListGenerator.generate_packing_list', return_value=PACKING_JSON)
+    @patch('packing.generation.trip_weather_summary', return_value='Cold.')
+    def test_failed_stage_does_not_block_the_other(self, mock_weather, mock_packing, mock_tips):
+        result = prepare(self.trip)
+        self.assertTrue(result['stages']['packing']['ok'])
+        self.assertFalse(result['stages']['tips']['ok'])
+        self.assertIn('quota', result['stages']['tips']['error'])
+
+    @patch('trips.preparation.tips_json', return_value='{"error": "quota"}')
+    @patch('trips.preparation.PackingListGenerator.generate_packing_list', return_value=PACKING_JSON)
+    @patch('packing.generation.trip_weather_summary', return_value='Weather unavailable: Could not fetch forecast data.')
+    def test_weather_failure_reported(self, mock_weather, mock_packing, mock_tips):
+        stages = prepare(self.trip)['stages']
+        self.assertFalse(stages['weather']['ok'])
+        self.assertEqual(stages['weather']['error'], 'Could not fetch forecast data.')
+        self.assertTrue(stages['packing']['ok'])
@@ -10,4 +10,5 @@ urlpatterns = [
     path('<int:trip_id>/', views.trip_dashboard, name='dashboard'),
     path('<int:trip_id>/edit/', views.trip_edit, name='edit'),
     path('<int:trip_id>/delete/', views.trip_delete, name='delete'),
+    path('<int:trip_id>/prepare/', views.prepare_trip, name='prepare'),
 ]
\ No newline at end of file
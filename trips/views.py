@@ -1,7 +1,12 @@
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
+from django.http import JsonResponse
+from django.urls import reverse
+from django.views.decorators.http import require_POST
+from jobs.queue import enqueue
 from .models import Trip
 from .forms import TripForm
+from weather.models import WeatherSummary
 
 @login_required
 def trip_list(request):
@@ -29,8 +34,13 @@ def trip_create(request):
 @login_required
 def trip_dashboard(request, trip_id):
     trip = get_object_or_404(Trip, id=trip_id, user=request.user)
+    # Only show a summary generated for the trip's current destination and dates
+    weather_summary = WeatherSummary.objects.filter(trip=trip).first()
+    if weather_summary is not None and not weather_summary.matches(trip):
+        weather_summary = None
     context = {
         'trip': trip,
+        'weather_summary': weather_summary,
         'active_tab': 'overview'
     }
     return render(request, 'trips/dashboard.html', context)
@@ -77,4 +87,24 @@ def trip_delete(request, trip_id):
         trip.delete()
         return redirect('trips:list')
     else:
-        return redirect('trips:list')
\ No newline at end of file
+        return redirect('trips:list')
+
+
+@login_required
+@require_POST
+def prepare_trip(request, trip_id):
+    """
+    Queues weather, packing list and travel tips preparation as one background
+    job (see trips/preparation.py) and returns 202 with the job ID. The job's
+    result reports per-stage timings.
+    """
+    trip = get_object_or_404(Trip, id=trip_id, user=request.user)
+    force_fresh = request.GET.get('force_fresh') in ('1', 'true')
+    job, created = enqueue('prepare_trip', trip, request.user, {'force_fresh': force_fresh})
+    return JsonResponse({
+        'status': 'queued' if created else job.status,
+        'message': 'Trip preparation started.' if created else 'Trip preparation is already in progress.',
+        'job_id': job.id,
+        'status_url': reverse('jobs:status', args=[job.id]),
+    }, status=202)
+
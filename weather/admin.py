@@ -1,3 +1,16 @@
 from django.contrib import admin
 
-# Register your models here.
+from .models import GeocodeCache, WeatherSummary
+
+
+@admin.register(GeocodeCache)
+class GeocodeCacheAdmin(admin.ModelAdmin):
+    list_display = ('query', 'canonical_name', 'latitude', 'longitude', 'found', 'fetched_at')
+    list_filter = ('found',)
+    search_fields = ('query', 'canonical_name')
+
+
+@admin.register(WeatherSummary)
+class WeatherSummaryAdmin(admin.ModelAdmin):
+    list_display = ('trip', 'destination', 'start_date', 'end_date', 'forecast_version', 'expires_at')
+    search_fields = ('destination',)
@@ -0,0 +1,166 @@
+# weather/climate.py
+"""
+Monthly climate normals per grid cell.
+
+OWM only forecasts five days ahead, so trips further out are described from
+long-term monthly averages instead. Normals are imported offline from a CSV
+(see import_csv) into the ClimateNormal table, one row per grid cell and
+month. Lookups are a single indexed bounding-box query around the destination.
+"""
+
+import calendar
+import csv
+import logging
+from collections import Counter
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import DatabaseError, transaction
+
+from .forecast_frame import PRECIPITATION_POP_THRESHOLD
+from .models import ClimateNormal
+
+logger = logging.getLogger(__name__)
+
+CSV_COLUMNS = ('latitude', 'longitude', 'month', 'temp_min', 'temp_max', 'temp_mean', 'precipitation_mm', 'wet_days')
+_VALUE_FIELDS = ('temp_min', 'temp_max', 'temp_mean', 'precipitation_mm', 'wet_days', 'condition')
+BATCH_SIZE = 1000
+
+
+def _precision():
+    return getattr(settings, 'CLIMATE_GRID_PRECISION', 0.5)
+
+
+def grid_cell(latitude, longitude):
+    """Snaps coordinates to the centre of their climate grid cell."""
+    precision = _precision()
+
+    def snap(value):
+        return round(round(float(value) / precision) * precision, 4)
+
+    return snap(latitude), snap(longitude)
+
+
+def typical_condition(temp_mean, wet_days):
+    """Rough OWM-style condition name for a month, used when the CSV doesn't provide one."""
+    if wet_days >= 8 and temp_mean <= 0:
+        return 'Snow'
+    if wet_days >= 10:
+        return 'Rain'
+    if wet_days >= 5:
+        return 'Clouds'
+    return 'Clear'
+
+
+def _row_to_normal(row):
+    latitude, longitude = grid_cell(row['latitude'], row['longitude'])
+    month = int(row['month'])
+    if not 1 <= month <= 12:
+        raise ValueError(f"month must be 1-12, got {month}")
+    values = {name: float(row[name]) for name in CSV_COLUMNS[3:]}
+    values['condition'] = (row.get('condition') or '').strip() or typical_condition(values['temp_mean'], values['wet_days'])
+    return ClimateNormal(latitude=latitude, longitude=longitude, month=month, **values)
+
+
+def import_csv(path, clear=False):
+    """
+    Loads normals from a CSV with the columns in CSV_COLUMNS (plus an optional
+    'condition'). Rows for an existing cell and month replace it. Returns the
+    number of rows imported.
+    """
+    count = 0
+    with open(path, newline='', encoding='utf-8') as f, transaction.atomic():
+        if clear:
+            ClimateNormal.objects.all().delete()
+        batch = []
+        for row in csv.DictReader(f):
+            batch.append(_row_to_normal(row))
+            if len(batch) >= BATCH_SIZE:
+                count += _upsert(batch)
+                batch = []
+        count += _upsert(batch)
+    return count
+
+
+def _upsert(normals):
+    if not normals:
+        return 0
+    ClimateNormal.objects.bulk_create(
+        normals, update_conflicts=True,
+        unique_fields=['latitude', 'longitude', 'month'], update_fields=list(_VALUE_FIELDS),
+    )
+    return len(normals)
+
+
+def days_per_month(start_date, end_date):
+    """Counts the trip's days (end date inclusive) falling in each calendar month."""
+    counts = Counter()
+    day = start_date
+    while day <= end_date:
+        days_left_in_month = calendar.monthrange(day.year, day.month)[1] - day.day + 1
+        span = min(days_left_in_month, (end_date - day).days + 1)
+        counts[day.month] += span
+        day += timedelta(days=span)
+    return counts
+
+
+def normals_near(latitude, longitude, months):
+    """
+    {month: ClimateNormal} for the nearest grid cell within CLIMATE_SEARCH_RADIUS
+    degrees that has every requested month, or None.
+    """
+    radius = getattr(settings, 'CLIMATE_SEARCH_RADIUS', 1.0)
+    cell_lat, cell_lon = grid_cell(latitude, longitude)
+    try:
+        rows = list(ClimateNormal.objects.filter(
+            latitude__range=(cell_lat - radius, cell_lat + radius),
+            longitude__range=(cell_lon - radius, cell_lon + radius),
+            month__in=months,
+        ))
+    except DatabaseError as e:
+        logger.warning(f"Climate normals lookup failed for {latitude},{longitude}: {e}")
+        return None
+
+    cells = {}
+    for row in rows:
+        cells.setdefault((row.latitude, row.longitude), {})[row.month] = row
+    complete = [cell for cell, by_month in cells.items() if len(by_month) == len(set(months))]
+    if not complete:
+        return None
+    nearest = min(complete, key=lambda cell: (cell[0] - cell_lat) ** 2 + (cell[1] - cell_lon) ** 2)
+    return cells[nearest]
+
+
+def stats_for_dates(latitude, longitude, start_date, end_date):
+    """
+    Summary statistics for the trip dates in the same shape as
+    ForecastFrame.stats, weighted by the number of trip days in each month.
+    Returns None when no normals cover the destination.
+    """
+    weights = days_per_month(start_date, end_date)
+    if not weights:
+        return None
+    normals = normals_near(latitude, longitude, list(weights))
+    if normals is None:
+        return None
+
+    total = sum(weights.values())
+    month_lengths = {month: calendar.monthrange(start_date.year, month)[1] for month in weights}
+    avg_temp = sum(normals[month].temp_mean * days for month, days in weights.items()) / total
+    wet_fraction = sum(
+        normals[month].wet_days / month_lengths[month] * days
+        for month, days in weights.items()
+    ) / total
+    conditions = Counter()
+    for month, days in weights.items():
+        conditions[normals[month].condition] += days
+    return {
+        'min_temp': min(normals[month].temp_min for month in weights),
+        'max_temp': max(normals[month].temp_max for month in weights),
+        'avg_temp': avg_temp,
+        'avg_feels_like': avg_temp,  # Normals carry no apparent temperature
+        'conditions': [name for name, _ in conditions.most_common()],
+        'precipitation': wet_fraction > PRECIPITATION_POP_THRESHOLD,
+        'precipitation_mm': sum(normals[month].precipitation_mm / month_lengths[month] * days for month, days in weights.items()),
+        'months': [calendar.month_name[month] for month in weights],
+    }
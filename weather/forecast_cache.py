@@ -0,0 +1,113 @@
+# weather/forecast_cache.py
+"""
+Forecast cache keyed by lat/lon grid cell.
+
+OpenWeatherMap only publishes a new 5-day/3-hour forecast once per model cycle,
+so entries expire just after the next cycle is published instead of after a
+flat TTL. Entries live in the 'shared' cache so every gunicorn worker sees them.
+
+Each forecast is also kept as a "last known good" copy for FORECAST_STALE_TTL,
+which is served (marked stale) while a refresh runs or while OWM is down.
+"""
+
+import logging
+import math
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = "owm_forecast"
+STALE_KEY_PREFIX = "owm_forecast_stale"
+MIN_TIMEOUT = 60  # Never cache for less than a minute, even right before a refresh
+
+
+def _cache():
+    return caches['shared']
+
+
+def grid_cell(latitude, longitude):
+    """Snaps coordinates to the centre of their grid cell (FORECAST_GRID_PRECISION degrees wide)."""
+    precision = getattr(settings, 'FORECAST_GRID_PRECISION', 0.1)
+    decimals = max(0, -math.floor(math.log10(precision))) + 1
+
+    def snap(value):
+        return round(round(float(value) / precision) * precision, decimals)
+
+    return snap(latitude), snap(longitude)
+
+
+def cache_key(cell):
+    return f"{KEY_PREFIX}:{cell[0]:.4f}:{cell[1]:.4f}"
+
+
+def seconds_until_refresh(now=None):
+    """Seconds until OWM publishes the next forecast cycle (cycle boundary plus publish delay)."""
+    now = time.time() if now is None else now
+    interval = getattr(settings, 'FORECAST_REFRESH_HOURS', 3) * 3600
+    delay = getattr(settings, 'FORECAST_REFRESH_DELAY', 15 * 60)
+    next_refresh = (math.floor((now - delay) / interval) + 1) * interval + delay
+    return max(MIN_TIMEOUT, int(math.ceil(next_refresh - now)))
+
+
+def get(cell):
+    """Returns the cached OWM forecast payload for the cell, or None."""
+    try:
+        return _cache().get(cache_key(cell))
+    except Exception as e:
+        logger.warning(f"Forecast cache read failed for {cell}: {e}")
+        return None
+
+
+def stale_key(cell):
+    return f"{STALE_KEY_PREFIX}:{cell[0]:.4f}:{cell[1]:.4f}"
+
+
+def store(cell, forecast_data):
+    try:
+        _cache().set(cache_key(cell), forecast_data, seconds_until_refresh())
+        _cache().set(stale_key(cell), forecast_data, getattr(settings, 'FORECAST_STALE_TTL', 24 * 60 * 60))
+    except Exception as e:
+        logger.warning(f"Forecast cache write failed for {cell}: {e}")
+
+
+def get_stale(cell):
+    """Returns the last known good forecast for the cell, even if it has been superseded, or None."""
+    try:
+        return _cache().get(stale_key(cell))
+    except Exception as e:
+        logger.warning(f"Stale forecast cache read failed for {cell}: {e}")
+        return None
+
+
+def delete(cell):
+    _cache().delete_many([cache_key(cell), stale_key(cell)])
+
+
+def forecast_version(forecast_data):
+    """Identifies the model cycle a forecast came from by its first and last timestamps."""
+    entries = forecast_data.get('list') or [{'dt': 0}]
+    return f"{entries[0]['dt']}-{entries[-1]['dt']}"
+
+
+def daily_key(cell, forecast_data, start_epoch, end_epoch):
+    """Key for a per-day aggregate of a cached forecast, scoped to its forecast version."""
+    version = forecast_version(forecast_data)
+    return f"{KEY_PREFIX}:daily:{cell[0]:.4f}:{cell[1]:.4f}:{version}:{start_epoch}:{end_epoch}"
+
+
+def get_daily(key):
+    try:
+        return _cache().get(key)
+    except Exception as e:
+        logger.warning(f"Daily forecast cache read failed for {key}: {e}")
+        return None
+
+
+def store_daily(key, days):
+    try:
+        _cache().set(key, days, seconds_until_refresh())
+    except Exception as e:
+        logger.warning(f"Daily forecast cache write failed for {key}: {e}")
@@ -0,0 +1,197 @@
+# weather/forecast_frame.py
+"""
+Columnar view of an OpenWeatherMap /forecast payload.
+
+The 3-hour entries are converted once into NumPy columns (timestamps, temp,
+feels_like, temp_min, temp_max, pop and condition codes). Date windows are then
+found with searchsorted and summary statistics are vectorized reductions, so
+summarizing many trips against the same forecast stays cheap.
+"""
+
+from datetime import datetime, time, timedelta, timezone
+
+import numpy as np
+
+# Conditions that imply precipitation even when 'pop' is missing or low
+PRECIPITATION_CONDITIONS = ('Rain', 'Snow', 'Drizzle', 'Thunderstorm')
+PRECIPITATION_POP_THRESHOLD = 0.3
+
+_COLUMNS = ('temp', 'feels_like', 'temp_min', 'temp_max', 'pop')
+_DAY = 24 * 3600
+
+# Fields a slimmed-down 3-hour entry can carry (see slim_entry)
+ENTRY_FIELDS = ('dt', 'temp', 'feels_like', 'temp_min', 'temp_max', 'pop', 'humidity', 'wind_speed',
+                'condition', 'description', 'icon')
+# Fields of a per-day aggregate (see ForecastFrame.daily)
+DAILY_FIELDS = ('date', 'temp_min', 'temp_max', 'temp_avg', 'pop', 'condition', 'description', 'icon', 'hours')
+
+
+def day_start_epoch(day):
+    """UTC midnight of a date, as epoch seconds."""
+    return int(datetime.combine(day, time.min, tzinfo=timezone.utc).timestamp())
+
+
+def date_window(start_date, end_date):
+    """Epoch bounds [start of start_date, start of the day after end_date) in UTC."""
+    return day_start_epoch(start_date), day_start_epoch(end_date + timedelta(days=1))
+
+
+def _weather(item):
+    return item['weather'][0] if item.get('weather') else {}
+
+
+def slim_entry(item, fields=ENTRY_FIELDS):
+    """Flattens an OWM 3-hour entry to the requested fields."""
+    main = item.get('main', {})
+    weather = _weather(item)
+    values = {
+        'dt': item['dt'],
+        'temp': main.get('temp'),
+        'feels_like': main.get('feels_like'),
+        'temp_min': main.get('temp_min'),
+        'temp_max': main.get('temp_max'),
+        'pop': item.get('pop', 0.0),
+        'humidity': main.get('humidity'),
+        'wind_speed': item.get('wind', {}).get('speed'),
+        'condition': weather.get('main', 'Unknown'),
+        'description': weather.get('description', ''),
+        'icon': weather.get('icon', ''),
+    }
+    return {field: values[field] for field in fields}
+
+
+class ForecastFrame:
+    """Immutable, column-oriented slice of forecast entries."""
+
+    def __init__(self, entries, timestamps, columns, condition_codes, conditions):
+        self._entries = entries
+        self.timestamps = timestamps
+        self.temp = columns['temp']
+        self.feels_like = columns['feels_like']
+        self.temp_min = columns['temp_min']
+        self.temp_max = columns['temp_max']
+        self.pop = columns['pop']
+        self.condition_codes = condition_codes
+        self.conditions = conditions  # Condition names, indexed by code
+
+    @classmethod
+    def from_owm(cls, forecast_data):
+        """Builds a frame from an OWM /forecast payload in a single pass over its entries."""
+        entries = forecast_data.get('list', [])
+        conditions = {}
+        rows = []
+        codes = []
+        for item in entries:
+            main = item['main']
+            temp = main['temp']
+            rows.append((
+                item['dt'],
+                temp,
+                main.get('feels_like', temp),
+                main.get('temp_min', temp),
+                main.get('temp_max', temp),
+                item.get('pop', 0.0),
+            ))
+            name = item['weather'][0]['main'] if item.get('weather') else 'Unknown'
+            codes.append(conditions.setdefault(name, len(conditions)))
+
+        table = np.array(rows, dtype=np.float64).reshape(len(rows), len(_COLUMNS) + 1)
+        timestamps = table[:, 0].astype(np.int64)
+        condition_codes = np.array(codes, dtype=np.int16)
+
+        # OWM returns entries in time order; guard the searchsorted invariant anyway
+        if len(timestamps) > 1 and np.any(np.diff(timestamps) < 0):
+            order = np.argsort(timestamps, kind='stable')
+            table, timestamps, condition_codes = table[order], timestamps[order], condition_codes[order]
+            entries = [entries[i] for i in order]
+
+        columns = {name: table[:, i + 1] for i, name in enumerate(_COLUMNS)}
+        return cls(list(entries), timestamps, columns, condition_codes, tuple(conditions))
+
+    def __len__(self):
+        return len(self.timestamps)
+
+    @property
+    def entries(self):
+        """The original OWM entries covered by this frame."""
+        return self._entries
+
+    def _slice(self, start, stop):
+        columns = {name: getattr(self, name)[start:stop] for name in _COLUMNS}
+        return ForecastFrame(
+            self._entries[start:stop], self.timestamps[start:stop], columns,
+            self.condition_codes[start:stop], self.conditions,
+        )
+
+    def window(self, start_epoch, end_epoch):
+        """Entries with start_epoch <= dt < end_epoch."""
+        start, stop = np.searchsorted(self.timestamps, [start_epoch, end_epoch], side='left')
+        return self._slice(int(start), int(stop))
+
+    def window_for_dates(self, start_date, end_date):
+        """Entries falling on start_date through end_date (inclusive, UTC days)."""
+        return self.window(*date_window(start_date, end_date))
+
+    def dominant_conditions(self):
+        """Condition names ordered by frequency, ties broken by first appearance."""
+        if not len(self):
+            return []
+        codes, first_index, counts = np.unique(self.condition_codes, return_index=True, return_counts=True)
+        order = np.lexsort((first_index, -counts))
+        return [self.conditions[codes[i]] for i in order]
+
+    def precipitation_likely(self):
+        if not len(self):
+            return False
+        if np.any(self.pop > PRECIPITATION_POP_THRESHOLD):
+            return True
+        wet_codes = [code for code, name in enumerate(self.conditions) if name in PRECIPITATION_CONDITIONS]
+        return bool(np.isin(self.condition_codes, wet_codes).any())
+
+    def daily(self):
+        """
+        Per-UTC-day aggregates: min/max/avg temperature, highest precipitation
+        probability, dominant condition (with its description and icon) and a
+        compact list of the day's 3-hour readings.
+        """
+        if not len(self):
+            return []
+        day_index = self.timestamps // _DAY
+        starts = np.flatnonzero(np.r_[True, np.diff(day_index) != 0])
+        stops = np.r_[starts[1:], len(self)]
+        temp_min = np.minimum.reduceat(self.temp_min, starts)
+        temp_max = np.maximum.reduceat(self.temp_max, starts)
+        temp_avg = np.add.reduceat(self.temp, starts) / (stops - starts)
+        pop = np.maximum.reduceat(self.pop, starts)
+
+        days = []
+        for i, (start, stop) in enumerate(zip(starts, stops)):
+            day = self._slice(int(start), int(stop))
+            condition = day.dominant_conditions()[0]
+            representative = day.entries[int(np.argmax(day.condition_codes == self.conditions.index(condition)))]
+            weather = _weather(representative)
+            days.append({
+                'date': datetime.fromtimestamp(int(day_index[start]) * _DAY, tz=timezone.utc).date().isoformat(),
+                'temp_min': round(float(temp_min[i]), 1),
+                'temp_max': round(float(temp_max[i]), 1),
+                'temp_avg': round(float(temp_avg[i]), 1),
+                'pop': round(float(pop[i]), 2),
+                'condition': condition,
+                'description': weather.get('description', ''),
+                'icon': weather.get('icon', '').replace('n', 'd'),  # Day icon for the day card
+                'hours': [slim_entry(item, ('dt', 'temp', 'icon', 'description')) for item in day.entries],
+            })
+        return days
+
+    def stats(self):
+        """Summary statistics for the frame, or None when it is empty."""
+        if not len(self):
+            return None
+        return {
+            'min_temp': float(self.temp.min()),
+            'max_temp': float(self.temp.max()),
+            'avg_temp': float(self.temp.mean()),
+            'avg_feels_like': float(self.feels_like.mean()),
+            'conditions': self.dominant_conditions(),
+            'precipitation': self.precipitation_likely(),
+        }
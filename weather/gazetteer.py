@@ -0,0 +1,226 @@
+# weather/gazetteer.py
+"""
+Offline gazetteer for destination geocoding.
+
+A cities CSV (weather/data/cities.csv by default, or GAZETTEER_CSV) is compiled
+into a directory of .npy arrays that every worker memory-maps read-only:
+
+* keys:       sorted, fixed-width ASCII lookup keys ('paris', 'paris, france',
+              'paris, fr', alternate names, ...)
+* key_rows:   the city row each key points to
+* coords:     (latitude, longitude) per city
+* population: used to rank ambiguous names and prefix matches
+* names:      display name per city ("Paris, France"), UTF-8
+
+Exact and prefix lookups are binary searches over `keys`, so a hit costs a few
+microseconds and needs neither the database nor Radar.
+"""
+
+import csv
+import logging
+import os
+import shutil
+import tempfile
+import threading
+import unicodedata
+from contextlib import contextmanager
+from pathlib import Path
+
+import numpy as np
+from django.conf import settings
+
+try:
+    import fcntl
+except ImportError:  # Windows: builds aren't serialized across processes
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CSV = Path(__file__).resolve().parent / 'data' / 'cities.csv'
+ARRAYS = ('keys', 'key_rows', 'coords', 'population', 'names')
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def csv_path():
+    return Path(getattr(settings, 'GAZETTEER_CSV', None) or DEFAULT_CSV)
+
+
+def index_dir():
+    default = Path(settings.BASE_DIR) / 'var' / 'gazetteer'
+    return Path(getattr(settings, 'GAZETTEER_INDEX_DIR', None) or default)
+
+
+def normalize(text):
+    """ASCII-folded, lowercased key: 'São Paulo,Brazil ' -> 'sao paulo, brazil'."""
+    folded = unicodedata.normalize('NFKD', text or '').encode('ascii', 'ignore').decode('ascii')
+    parts = (" ".join(part.lower().split()) for part in folded.split(','))
+    return ", ".join(part for part in parts if part)
+
+
+@contextmanager
+def _build_lock(target):
+    """Serializes index builds across processes, e.g. gunicorn workers starting together."""
+    target.parent.mkdir(parents=True, exist_ok=True)
+    with open(target.parent / f".{target.name}.lock", 'w') as lock_file:
+        if fcntl is not None:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+        yield  # Closing the file releases the lock
+
+
+def build(source=None, target=None):
+    """
+    Compiles the cities CSV into the index directory and returns the number of cities.
+    Running workers keep serving the index they opened until restarted.
+
+    Expected columns: name, country, country_code, latitude, longitude,
+    population and optionally alternate_names (';'-separated).
+    """
+    target = Path(target or index_dir())
+    with _build_lock(target):
+        return _build(Path(source or csv_path()), target)
+
+
+def _build(source, target):
+
+    keys, key_rows, coords, population, names = [], [], [], [], []
+    with open(source, newline='', encoding='utf-8') as f:
+        for record in csv.DictReader(f):
+            try:
+                latitude, longitude = float(record['latitude']), float(record['longitude'])
+            except (KeyError, TypeError, ValueError):
+                logger.warning(f"Skipping gazetteer row without coordinates: {record}")
+                continue
+            row = len(coords)
+            coords.append((latitude, longitude))
+            population.append(int(float(record.get('population') or 0)))
+            country = (record.get('country') or '').strip()
+            names.append(f"{record['name'].strip()}, {country}" if country else record['name'].strip())
+
+            aliases = [record['name']] + (record.get('alternate_names') or '').split(';')
+            qualifiers = [country, (record.get('country_code') or '').strip()]
+            for alias in filter(None, (normalize(alias) for alias in aliases)):
+                keys.append(alias)
+                key_rows.append(row)
+                for qualifier in filter(None, (normalize(q) for q in qualifiers)):
+                    keys.append(f"{alias}, {qualifier}")
+                    key_rows.append(row)
+
+    key_array = np.array(keys, dtype=np.bytes_)
+    order = np.argsort(key_array, kind='stable')
+    arrays = {
+        'keys': key_array[order],
+        'key_rows': np.array(key_rows, dtype=np.int32)[order],
+        'coords': np.array(coords, dtype=np.float64).reshape(-1, 2),
+        'population': np.array(population, dtype=np.int64),
+        'names': np.array([name.encode('utf-8') for name in names], dtype=np.bytes_),
+    }
+
+    # Write next to the target and swap it in, so running workers never see a half-built index
+    target.parent.mkdir(parents=True, exist_ok=True)
+    staging = Path(tempfile.mkdtemp(prefix='.gazetteer-', dir=target.parent))
+    for name, array in arrays.items():
+        np.save(staging / f"{name}.npy", array)
+    previous = None
+    try:
+        if target.exists():
+            previous = target.with_name(f".{target.name}-old-{os.getpid()}")
+            os.replace(target, previous)
+        os.replace(staging, target)
+    except OSError as e:
+        # Only reachable when another process installed an index without the lock (e.g. no fcntl)
+        shutil.rmtree(staging, ignore_errors=True)
+        if not (target / 'keys.npy').exists():
+            raise
+        logger.info(f"Gazetteer index at {target} was installed by another process ({e}); keeping it")
+    if previous is not None:
+        shutil.rmtree(previous, ignore_errors=True)  # Workers still mapping it keep their open files
+    return len(coords)
+
+
+class _Index:
+    def __init__(self, directory):
+        for name in ARRAYS:
+            setattr(self, name, np.load(directory / f"{name}.npy", mmap_mode='r'))
+        self.width = self.keys.dtype.itemsize
+
+    def _entry(self, row):
+        return {
+            'found': True,
+            'latitude': float(self.coords[row, 0]),
+            'longitude': float(self.coords[row, 1]),
+            'name': self.names[row].decode('utf-8'),
+        }
+
+    def exact(self, key):
+        encoded = key.encode('ascii')
+        if len(encoded) > self.width:
+            return None
+        start = np.searchsorted(self.keys, encoded, side='left')
+        stop = np.searchsorted(self.keys, encoded, side='right')
+        if start == stop:
+            return None
+        rows = np.asarray(self.key_rows[start:stop])
+        return self._entry(int(rows[np.argmax(self.population[rows])]))  # Most populous wins
+
+    def prefix(self, key, limit):
+        encoded = key.encode('ascii')[:self.width]
+        # Every key starting with the prefix sorts in [prefix, prefix + 0xff)
+        start, stop = np.searchsorted(self.keys, [encoded, encoded + b'\xff'], side='left')
+        rows = np.unique(np.asarray(self.key_rows[start:stop]))
+        if not len(rows):
+            return []
+        ranked = rows[np.argsort(-np.asarray(self.population[rows]), kind='stable')][:limit]
+        return [self._entry(int(row)) for row in ranked]
+
+
+def _load():
+    global _index
+    if not getattr(settings, 'GAZETTEER_ENABLED', True):
+        return None
+    if _index is not None:
+        return _index or None
+    with _index_lock:
+        if _index is None:
+            _index = _open_index()
+    return _index or None
+
+
+def _open_index():
+    directory = index_dir()
+    try:
+        if not (directory / 'keys.npy').exists() and csv_path().exists():
+            with _build_lock(directory):
+                if not (directory / 'keys.npy').exists():  # Unless another worker built it meanwhile
+                    logger.info(f"Building gazetteer index from {csv_path()}")
+                    _build(csv_path(), directory)
+        return _Index(directory)
+    except Exception as e:
+        logger.warning(f"Gazetteer unavailable, falling back to remote geocoding: {e}")
+        return False  # Remember the failure; reset() retries
+
+
+def lookup(query):
+    """Returns {'found', 'latitude', 'longitude', 'name'} for an exact name match, or None."""
+    index = _load()
+    key = normalize(query)
+    if index is None or not key:
+        return None
+    return index.exact(key)
+
+
+def prefix(query, limit=8):
+    """Cities whose name starts with the query, most populous first."""
+    index = _load()
+    key = normalize(query)
+    if index is None or not key:
+        return []
+    return index.prefix(key, limit)
+
+
+def reset():
+    """Drops the loaded index so the next lookup re-opens it (e.g. after a rebuild)."""
+    global _index
+    with _index_lock:
+        _index = None
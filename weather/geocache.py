@@ -0,0 +1,159 @@
+# weather/geocache.py
+"""
+Shared geocode cache for destination lookups.
+
+Lookups check a small in-process LRU first, then the GeocodeCache table, and
+only fall back to the remote geocoder when neither has a fresh entry.
+"""
+
+import logging
+import threading
+import time
+from collections import OrderedDict
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import DatabaseError
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+# Defaults can be overridden in Django settings
+DEFAULT_TTL = 60 * 60 * 24 * 30        # Cities don't move; 30 days
+DEFAULT_NEGATIVE_TTL = 60 * 60         # Retry unknown destinations after an hour
+DEFAULT_LRU_SIZE = 1024
+
+
+def _ttl():
+    return getattr(settings, 'GEOCODE_CACHE_TTL', DEFAULT_TTL)
+
+
+def _negative_ttl():
+    return getattr(settings, 'GEOCODE_NEGATIVE_CACHE_TTL', DEFAULT_NEGATIVE_TTL)
+
+
+class LRUCache:
+    """Thread-safe LRU mapping with a per-entry expiry (monotonic seconds)."""
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            value, expires_at = item
+            if expires_at <= time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl):
+        with self._lock:
+            self._data[key] = (value, time.monotonic() + ttl)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+_lru = LRUCache(getattr(settings, 'GEOCODE_LRU_SIZE', DEFAULT_LRU_SIZE))
+
+
+def normalize_query(query):
+    """Lowercase and collapse whitespace so 'Paris ' and 'paris' share an entry."""
+    return " ".join((query or "").lower().split())
+
+
+def _entry(found, latitude=None, longitude=None, name=''):
+    return {'found': found, 'latitude': latitude, 'longitude': longitude, 'name': name}
+
+
+def get(query, stale_ok=False):
+    """
+    Returns a cached geocode entry for the query, or None on a miss.
+
+    The entry is a dict with 'found', 'latitude', 'longitude' and 'name'.
+    A 'found' value of False is a cached negative answer. With stale_ok, an
+    expired positive entry is returned too, flagged with 'stale': True.
+    """
+    # Imported lazily so this module can be imported before the app registry is ready
+    from .models import GeocodeCache
+
+    key = normalize_query(query)
+    if not key:
+        return None
+
+    cached = _lru.get(key)
+    if cached is not None:
+        return cached
+
+    try:
+        row = GeocodeCache.objects.filter(query=key).first()
+    except DatabaseError as e:
+        logger.warning(f"Geocode cache lookup failed for '{key}': {e}")
+        return None
+    if row is None:
+        return None
+
+    ttl = _ttl() if row.found else _negative_ttl()
+    remaining = (row.fetched_at + timedelta(seconds=ttl) - timezone.now()).total_seconds()
+    if remaining <= 0:
+        if stale_ok and row.found:
+            return dict(_entry(True, row.latitude, row.longitude, row.canonical_name), stale=True)
+        return None
+
+    entry = _entry(row.found, row.latitude, row.longitude, row.canonical_name)
+    _lru.set(key, entry, remaining)
+    return entry
+
+
+def store(query, latitude, longitude, name=''):
+    """Records a successful geocode result."""
+    _save(normalize_query(query), _entry(True, latitude, longitude, name or ''), _ttl())
+
+
+def store_not_found(query):
+    """Records that the geocoder had no addresses for the query."""
+    _save(normalize_query(query), _entry(False), _negative_ttl())
+
+
+def _save(key, entry, ttl):
+    from .models import GeocodeCache
+
+    if not key or ttl <= 0:
+        return
+    _lru.set(key, entry, ttl)
+    try:
+        GeocodeCache.objects.update_or_create(
+            query=key,
+            defaults={
+                'latitude': entry['latitude'],
+                'longitude': entry['longitude'],
+                'canonical_name': entry['name'][:255],
+                'found': entry['found'],
+                'fetched_at': timezone.now(),
+            },
+        )
+    except DatabaseError as e:
+        # The in-process entry still helps; don't fail the request over the cache
+        logger.warning(f"Could not persist geocode cache entry for '{key}': {e}")
+
+
+def clear_local():
+    """Drops the in-process layer (the table is left untouched)."""
+    _lru.clear()
@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from weather import gazetteer
+
+
+class Command(BaseCommand):
+    help = "Compiles a cities CSV into the memory-mapped gazetteer index used for offline geocoding."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--csv', default=None,
+                            help="Cities CSV to compile (default: GAZETTEER_CSV or weather/data/cities.csv).")
+        parser.add_argument('--output', default=None,
+                            help="Index directory to write (default: GAZETTEER_INDEX_DIR).")
+
+    def handle(self, *args, **options):
+        source = options['csv'] or gazetteer.csv_path()
+        target = options['output'] or gazetteer.index_dir()
+        try:
+            count = gazetteer.build(source, target)
+        except (OSError, KeyError, ValueError) as e:
+            raise CommandError(f"Could not build gazetteer from {source}: {e}")
+        self.stdout.write(self.style.SUCCESS(f"Indexed {count} cities from {source} into {target}."))
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from weather import climate
+
+
+class Command(BaseCommand):
+    help = "Imports monthly climate normals per grid cell from a CSV (used for trips beyond the forecast range)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('csv', help=f"CSV with the columns {', '.join(climate.CSV_COLUMNS)} and an optional condition.")
+        parser.add_argument('--clear', action='store_true', help="Delete all existing normals before importing.")
+
+    def handle(self, *args, **options):
+        source = options['csv']
+        try:
+            count = climate.import_csv(source, clear=options['clear'])
+        except (OSError, KeyError, ValueError) as e:
+            raise CommandError(f"Could not import climate normals from {source}: {e}")
+        self.stdout.write(self.style.SUCCESS(f"Imported {count} climate normals from {source}."))
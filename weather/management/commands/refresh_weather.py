@@ -0,0 +1,45 @@
+import logging
+import time
+
+from django.core.management.base import BaseCommand
+
+from weather import forecast_cache
+from weather.refresh import horizon_days, refresh_upcoming
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = "Warms geocode and forecast caches for trips departing within the forecast horizon."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--loop', action='store_true',
+                            help="Keep running, refreshing after each OWM model update.")
+        parser.add_argument('--interval', type=int, default=None,
+                            help="Seconds between runs in --loop mode (default: wait for the next model update).")
+        parser.add_argument('--workers', type=int, default=None,
+                            help="Destinations refreshed concurrently (default: WEATHER_REFRESH_WORKERS).")
+        parser.add_argument('--horizon-days', type=int, default=None,
+                            help="Look-ahead for trip departures (default: WEATHER_REFRESH_HORIZON_DAYS).")
+
+    def handle(self, *args, **options):
+        days = options['horizon_days'] if options['horizon_days'] is not None else horizon_days()
+        while True:
+            started = time.monotonic()
+            try:
+                result = refresh_upcoming(days=days, workers=options['workers'])
+                self.stdout.write(
+                    f"Refreshed weather for {result['refreshed']} destination(s), "
+                    f"{result['failed']} failed in {time.monotonic() - started:.1f}s."
+                )
+            except Exception as e:
+                if not options['loop']:
+                    raise
+                logger.exception(f"Weather refresh run failed: {e}")
+
+            if not options['loop']:
+                return
+
+            # Cached forecasts expire right after OWM publishes a new cycle; run again just after that
+            sleep_for = options['interval'] or forecast_cache.seconds_until_refresh() + 5
+            time.sleep(sleep_for)
@@ -0,0 +1,30 @@
+# Generated by Django 4.2.24 on 2026-10-18 21:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GeocodeCache',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('query', models.CharField(max_length=255, unique=True)),
+                ('latitude', models.FloatField(blank=True, null=True)),
+                ('longitude', models.FloatField(blank=True, null=True)),
+                ('canonical_name', models.CharField(blank=True, max_length=255)),
+                ('found', models.BooleanField(default=True)),
+                ('fetched_at', models.DateTimeField()),
+            ],
+            options={
+                'verbose_name_plural': 'Geocode cache',
+                'ordering': ['query'],
+            },
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 4.2.24 on 2026-10-18 21:33
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('trips', '0001_initial'),
+        ('weather', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='WeatherSummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('destination', models.CharField(max_length=100)),
+                ('start_date', models.DateField()),
+                ('end_date', models.DateField()),
+                ('forecast_version', models.CharField(max_length=64)),
+                ('summary', models.TextField()),
+                ('expires_at', models.DateTimeField()),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('trip', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='weather_summary', to='trips.trip')),
+            ],
+            options={
+                'verbose_name_plural': 'Weather summaries',
+            },
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 4.2.24 on 2026-10-18 21:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('weather', '0002_weathersummary'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ClimateNormal',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('latitude', models.FloatField()),
+                ('longitude', models.FloatField()),
+                ('month', models.PositiveSmallIntegerField()),
+                ('temp_min', models.FloatField()),
+                ('temp_max', models.FloatField()),
+                ('temp_mean', models.FloatField()),
+                ('precipitation_mm', models.FloatField()),
+                ('wet_days', models.FloatField()),
+                ('condition', models.CharField(max_length=20)),
+            ],
+            options={
+                'ordering': ['latitude', 'longitude', 'month'],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='climatenormal',
+            constraint=models.UniqueConstraint(fields=('latitude', 'longitude', 'month'), name='unique_climate_normal'),
+        ),
+    ]
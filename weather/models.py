@@ -1,3 +1,72 @@
 from django.db import models
 
-# Create your models here.
+
+class GeocodeCache(models.Model):
+    """Persisted result of geocoding a destination string, shared by all workers."""
+    query = models.CharField(max_length=255, unique=True)  # Normalized destination string
+    latitude = models.FloatField(null=True, blank=True)
+    longitude = models.FloatField(null=True, blank=True)
+    canonical_name = models.CharField(max_length=255, blank=True)
+    found = models.BooleanField(default=True)  # False marks a cached "no addresses" answer
+    fetched_at = models.DateTimeField()
+
+    class Meta:
+        ordering = ['query']
+        verbose_name_plural = "Geocode cache"
+
+    def __str__(self):
+        if not self.found:
+            return f"{self.query} (not found)"
+        return f"{self.query} -> {self.latitude:.4f},{self.longitude:.4f}"
+
+
+class WeatherSummary(models.Model):
+    """
+    Weather summary last generated for a trip, reused (e.g. by packing list
+    generation) until the trip's destination or dates change or OWM publishes
+    a new forecast cycle.
+    """
+    trip = models.OneToOneField('trips.Trip', on_delete=models.CASCADE, related_name='weather_summary')
+    destination = models.CharField(max_length=100)
+    start_date = models.DateField()
+    end_date = models.DateField()
+    forecast_version = models.CharField(max_length=64)  # See forecast_cache.forecast_version
+    summary = models.TextField()
+    expires_at = models.DateTimeField()  # When the next forecast cycle may have replaced forecast_version
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name_plural = "Weather summaries"
+
+    def __str__(self):
+        return f"{self.destination} ({self.start_date} to {self.end_date}) @ {self.forecast_version}"
+
+    def matches(self, trip):
+        """True when the summary was generated for the trip's current destination and dates."""
+        return (
+            self.destination == trip.destination
+            and self.start_date == trip.date_leaving
+            and self.end_date == trip.date_returning
+        )
+
+
+class ClimateNormal(models.Model):
+    """Long-term monthly averages for one climate grid cell (see weather/climate.py)."""
+    latitude = models.FloatField()  # Cell centre, snapped to CLIMATE_GRID_PRECISION
+    longitude = models.FloatField()
+    month = models.PositiveSmallIntegerField()  # 1-12
+    temp_min = models.FloatField()  # Mean daily minimum, °C
+    temp_max = models.FloatField()  # Mean daily maximum, °C
+    temp_mean = models.FloatField()
+    precipitation_mm = models.FloatField()  # Monthly total
+    wet_days = models.FloatField()  # Days with at least 1 mm of precipitation
+    condition = models.CharField(max_length=20)  # OWM-style condition name, e.g. 'Rain'
+
+    class Meta:
+        ordering = ['latitude', 'longitude', 'month']
+        constraints = [
+            models.UniqueConstraint(fields=['latitude', 'longitude', 'month'], name='unique_climate_normal'),
+        ]
+
+    def __str__(self):
+        return f"{self.latitude:.2f},{self.longitude:.2f} month {self.month}"
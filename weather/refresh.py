@@ -0,0 +1,70 @@
+# weather/refresh.py
+"""
+Ahead-of-time forecast warming for upcoming trips.
+
+Trips departing within the forecast horizon are grouped by destination and each
+destination is geocoded and its forecast fetched once, with bounded
+concurrency. The forecast tab and packing-list generation then read the warm
+geocode and forecast caches instead of calling Radar/OWM on the request path.
+"""
+
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+
+from trips.models import Trip
+from . import geocache
+from .services import fetch_forecasts
+
+logger = logging.getLogger(__name__)
+
+
+def horizon_days():
+    return getattr(settings, 'WEATHER_REFRESH_HORIZON_DAYS', 5)
+
+
+def upcoming_destinations(days=None, today=None):
+    """
+    Returns {normalized destination: display destination} for trips that overlap
+    the next `days` days (the OWM 5-day forecast window by default).
+    """
+    days = horizon_days() if days is None else days
+    today = today or timezone.now().date()
+    trips = Trip.objects.filter(
+        date_leaving__lte=today + timedelta(days=days),
+        date_returning__gte=today,
+    ).values_list('destination', flat=True)
+
+    destinations = {}
+    for destination in trips:
+        key = geocache.normalize_query(destination)
+        if key:
+            destinations.setdefault(key, destination)
+    return destinations
+
+
+def refresh_destinations(destinations, workers=None):
+    """
+    Warms geocode and forecast caches for each destination.
+
+    Expired entries are re-fetched synchronously rather than served stale, so
+    a destination only counts as refreshed once its fresh entries are stored.
+    Returns a dict with 'refreshed' and 'failed' counts.
+    """
+    workers = workers or getattr(settings, 'WEATHER_REFRESH_WORKERS', 4)
+    result = {'refreshed': 0, 'failed': 0}
+    for destination, (_, _, _, error) in fetch_forecasts(destinations, workers, allow_stale=False).items():
+        if error is None:
+            result['refreshed'] += 1
+        else:
+            result['failed'] += 1
+            logger.warning(f"Could not refresh weather for {destination}: {error}")
+    return result
+
+
+def refresh_upcoming(days=None, workers=None):
+    """Warms the caches for every destination with a trip inside the forecast horizon."""
+    destinations = upcoming_destinations(days)
+    return refresh_destinations(destinations.values(), workers)
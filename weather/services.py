@@ -1,34 +1,80 @@
 import requests
+import httpx
 import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from itertools import repeat
+from asgiref.sync import sync_to_async
 from django.conf import settings
-from datetime import datetime, timedelta, timezone
-from collections import defaultdict
-import statistics
+from django.db import close_old_connections
+from django.utils import timezone
+
+from api.services import async_http, circuit, http_client
+from api.services.circuit import CircuitOpenError
+from api.services.singleflight import AsyncSingleFlight, SingleFlight
+from . import climate, forecast_cache, gazetteer, geocache
+from .forecast_frame import ForecastFrame
+from .models import WeatherSummary
 
 logger = logging.getLogger(__name__)
 
-def _geocode_city(city):
-    """Helper to geocode city name to lat/lon."""
-    try:
-        geo_url = f"https://api.radar.io/v1/geocode/forward?query={city}&limit=1"
-        headers = {"Authorization": settings.GEOCODE_API_KEY}
-        response = requests.get(geo_url, headers=headers, timeout=10)
-        response.raise_for_status()
-        geocode_results = response.json()
+GEOCODE_NOT_FOUND = "Could not find coordinates for '{city}'."
+GEOCODE_UNAVAILABLE = "Geocoding service is temporarily unavailable."
+FORECAST_UNAVAILABLE = "Weather service is temporarily unavailable."
+CLIMATE_VERSION = "climate"  # forecast_version of summaries built from climate normals
+RADAR_GEOCODE_URL = "https://api.radar.io/v1/geocode/forward"
+
+# Only successful lookups are published to other workers; errors stay per-process
+_geocode_flight = SingleFlight('radar_geocode', lock_timeout=15, share_if=lambda result: result[2] is None)
+_forecast_flight = SingleFlight('owm_forecast', lock_timeout=15, share_if=lambda result: result[1] is None)
+_async_geocode_flight = AsyncSingleFlight('radar_geocode_async')
+_async_forecast_flight = AsyncSingleFlight('owm_forecast_async')
+
+# Keys of background refreshes currently running in this process
+_refreshing = set()
+_refreshing_lock = threading.Lock()
+
+
+def _geocode_city(city, allow_stale=True):
+    """
+    Helper to geocode city name to lat/lon.
 
-        if not geocode_results.get("addresses"):
-            logger.warning(f"No addresses found for city: {city}")
-            return None, None, f"Could not find coordinates for '{city}'."
+    Well-known cities are answered by the offline gazetteer, then the shared
+    geocode cache is consulted, and only then Radar. Expired cache entries are
+    still served while a background refresh runs, unless allow_stale is False
+    (the weather warmer), in which case Radar is called right away.
+    """
+    known = gazetteer.lookup(city)
+    if known is not None:
+        return known['latitude'], known['longitude'], None
+
+    key = geocache.normalize_query(city)
+    cached = geocache.get(city, stale_ok=True)
+    if cached is not None:
+        if not cached['found']:
+            return None, None, GEOCODE_NOT_FOUND.format(city=city)
+        if not cached.get('stale'):
+            return cached['latitude'], cached['longitude'], None
+        if allow_stale:
+            # Serve the expired answer now; re-geocode off the request path
+            _refresh_in_background(('radar', key), _geocode_flight.do, key, _geocode_remote, city)
+            return cached['latitude'], cached['longitude'], None
 
-        address = geocode_results['addresses'][0]
-        if 'geometry' not in address or 'coordinates' not in address['geometry'] or len(address['geometry']['coordinates']) < 2:
-            logger.error(f"Coordinates missing in geocode response for {city}: {address}")
-            return None, None, "Could not extract coordinates from geocode result."
+    # Concurrent lookups for the same destination share one Radar call
+    return _geocode_flight.do(key, _geocode_remote, city)
 
-        latitude = address['geometry']['coordinates'][1]
-        longitude = address['geometry']['coordinates'][0]
-        return latitude, longitude, None # Return lat, lon, error=None
 
+def _geocode_remote(city):
+    """Geocodes the city against Radar and records the answer in the geocode cache."""
+    try:
+        with circuit.get('radar').guard():
+            response = http_client.get(RADAR_GEOCODE_URL, params={"query": city, "limit": 1}, headers=_radar_headers())
+            response.raise_for_status()
+        return _record_geocode(city, response.json())
+
+    except CircuitOpenError:
+        return None, None, GEOCODE_UNAVAILABLE
     except requests.exceptions.RequestException as e:
         logger.error(f"Geocoding request failed for {city}: {e}")
         return None, None, "Failed to contact geocoding service."
@@ -36,24 +82,70 @@ def _geocode_city(city):
         logger.error(f"Unexpected error during geocoding for {city}: {e}")
         return None, None, "An unexpected error occurred during geocoding."
 
-def _fetch_owm_forecast(latitude, longitude):
-    """Helper to fetch forecast data from OWM."""
-    try:
-        forecast_url = (
-            f"https://api.openweathermap.org/data/2.5/forecast"
-            f"?lat={latitude}&lon={longitude}"
-            f"&units=metric&appid={settings.OWM_API_KEY}"
-        )
-        forecast_response = requests.get(forecast_url, timeout=10)
-        forecast_response.raise_for_status()
-        forecast_data = forecast_response.json()
 
-        if 'list' not in forecast_data or 'city' not in forecast_data:
-            logger.error(f"Invalid forecast data structure received from OWM for {latitude},{longitude}: {forecast_data}")
-            return None, "Received invalid data structure from weather service."
+def _radar_headers():
+    return {"Authorization": settings.GEOCODE_API_KEY}
+
+
+def _record_geocode(city, geocode_results):
+    """Extracts coordinates from a Radar response and stores the answer in the geocode cache."""
+    if not geocode_results.get("addresses"):
+        logger.warning(f"No addresses found for city: {city}")
+        geocache.store_not_found(city)
+        return None, None, GEOCODE_NOT_FOUND.format(city=city)
 
-        return forecast_data, None # Return data, error=None
+    address = geocode_results['addresses'][0]
+    if 'geometry' not in address or 'coordinates' not in address['geometry'] or len(address['geometry']['coordinates']) < 2:
+        logger.error(f"Coordinates missing in geocode response for {city}: {address}")
+        return None, None, "Could not extract coordinates from geocode result."
 
+    latitude = address['geometry']['coordinates'][1]
+    longitude = address['geometry']['coordinates'][0]
+    geocache.store(city, latitude, longitude, address.get('formattedAddress', ''))
+    return latitude, longitude, None # Return lat, lon, error=None
+
+
+def _fetch_owm_forecast(latitude, longitude, allow_stale=True):
+    """
+    Helper to fetch forecast data from OWM.
+
+    Results are cached per grid cell until the next OWM model update, so the
+    request is made for the cell centre rather than the exact coordinates.
+    Once that expires, the previous forecast is returned with 'stale': True
+    while a background refresh runs. With allow_stale=False the new cycle is
+    fetched before returning.
+    """
+    cell = forecast_cache.grid_cell(latitude, longitude)
+    cached = forecast_cache.get(cell)
+    if cached is not None:
+        return cached, None
+
+    stale = forecast_cache.get_stale(cell) if allow_stale else None
+    if stale is not None:
+        # Serve the last known good forecast now; fetch the new cycle off the request path
+        _refresh_in_background(('owm', cell), _forecast_flight.do, cell, _fetch_owm_remote, cell)
+        return _mark_stale(stale), None
+
+    # Concurrent requests for the same cell share one OWM call
+    return _forecast_flight.do(cell, _fetch_owm_remote, cell)
+
+
+def _fetch_owm_remote(cell):
+    """Fetches the forecast for a grid cell from OWM and stores it in the forecast cache."""
+    latitude, longitude = cell
+    # Another worker may have filled the cache while we waited to lead
+    cached = forecast_cache.get(cell)
+    if cached is not None:
+        return cached, None
+
+    try:
+        with circuit.get('owm').guard():
+            forecast_response = http_client.get(_forecast_url(cell))
+            forecast_response.raise_for_status()
+        return _record_forecast(cell, forecast_response.json())
+
+    except CircuitOpenError:
+        return None, FORECAST_UNAVAILABLE
     except requests.exceptions.RequestException as e:
         logger.error(f"OWM forecast request failed for {latitude},{longitude}: {e}")
         return None, "Could not fetch forecast data."
@@ -61,48 +153,199 @@ def _fetch_owm_forecast(latitude, longitude):
         logger.error(f"Unexpected error during forecast fetch for {latitude},{longitude}: {e}")
         return None, "An unexpected error occurred fetching forecast."
 
-def _summarize_forecast(filtered_list, city_name):
-    """Creates a concise summary string from filtered forecast data."""
-    if not filtered_list:
-        return f"No specific forecast data available for the selected dates in {city_name} (may be too far out)."
 
-    temps = [item['main']['temp'] for item in filtered_list]
-    feels_like_temps = [item['main']['feels_like'] for item in filtered_list]
-    conditions = defaultdict(int)
-    precip_chance = False
-
-    for item in filtered_list:
-        # Use main description, fallback to description if main isn't specific enough sometimes
-        main_condition = item['weather'][0]['main']
-        conditions[main_condition] += 1
-        # Check for rain/snow probability if available (might not be in free tier detailed)
-        if 'pop' in item and item['pop'] > 0.3: # Check probability of precipitation > 30%
-             precip_chance = True
-        elif main_condition in ['Rain', 'Snow', 'Drizzle', 'Thunderstorm']:
-             precip_chance = True # Mark if condition itself implies precipitation
-
-
-    min_temp = min(temps) if temps else 'N/A'
-    max_temp = max(temps) if temps else 'N/A'
-    avg_temp = statistics.mean(temps) if temps else 'N/A'
-    avg_feels_like = statistics.mean(feels_like_temps) if feels_like_temps else 'N/A'
-
-    # Find the most common condition(s)
-    if conditions:
-        dominant_conditions = sorted(conditions.items(), key=lambda item: item[1], reverse=True)
-        # Take top 1 or 2 dominant conditions
-        top_conditions_str = ", ".join([cond[0] for cond in dominant_conditions[:2]])
-    else:
-        top_conditions_str = "Unknown conditions"
+def _mark_stale(forecast_data):
+    return {**forecast_data, 'stale': True}
+
+
+def _refresh_in_background(key, fn, *args):
+    """Runs fn(*args) on a daemon thread unless a refresh for the same key is already running."""
+    with _refreshing_lock:
+        if key in _refreshing:
+            return
+        _refreshing.add(key)
+
+    def run():
+        try:
+            fn(*args)
+        except Exception as e:
+            logger.warning(f"Background refresh {key} failed: {e}")
+        finally:
+            with _refreshing_lock:
+                _refreshing.discard(key)
+            close_old_connections()
+
+    threading.Thread(target=run, name=f"weather-refresh-{key[0]}", daemon=True).start()
+
+
+def _forecast_url(cell):
+    return (
+        f"https://api.openweathermap.org/data/2.5/forecast"
+        f"?lat={cell[0]}&lon={cell[1]}"
+        f"&units=metric&appid={settings.OWM_API_KEY}"
+    )
+
+
+def _record_forecast(cell, forecast_data):
+    """Validates an OWM forecast payload and stores it in the forecast cache."""
+    if 'list' not in forecast_data or 'city' not in forecast_data:
+        logger.error(f"Invalid forecast data structure received from OWM for {cell[0]},{cell[1]}: {forecast_data}")
+        return None, "Received invalid data structure from weather service."
+
+    forecast_cache.store(cell, forecast_data)
+    return forecast_data, None # Return data, error=None
+
+
+# --- Async variants for the ASGI views: same caches, upstream calls via httpx ---
+
+async def _geocode_city_async(city):
+    """Async counterpart of _geocode_city."""
+    # Off the event loop: the first lookup in a process may build the index under a file lock
+    known = await sync_to_async(gazetteer.lookup, thread_sensitive=False)(city)
+    if known is not None:
+        return known['latitude'], known['longitude'], None
+
+    key = geocache.normalize_query(city)
+    cached = await sync_to_async(geocache.get)(city, stale_ok=True)
+    if cached is not None:
+        if not cached['found']:
+            return None, None, GEOCODE_NOT_FOUND.format(city=city)
+        if cached.get('stale'):
+            _refresh_in_background(('radar', key), _geocode_flight.do, key, _geocode_remote, city)
+        return cached['latitude'], cached['longitude'], None
+
+    return await _async_geocode_flight.do(key, _geocode_remote_async, city)
+
+
+async def _geocode_remote_async(city):
+    try:
+        with circuit.get('radar').guard():
+            response = await async_http.get(RADAR_GEOCODE_URL, params={"query": city, "limit": 1}, headers=_radar_headers())
+            response.raise_for_status()
+        return await sync_to_async(_record_geocode)(city, response.json())
+
+    except CircuitOpenError:
+        return None, None, GEOCODE_UNAVAILABLE
+    except httpx.HTTPError as e:
+        logger.error(f"Geocoding request failed for {city}: {e}")
+        return None, None, "Failed to contact geocoding service."
+    except Exception as e:
+        logger.error(f"Unexpected error during geocoding for {city}: {e}")
+        return None, None, "An unexpected error occurred during geocoding."
+
+
+async def _fetch_owm_forecast_async(latitude, longitude):
+    """Async counterpart of _fetch_owm_forecast."""
+    cell = forecast_cache.grid_cell(latitude, longitude)
+    cached = await sync_to_async(forecast_cache.get)(cell)
+    if cached is not None:
+        return cached, None
+
+    stale = await sync_to_async(forecast_cache.get_stale)(cell)
+    if stale is not None:
+        _refresh_in_background(('owm', cell), _forecast_flight.do, cell, _fetch_owm_remote, cell)
+        return _mark_stale(stale), None
 
+    return await _async_forecast_flight.do(cell, _fetch_owm_remote_async, cell)
+
+
+async def _fetch_owm_remote_async(cell):
+    try:
+        with circuit.get('owm').guard():
+            forecast_response = await async_http.get(_forecast_url(cell))
+            forecast_response.raise_for_status()
+        return await sync_to_async(_record_forecast)(cell, forecast_response.json())
+
+    except CircuitOpenError:
+        return None, FORECAST_UNAVAILABLE
+    except httpx.HTTPError as e:
+        logger.error(f"OWM forecast request failed for {cell[0]},{cell[1]}: {e}")
+        return None, "Could not fetch forecast data."
+    except Exception as e:
+        logger.error(f"Unexpected error during forecast fetch for {cell[0]},{cell[1]}: {e}")
+        return None, "An unexpected error occurred fetching forecast."
+
+
+def _fetch_destination(destination, forecast=True, allow_stale=True):
+    """Geocode + forecast for one destination: (latitude, longitude, forecast_data, error)."""
+    try:
+        latitude, longitude, error = _geocode_city(destination, allow_stale)
+        if error:
+            return None, None, None, error
+        if not forecast:
+            return latitude, longitude, None, None
+        forecast_data, error = _fetch_owm_forecast(latitude, longitude, allow_stale)
+        return latitude, longitude, forecast_data, error
+    except Exception as e:
+        logger.exception(f"Weather fetch failed for {destination}: {e}")
+        return None, None, None, "An unexpected error occurred fetching weather."
+    finally:
+        close_old_connections()  # Pool threads don't get Django's request-cycle connection cleanup
+
+
+def fetch_forecasts(destinations, workers=None, geocode_only=(), allow_stale=True):
+    """
+    Fetches forecasts for many destinations at once.
+
+    Destinations are deduplicated by their normalized name and fetched on a
+    bounded thread pool (WEATHER_FETCH_WORKERS). Returns a dict mapping each
+    normalized destination to (latitude, longitude, forecast_data, error).
+    Destinations that only appear in geocode_only (e.g. for trips beyond the
+    forecast horizon) are geocoded without an OWM call; their forecast_data
+    is None. With allow_stale=False expired cache entries are re-fetched
+    before returning instead of being served while a background refresh runs.
+    """
+    unique = {}
+    forecast = set()
+    for destination in destinations:
+        key = geocache.normalize_query(destination)
+        if key:
+            unique.setdefault(key, destination)
+            forecast.add(key)
+    for destination in geocode_only:
+        key = geocache.normalize_query(destination)
+        if key:
+            unique.setdefault(key, destination)
+    if not unique:
+        return {}
+
+    workers = min(workers or getattr(settings, 'WEATHER_FETCH_WORKERS', 4), len(unique))
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='weather-fetch') as pool:
+        results = pool.map(_fetch_destination, unique.values(), [key in forecast for key in unique],
+                           repeat(allow_stale))
+        return dict(zip(unique, results))
+
+
+def daily_forecast(latitude, longitude, forecast_data, start_epoch, end_epoch):
+    """
+    Per-day aggregates (see ForecastFrame.daily) for the window
+    [start_epoch, end_epoch). Computed once per forecast cycle and cached
+    alongside the forecast.
+    """
+    key = forecast_cache.daily_key(forecast_cache.grid_cell(latitude, longitude), forecast_data, start_epoch, end_epoch)
+    days = forecast_cache.get_daily(key)
+    if days is None:
+        days = ForecastFrame.from_owm(forecast_data).window(start_epoch, end_epoch).daily()
+        forecast_cache.store_daily(key, days)
+    return days
+
+
+def _summarize_forecast(frame, city_name):
+    """Creates a concise summary string from a (date-filtered) ForecastFrame."""
+    stats = frame.stats()
+    if stats is None:
+        return f"No specific forecast data available for the selected dates in {city_name} (may be too far out)."
+
+    # Take top 1 or 2 dominant conditions
+    top_conditions_str = ", ".join(stats['conditions'][:2]) or "Unknown conditions"
 
     summary = (
         f"Weather forecast for {city_name}: "
-        f"Average temperature around {avg_temp:.1f}°C (feels like {avg_feels_like:.1f}°C). "
-        f"Highs reaching near {max_temp:.1f}°C, lows around {min_temp:.1f}°C. "
+        f"Average temperature around {stats['avg_temp']:.1f}°C (feels like {stats['avg_feels_like']:.1f}°C). "
+        f"Highs reaching near {stats['max_temp']:.1f}°C, lows around {stats['min_temp']:.1f}°C. "
         f"Conditions mainly {top_conditions_str}. "
     )
-    if precip_chance:
+    if stats['precipitation']:
         summary += "Possibility of precipitation (rain/snow). "
     else:
         summary += "Likely dry. "
@@ -113,45 +356,108 @@ def _summarize_forecast(filtered_list, city_name):
     return summary
 
 
+def beyond_forecast_horizon(start_date, today=None):
+    """True when a trip starts after the last day OWM forecasts (FORECAST_HORIZON_DAYS ahead)."""
+    today = today or timezone.now().date()
+    return start_date > today + timedelta(days=getattr(settings, 'FORECAST_HORIZON_DAYS', 5))
+
+
+def climate_summary(latitude, longitude, city_name, start_date, end_date):
+    """
+    Summary built from monthly climate normals, for trips beyond the forecast
+    horizon. Returns None when no normals cover the destination.
+    """
+    stats = climate.stats_for_dates(latitude, longitude, start_date, end_date)
+    if stats is None:
+        return None
+
+    top_conditions_str = ", ".join(stats['conditions'][:2]) or "Unknown conditions"
+    summary = (
+        f"Typical weather for {city_name} in {' and '.join(stats['months'])}: "
+        f"Average temperature around {stats['avg_temp']:.1f}°C. "
+        f"Highs reaching near {stats['max_temp']:.1f}°C, lows around {stats['min_temp']:.1f}°C. "
+        f"Conditions mainly {top_conditions_str}. "
+    )
+    if stats['precipitation']:
+        summary += f"Possibility of precipitation (about {stats['precipitation_mm']:.0f} mm over the trip). "
+    else:
+        summary += "Likely dry. "
+    summary += " (Note: Based on climate normals; the forecast isn't available this far ahead)."
+    return summary
+
+
 def fetch_and_summarize_weather(destination, start_date, end_date):
     """
     Fetches weather forecast for a destination and date range,
     and returns a concise summary string.
     """
+    return _summarize_destination(destination, start_date, end_date)[0]
+
+
+def _summarize_destination(destination, start_date, end_date):
+    """
+    Returns (summary, forecast_version). The version is None when the summary
+    must not be persisted: errors and summaries of a stale forecast.
+    """
     logger.info(f"Fetching weather summary for {destination} from {start_date} to {end_date}")
 
     latitude, longitude, error = _geocode_city(destination)
     if error:
-        return f"Weather unavailable: {error}" # Return error message directly
+        return f"Weather unavailable: {error}", None # Return error message directly
+
+    if beyond_forecast_horizon(start_date):
+        # Too far out for OWM; climate normals need no upstream call
+        summary = climate_summary(latitude, longitude, destination, start_date, end_date)
+        if summary is not None:
+            return summary, CLIMATE_VERSION
 
     forecast_data, error = _fetch_owm_forecast(latitude, longitude)
     if error:
-        return f"Weather unavailable: {error}" # Return error message directly
+        return f"Weather unavailable: {error}", None # Return error message directly
 
-    # Filter forecast data to trip dates
+    # Filter forecast data to trip dates (UTC days, end date inclusive)
     try:
-        # Convert model dates (assuming they are date objects) to naive datetime objects at start of day
-        start_dt_naive = datetime.combine(start_date, datetime.min.time())
-        end_dt_naive = datetime.combine(end_date, datetime.min.time())
-        # Create an exclusive end datetime (start of the day *after* the end date) for filtering
-        end_dt_exclusive = end_dt_naive + timedelta(days=1)
+        frame = ForecastFrame.from_owm(forecast_data).window_for_dates(start_date, end_date)
+        city_name = forecast_data.get('city', {}).get('name', destination) # Get city name from API if possible
+        summary = _summarize_forecast(frame, city_name)
+        if forecast_data.get('stale'):
+            summary += " (Based on the most recent available forecast; an update is on its way.)"
+            return summary, None
+        return summary, forecast_cache.forecast_version(forecast_data)
 
-        # Make aware for comparison safety, although comparing naive UTC from OWM is okay too
-        start_dt_utc = start_dt_naive.replace(tzinfo=timezone.utc)
-        end_dt_exclusive_utc = end_dt_exclusive.replace(tzinfo=timezone.utc)
+    except Exception as e:
+        logger.exception(f"Error processing forecast data for {destination}: {e}")
+        return "Weather unavailable: Error processing forecast data.", None
 
-        filtered_forecast = []
-        for item in forecast_data.get('list', []):
-            # Convert OWM's UTC timestamp to a timezone-aware datetime object
-            item_dt_utc = datetime.fromtimestamp(item['dt'], tz=timezone.utc)
 
-            # Compare aware datetimes
-            if start_dt_utc <= item_dt_utc < end_dt_exclusive_utc:
-                filtered_forecast.append(item)
+def trip_weather_summary(trip):
+    """
+    Weather summary for a trip, persisted as a WeatherSummary.
 
-        city_name = forecast_data.get('city', {}).get('name', destination) # Get city name from API if possible
-        return _summarize_forecast(filtered_forecast, city_name)
+    Until the next forecast cycle is due the stored summary is returned without
+    touching the geocoder or the forecast cache. After that the forecast is
+    re-read and the summary regenerated only if the forecast version changed.
+    """
+    record = WeatherSummary.objects.filter(trip=trip).first()
+    if record is not None and record.matches(trip) and record.expires_at > timezone.now():
+        return record.summary
 
-    except Exception as e:
-        logger.exception(f"Error processing forecast data for {destination}: {e}")
-        return "Weather unavailable: Error processing forecast data."
\ No newline at end of file
+    summary, version = _summarize_destination(trip.destination, trip.date_leaving, trip.date_returning)
+    if version is None:
+        return summary
+
+    expires_at = timezone.now() + timedelta(seconds=forecast_cache.seconds_until_refresh())
+    if record is not None and record.matches(trip) and record.forecast_version == version:
+        record.expires_at = expires_at
+        record.save(update_fields=['expires_at', 'updated_at'])
+        return record.summary
+
+    WeatherSummary.objects.update_or_create(trip=trip, defaults={
+        'destination': trip.destination,
+        'start_date': trip.date_leaving,
+        'end_date': trip.date_returning,
+        'forecast_version': version,
+        'summary': summary,
+        'expires_at': expires_at,
+    })
+    return summary
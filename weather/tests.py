@@ -1,3 +1,451 @@
-from django.test import TestCase
+import httpx
+import requests
+from django.core.cache import caches
+from django.test import TestCase, override_settings
+from unittest.mock import AsyncMock, patch
+import asyncio
+import os
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+from django.contrib.auth.models import User
+from django.utils import timezone
 
-# Create your tests here.
+from api.services import circuit
+from trips.models import Trip
+from . import climate, forecast_cache, gazetteer, geocache, refresh
+from .forecast_frame import ForecastFrame
+from .models import GeocodeCache, WeatherSummary
+from .services import (
+    CLIMATE_VERSION, FORECAST_UNAVAILABLE, _fetch_owm_forecast, _geocode_city, _geocode_city_async, _summarize_forecast,
+    climate_summary, trip_weather_summary,
+)
+
+
+RADAR_PARIS = {
+    'addresses': [{
+        'geometry': {'coordinates': [2.3522, 48.8566]},
+        'formattedAddress': 'Paris, France',
+    }]
+}
+
+
+@override_settings(GAZETTEER_ENABLED=False)
+class GeocodeCacheTests(TestCase):
+    def setUp(self):
+        geocache.clear_local()
+
+    @patch('weather.services.http_client.get')
+    def test_repeat_lookups_hit_cache(self, mock_get):
+        mock_get.return_value.status_code = 200
+        mock_get.return_value.json.return_value = RADAR_PARIS
+
+        self.assertEqual(_geocode_city('Paris'), (48.8566, 2.3522, None))
+        self.assertEqual(_geocode_city('  paris '), (48.8566, 2.3522, None))
+        self.assertEqual(mock_get.call_count, 1)
+
+        row = GeocodeCache.objects.get(query='paris')
+        self.assertEqual(row.canonical_name, 'Paris, France')
+
+        # A fresh worker (empty LRU) is served from the table
+        geocache.clear_local()
+        self.assertEqual(_geocode_city('Paris'), (48.8566, 2.3522, None))
+        self.assertEqual(mock_get.call_count, 1)
+
+    @patch('weather.services.http_client.get')
+    def test_not_found_is_negatively_cached(self, mock_get):
+        mock_get.return_value.status_code = 200
+        mock_get.return_value.json.return_value = {'addresses': []}
+
+        _, _, error = _geocode_city('Atlantis')
+        self.assertIsNotNone(error)
+        _, _, error_again = _geocode_city('Atlantis')
+        self.assertEqual(error, error_again)
+        self.assertEqual(mock_get.call_count, 1)
+
+        with self.settings(GEOCODE_NEGATIVE_CACHE_TTL=0):
+            geocache.clear_local()
+            self.assertIsNone(geocache.get('Atlantis'))
+
+
+class ForecastCacheTests(TestCase):
+    @patch('weather.services.http_client.get')
+    def test_nearby_coordinates_share_a_cell(self, mock_get):
+        mock_get.return_value.status_code = 200
+        mock_get.return_value.json.return_value = {'list': [], 'city': {'name': 'Paris'}}
+
+        first, error = _fetch_owm_forecast(48.8566, 2.3522)
+        self.assertIsNone(error)
+        second, _ = _fetch_owm_forecast(48.8612, 2.3601)
+        self.assertEqual(first, second)
+        self.assertEqual(mock_get.call_count, 1)
+
+    def test_expiry_snaps_to_next_model_update(self):
+        with self.settings(FORECAST_REFRESH_HOURS=3, FORECAST_REFRESH_DELAY=600):
+            # 01:00 UTC -> next publish at 03:10 UTC
+            self.assertEqual(forecast_cache.seconds_until_refresh(now=3600), 2 * 3600 + 600)
+            # 03:05 UTC is still before the 03:00 cycle is published
+            self.assertEqual(forecast_cache.seconds_until_refresh(now=3 * 3600 + 300), 300)
+            # Right before publish the minimum timeout applies
+            self.assertEqual(forecast_cache.seconds_until_refresh(now=3 * 3600 + 590), forecast_cache.MIN_TIMEOUT)
+
+
+def _owm_entry(dt, temp, main, pop=0.0):
+    return {'dt': dt, 'main': {'temp': temp, 'feels_like': temp - 1}, 'weather': [{'main': main}], 'pop': pop}
+
+
+class ForecastFrameTests(TestCase):
+    def setUp(self):
+        self.payload = self.payload_for_tests()
+
+    @staticmethod
+    def payload_for_tests():
+        day = 1767225600  # 2026-01-01 00:00 UTC
+        return {'city': {'name': 'Paris'}, 'list': [
+            _owm_entry(day - 3 * 3600, 30, 'Clear'),           # Dec 31, outside the window
+            _owm_entry(day, 4, 'Clouds'),
+            _owm_entry(day + 3 * 3600, 6, 'Clear'),
+            _owm_entry(day + 6 * 3600, 8, 'Clouds', pop=0.5),
+            _owm_entry(day + 24 * 3600, 10, 'Clear'),         # Jan 2
+            _owm_entry(day + 48 * 3600, 12, 'Rain'),          # Jan 3, outside the window
+        ]}
+
+    def test_window_selects_inclusive_trip_days(self):
+        frame = ForecastFrame.from_owm(self.payload).window_for_dates(date(2026, 1, 1), date(2026, 1, 2))
+        self.assertEqual([entry['main']['temp'] for entry in frame.entries], [4, 6, 8, 10])
+
+    def test_summary_matches_forecast(self):
+        frame = ForecastFrame.from_owm(self.payload).window_for_dates(date(2026, 1, 1), date(2026, 1, 2))
+        self.assertEqual(frame.dominant_conditions(), ['Clouds', 'Clear'])  # Tie broken by first appearance
+        self.assertEqual(
+            _summarize_forecast(frame, 'Paris'),
+            "Weather forecast for Paris: Average temperature around 7.0°C (feels like 6.0°C). "
+            "Highs reaching near 10.0°C, lows around 4.0°C. Conditions mainly Clouds, Clear. "
+            "Possibility of precipitation (rain/snow).  (Note: This is a general forecast for the period)."
+        )
+
+
+class DailyForecastTests(TestCase):
+    def setUp(self):
+        self.payload = ForecastFrameTests.payload_for_tests()
+
+    def test_daily_aggregates_per_utc_day(self):
+        days = ForecastFrame.from_owm(self.payload).window_for_dates(date(2026, 1, 1), date(2026, 1, 2)).daily()
+        self.assertEqual([day['date'] for day in days], ['2026-01-01', '2026-01-02'])
+        first = days[0]
+        self.assertEqual((first['temp_min'], first['temp_max'], first['temp_avg']), (4.0, 8.0, 6.0))
+        self.assertEqual((first['condition'], first['pop']), ('Clouds', 0.5))
+        self.assertEqual(len(first['hours']), 3)
+
+    @patch('weather.views._fetch_owm_forecast')
+    @patch('weather.views._geocode_city', return_value=(48.8566, 2.3522, None))
+    def test_view_daily_resolution_and_fields(self, mock_geocode, mock_forecast):
+        mock_forecast.return_value = (self.payload, None)
+        params = {'city': 'Paris', 'start_date': '2026-01-01', 'end_date': '2026-01-02', 'resolution': 'daily'}
+
+        response = self.client.get('/weather/api/weather/', {**params, 'fields': 'date,temp_max'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['days'], [
+            {'date': '2026-01-01', 'temp_max': 8.0},
+            {'date': '2026-01-02', 'temp_max': 10.0},
+        ])
+
+        response = self.client.get('/weather/api/weather/', {**params, 'fields': 'date,wind'})
+        self.assertEqual(response.status_code, 400)
+
+    @patch('weather.views._fetch_owm_forecast')
+    @patch('weather.views._geocode_city', return_value=(48.8566, 2.3522, None))
+    def test_view_3h_fields_flatten_entries(self, mock_geocode, mock_forecast):
+        mock_forecast.return_value = (self.payload, None)
+        response = self.client.get('/weather/api/weather/', {
+            'city': 'Paris', 'start_date': '2026-01-02', 'end_date': '2026-01-02', 'fields': 'dt,temp,condition',
+        })
+        self.assertEqual(response.json()['list'], [{'dt': 1767225600 + 24 * 3600, 'temp': 10, 'condition': 'Clear'}])
+
+
+class WeatherRefreshTests(TestCase):
+    def setUp(self):
+        user = User.objects.create_user('traveler', password='pw')
+        today = date(2026, 1, 1)
+        self.today = today
+        Trip.objects.create(user=user, destination='Paris', date_leaving=today + timedelta(days=2), date_returning=today + timedelta(days=6))
+        Trip.objects.create(user=user, destination=' paris', date_leaving=today - timedelta(days=1), date_returning=today + timedelta(days=3))
+        Trip.objects.create(user=user, destination='Lisbon', date_leaving=today + timedelta(days=30), date_returning=today + timedelta(days=35))
+        Trip.objects.create(user=user, destination='Rome', date_leaving=today - timedelta(days=9), date_returning=today - timedelta(days=2))
+
+    def test_upcoming_trips_grouped_by_destination(self):
+        destinations = refresh.upcoming_destinations(days=5, today=self.today)
+        self.assertEqual(list(destinations), ['paris'])
+
+    @patch('weather.services._fetch_owm_forecast', return_value=({'list': []}, None))
+    @patch('weather.services._geocode_city')
+    def test_refresh_warms_each_destination_once(self, mock_geocode, mock_forecast):
+        mock_geocode.side_effect = lambda city, allow_stale: (None, None, 'not found') if city == 'Atlantis' else (1.0, 2.0, None)
+        result = refresh.refresh_destinations(['Paris', 'Atlantis'], workers=2)
+        self.assertEqual(result, {'refreshed': 1, 'failed': 1})
+        mock_forecast.assert_called_once_with(1.0, 2.0, False)
+
+
+class BatchWeatherViewTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('batcher', password='pw')
+        other = User.objects.create_user('someone-else', password='pw')
+        self.paris = Trip.objects.create(user=self.user, destination='Paris', date_leaving=date(2026, 1, 1), date_returning=date(2026, 1, 2))
+        self.paris_again = Trip.objects.create(user=self.user, destination='paris ', date_leaving=date(2026, 1, 2), date_returning=date(2026, 1, 2))
+        self.foreign = Trip.objects.create(user=other, destination='Rome', date_leaving=date(2026, 1, 1), date_returning=date(2026, 1, 2))
+        self.client.login(username='batcher', password='pw')
+
+    @patch('weather.services._fetch_owm_forecast')
+    @patch('weather.services._geocode_city', return_value=(48.8566, 2.3522, None))
+    def test_batch_dedupes_destinations(self, mock_geocode, mock_forecast):
+        mock_forecast.return_value = (ForecastFrameTests.payload_for_tests(), None)
+        trip_ids = f"{self.paris.id},{self.paris_again.id},{self.foreign.id}"
+        response = self.client.get('/weather/api/weather/batch/', {'trip_ids': trip_ids})
+
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual([trip['trip_id'] for trip in data['trips']], [self.paris.id, self.paris_again.id])
+        self.assertEqual(data['missing'], [self.foreign.id])
+        self.assertEqual(len(data['trips'][0]['days']), 2)
+        self.assertEqual(data['trips'][1]['days'][0]['date'], '2026-01-02')
+        self.assertTrue(data['trips'][0]['summary'].startswith('Weather forecast for Paris'))
+        self.assertEqual(mock_geocode.call_count, 1)
+
+    def test_invalid_trip_ids(self):
+        response = self.client.get('/weather/api/weather/batch/', {'trip_ids': '1,abc'})
+        self.assertEqual(response.status_code, 400)
+
+
+@override_settings(GAZETTEER_ENABLED=False)
+class AsyncWeatherViewTests(TestCase):
+    def setUp(self):
+        geocache.clear_local()
+
+    @patch('weather.services.async_http.get', new_callable=AsyncMock)
+    def test_async_view_matches_sync_response(self, mock_get):
+        payload = ForecastFrameTests.payload_for_tests()
+
+        def respond(url, **kwargs):
+            data = RADAR_PARIS if 'radar' in url else payload
+            return httpx.Response(200, json=data, request=httpx.Request('GET', url))
+        mock_get.side_effect = respond
+
+        params = {'city': 'Paris', 'start_date': '2026-01-01', 'end_date': '2026-01-02', 'resolution': 'daily'}
+        response = self.client.get('/weather/api/async/weather/', params)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(mock_get.call_count, 2)  # Radar, then OWM
+
+        # The sync view is now served entirely from the caches the async view filled
+        with patch('weather.services.http_client.get') as mock_sync_get:
+            sync_response = self.client.get('/weather/api/weather/', params)
+            mock_sync_get.assert_not_called()
+        self.assertEqual(response.json(), sync_response.json())
+
+
+class GazetteerTests(TestCase):
+    def setUp(self):
+        self.index_dir = tempfile.mkdtemp()
+        csv_path = f"{self.index_dir}/cities.csv"
+        with open(csv_path, 'w', encoding='utf-8') as f:
+            f.write(
+                "name,country,country_code,latitude,longitude,population,alternate_names\n"
+                "Paris,France,FR,48.8566,2.3522,11000000,\n"
+                "Paris,United States,US,33.6609,-95.5555,25000,\n"
+                "São Paulo,Brazil,BR,-23.5505,-46.6333,22000000,Sao Paulo\n"
+                "Parma,Italy,IT,44.8015,10.3279,200000,\n"
+            )
+        override = self.settings(GAZETTEER_CSV=csv_path, GAZETTEER_INDEX_DIR=f"{self.index_dir}/index")
+        override.enable()
+        self.addCleanup(override.disable)
+        self.addCleanup(gazetteer.reset)
+        gazetteer.reset()
+
+    def test_exact_lookup_prefers_most_populous(self):
+        self.assertEqual(gazetteer.lookup(' PARIS ')['name'], 'Paris, France')
+        self.assertEqual(gazetteer.lookup('Paris, US')['latitude'], 33.6609)
+        self.assertEqual(gazetteer.lookup('sao paulo,brazil')['name'], 'São Paulo, Brazil')
+        self.assertIsNone(gazetteer.lookup('Atlantis'))
+
+    def test_prefix_lookup(self):
+        self.assertEqual([city['name'] for city in gazetteer.prefix('par')],
+                         ['Paris, France', 'Parma, Italy', 'Paris, United States'])
+
+    def test_workers_starting_together_share_one_build(self):
+        with patch('weather.gazetteer._build', wraps=gazetteer._build) as mock_build:
+            with ThreadPoolExecutor(max_workers=4) as pool:
+                indexes = list(pool.map(lambda _: gazetteer._open_index(), range(4)))
+        self.assertTrue(all(indexes))
+        self.assertEqual(mock_build.call_count, 1)
+        self.assertEqual(sorted(os.listdir(self.index_dir)), ['.index.lock', 'cities.csv', 'index'])
+
+    def test_async_geocode_looks_up_off_the_event_loop(self):
+        threads = []
+
+        def lookup(city):
+            threads.append(threading.current_thread())
+            return {'latitude': 48.8566, 'longitude': 2.3522}
+
+        with patch('weather.services.gazetteer.lookup', side_effect=lookup):
+            self.assertEqual(asyncio.run(_geocode_city_async('Paris')), (48.8566, 2.3522, None))
+        self.assertIsNot(threads[0], threading.current_thread())
+
+    @patch('weather.services.http_client.get')
+    def test_geocode_skips_radar_for_known_cities(self, mock_get):
+        self.assertEqual(_geocode_city('Paris'), (48.8566, 2.3522, None))
+        mock_get.assert_not_called()
+
+
+class StaleWhileRevalidateTests(TestCase):
+    def setUp(self):
+        circuit.reset_all()
+        self.addCleanup(circuit.reset_all)
+
+    @patch('weather.services._refresh_in_background')
+    @patch('weather.services.http_client.get')
+    def test_expired_forecast_served_stale_while_refreshing(self, mock_get, mock_refresh):
+        mock_get.return_value.json.return_value = {'list': [], 'city': {'name': 'Lisbon'}}
+        _fetch_owm_forecast(38.7223, -9.1393)
+        cell = forecast_cache.grid_cell(38.7223, -9.1393)
+        caches['shared'].delete(forecast_cache.cache_key(cell))  # The model cycle rolls over
+
+        data, error = _fetch_owm_forecast(38.7223, -9.1393)
+        self.assertIsNone(error)
+        self.assertTrue(data['stale'])
+        self.assertEqual(mock_get.call_count, 1)
+        mock_refresh.assert_called_once()
+
+    # The warmer writes from pool threads, which can't see the test transaction's DB cache table
+    @override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+                               'shared': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+                                          'LOCATION': 'warmer-test'}})
+    @patch('weather.services.gazetteer.lookup', return_value={'latitude': 38.7223, 'longitude': -9.1393})
+    @patch('weather.services.http_client.get')
+    def test_warmer_refetches_expired_forecast(self, mock_get, mock_lookup):
+        mock_get.return_value.json.return_value = {'list': [], 'city': {'name': 'Lisbon'}}
+        cell = forecast_cache.grid_cell(38.7223, -9.1393)
+        self.addCleanup(forecast_cache.delete, cell)
+        _fetch_owm_forecast(38.7223, -9.1393)
+        caches['shared'].delete(forecast_cache.cache_key(cell))  # The model cycle rolls over
+
+        self.assertEqual(refresh.refresh_destinations(['Lisbon']), {'refreshed': 1, 'failed': 0})
+        self.assertEqual(mock_get.call_count, 2)
+        self.assertIsNotNone(forecast_cache.get(cell))
+
+    @override_settings(GAZETTEER_ENABLED=False)
+    @patch('weather.services.http_client.get')
+    def test_warmer_regeocodes_expired_entry(self, mock_get):
+        mock_get.return_value.json.return_value = RADAR_PARIS
+        geocache.clear_local()
+        geocache.store('Paris', 48.0, 2.0)
+        GeocodeCache.objects.filter(query='paris').update(fetched_at=timezone.now() - timedelta(days=365))
+        geocache.clear_local()
+
+        self.assertEqual(_geocode_city('Paris', allow_stale=False), (48.8566, 2.3522, None))
+        self.assertEqual(mock_get.call_count, 1)
+        self.assertNotIn('stale', geocache.get('Paris'))
+
+    @patch('weather.services.http_client.get')
+    def test_open_circuit_fails_fast(self, mock_get):
+        mock_get.side_effect = requests.exceptions.ConnectTimeout()
+        with self.settings(CIRCUIT_BREAKERS={'owm': {'MIN_CALLS': 2, 'WINDOW': 2}}):
+            for latitude in (10.0, 20.0):
+                self.assertEqual(_fetch_owm_forecast(latitude, 0)[1], "Could not fetch forecast data.")
+            self.assertEqual(_fetch_owm_forecast(30.0, 0), (None, FORECAST_UNAVAILABLE))
+        self.assertEqual(mock_get.call_count, 2)
+
+
+
+class WeatherSummaryTests(TestCase):
+    def setUp(self):
+        user = User.objects.create_user('summarizer', password='pw')
+        self.trip = Trip.objects.create(user=user, destination='Paris', date_leaving=date(2026, 1, 1), date_returning=date(2026, 1, 2))
+
+    @patch('weather.services._fetch_owm_forecast')
+    @patch('weather.services._geocode_city', return_value=(48.8566, 2.3522, None))
+    def test_summary_reused_until_forecast_cycle(self, mock_geocode, mock_forecast):
+        payload = ForecastFrameTests.payload_for_tests()
+        mock_forecast.return_value = (payload, None)
+        summary = trip_weather_summary(self.trip)
+        self.assertEqual(trip_weather_summary(self.trip), summary)
+        self.assertEqual(mock_geocode.call_count, 1)
+
+        # Next cycle, same forecast: the stored text is kept and its expiry extended
+        WeatherSummary.objects.update(expires_at=timezone.now())
+        self.assertEqual(trip_weather_summary(self.trip), summary)
+        self.assertEqual(mock_geocode.call_count, 2)
+
+        # New forecast version: regenerated
+        WeatherSummary.objects.update(expires_at=timezone.now(), forecast_version='old')
+        trip_weather_summary(self.trip)
+        record = WeatherSummary.objects.get(trip=self.trip)
+        self.assertEqual(record.forecast_version, forecast_cache.forecast_version(payload))
+
+    @patch('weather.services._fetch_owm_forecast', return_value=(None, FORECAST_UNAVAILABLE))
+    @patch('weather.services._geocode_city', return_value=(48.8566, 2.3522, None))
+    def test_errors_not_persisted(self, mock_geocode, mock_forecast):
+        self.assertIn(FORECAST_UNAVAILABLE, trip_weather_summary(self.trip))
+        self.assertFalse(WeatherSummary.objects.exists())
+
+    @patch('weather.services._fetch_owm_forecast')
+    @patch('weather.services._geocode_city', return_value=(41.9028, 12.4964, None))
+    def test_changed_destination_regenerates(self, mock_geocode, mock_forecast):
+        mock_forecast.return_value = (ForecastFrameTests.payload_for_tests(), None)
+        trip_weather_summary(self.trip)
+        self.trip.destination = 'Rome'
+        trip_weather_summary(self.trip)
+        self.assertEqual(mock_geocode.call_count, 2)
+        self.assertEqual(WeatherSummary.objects.get(trip=self.trip).destination, 'Rome')
+
+
+class ClimateNormalTests(TestCase):
+    def setUp(self):
+        csv_path = f"{tempfile.mkdtemp()}/normals.csv"
+        with open(csv_path, 'w', encoding='utf-8') as f:
+            f.write(
+                "latitude,longitude,month,temp_min,temp_max,temp_mean,precipitation_mm,wet_days,condition\n"
+                "48.9,2.4,5,10,20,15,62,9,\n"
+                "48.9,2.4,6,13,23,18,31,3,\n"
+                "48.9,2.4,6,13,23,18,50,12,\n"  # Later rows replace earlier ones
+                "10,10,6,25,35,30,0,0,Clear\n"
+            )
+        self.assertEqual(climate.import_csv(csv_path), 4)
+
+    def test_stats_weighted_by_trip_days(self):
+        stats = climate.stats_for_dates(48.8566, 2.3522, date(2026, 5, 30), date(2026, 6, 3))
+        self.assertAlmostEqual(stats['avg_temp'], (15 * 2 + 18 * 3) / 5)
+        self.assertEqual((stats['min_temp'], stats['max_temp']), (10, 23))
+        self.assertEqual(stats['conditions'], ['Rain', 'Clouds'])
+        self.assertTrue(stats['precipitation'])
+        self.assertEqual(stats['months'], ['May', 'June'])
+        self.assertIsNone(climate.stats_for_dates(-33.87, 151.21, date(2026, 6, 1), date(2026, 6, 2)))
+
+    @patch('weather.services._fetch_owm_forecast')
+    @patch('weather.services._geocode_city', return_value=(48.8566, 2.3522, None))
+    def test_trips_beyond_horizon_use_normals(self, mock_geocode, mock_forecast):
+        user = User.objects.create_user('planner', password='pw')
+        start = date(timezone.now().year + 1, 6, 1)
+        trip = Trip.objects.create(user=user, destination='Paris', date_leaving=start, date_returning=start + timedelta(days=3))
+        with patch('weather.climate.stats_for_dates', wraps=climate.stats_for_dates) as mock_stats:
+            summary = trip_weather_summary(trip)
+        mock_stats.assert_called_once()
+        mock_forecast.assert_not_called()
+        self.assertEqual(WeatherSummary.objects.get(trip=trip).forecast_version, CLIMATE_VERSION)
+
+        self.client.login(username='planner', password='pw')
+        response = self.client.get('/weather/api/weather/', {
+            'city': 'Paris', 'start_date': trip.date_leaving.isoformat(), 'end_date': trip.date_returning.isoformat(),
+        })
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['list'], [])
+        self.assertEqual(response.json()['climate_summary'], summary)
+        mock_forecast.assert_not_called()
+
+        response = self.client.get('/weather/api/weather/batch/', {'trip_ids': str(trip.id)})
+        self.assertEqual(response.json()['trips'][0]['summary'], summary)
+        mock_forecast.assert_not_called()
+
+    def test_summary_text(self):
+        summary = climate_summary(10.1, 9.9, 'Somewhere', date(2026, 6, 1), date(2026, 6, 5))
+        self.assertTrue(summary.startswith("Typical weather for Somewhere in June: Average temperature around 30.0°C."))
+        self.assertIn("Likely dry.", summary)
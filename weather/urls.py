@@ -1,9 +1,12 @@
 from django.urls import path
-from .views import get_weather_view, forecast_view
+from .views import batch_weather_view, destination_autocomplete_view, get_weather_view, get_weather_view_async, forecast_view
 
 app_name = 'weather'
 
 urlpatterns = [
     path('api/weather/', get_weather_view, name="api_weather"),
+    path('api/weather/batch/', batch_weather_view, name="api_weather_batch"),
+    path('api/async/weather/', get_weather_view_async, name="api_weather_async"),
+    path('api/destinations/', destination_autocomplete_view, name="api_destinations"),
     path('<int:trip_id>/', forecast_view, name="forecast"),
 ]
\ No newline at end of file
@@ -1,21 +1,40 @@
 # views.py
 
-import requests
 import logging  # Import logging
+from asgiref.sync import sync_to_async
 from django.conf import settings
 from django.contrib.auth.decorators import login_required
-from django.http import JsonResponse
+from django.http import HttpResponseNotAllowed, JsonResponse
 from django.shortcuts import get_object_or_404, render
+from django.utils import timezone as django_timezone
 from django.views.decorators.http import require_GET
 # Make sure both datetime and timedelta are imported
 from datetime import datetime, timedelta, timezone
 
 from trips.models import Trip
+from . import gazetteer, geocache
+from .forecast_frame import DAILY_FIELDS, ENTRY_FIELDS, ForecastFrame, date_window, slim_entry
+from .services import (
+    GEOCODE_NOT_FOUND, _fetch_owm_forecast, _fetch_owm_forecast_async, _geocode_city, _geocode_city_async,
+    _summarize_forecast, beyond_forecast_horizon, climate_summary, daily_forecast, fetch_forecasts,
+)
 
 # Set up basic logging
 logger = logging.getLogger(__name__)
 
 
+RESOLUTIONS = ('3h', 'daily')
+# Daily responses leave out the per-day readings unless 'hours' is asked for
+DEFAULT_DAILY_FIELDS = tuple(field for field in DAILY_FIELDS if field != 'hours')
+
+
+def _parse_fields(fields_param, allowed):
+    """Splits ?fields=a,b into a tuple, or returns the unknown field names as an error."""
+    fields = tuple(field.strip() for field in fields_param.split(',') if field.strip())
+    unknown = [field for field in fields if field not in allowed]
+    return fields, unknown
+
+
 # Create your views here.
 @login_required
 def forecast_view(request, trip_id):
@@ -30,70 +49,149 @@ def forecast_view(request, trip_id):
     })
 
 
-@require_GET
-def get_weather_view(request):
+def _city_info(forecast_data, city, resolution):
+    """Full OWM city block for 3h responses; just name and country for daily ones."""
+    city_info = forecast_data.get('city', {'name': city})  # Fallback city info
+    if resolution == 'daily':
+        return {'name': city_info.get('name', city), 'country': city_info.get('country')}
+    return city_info
+
+
+def _weather_params(request):
+    """
+    Validates get_weather_view's query parameters.
+
+    Returns (params, None) or (None, error JsonResponse).
+    """
     city = request.GET.get('city')
     start_date_str = request.GET.get('start_date')
     end_date_str = request.GET.get('end_date')
 
     if not city or not start_date_str or not end_date_str:
         logger.warning("Missing required parameters: city, start_date, or end_date")
-        return JsonResponse({"error": "city, start_date and end_date parameters are required"}, status=400)
+        return None, JsonResponse({"error": "city, start_date and end_date parameters are required"}, status=400)
 
-    # Step 1: Geocode city
-    try:
-        geo_url = f"https://api.radar.io/v1/geocode/forward?query={city}&limit=1"
-        headers = {"Authorization": settings.GEOCODE_API_KEY}
-        response = requests.get(geo_url, headers=headers, timeout=10)  # Add timeout
-        response.raise_for_status()  # Raise HTTPError for bad responses (4xx or 5xx)
-
-        geocode_results = response.json()
-        if not geocode_results.get("addresses"):
-            logger.warning(f"No addresses found for city: {city}")
-            return JsonResponse({"error": f"No addresses found for '{city}'"}, status=404)  # Use 404
-
-        address = geocode_results['addresses'][0]
-        # Check if coordinates exist
-        if 'geometry' not in address or 'coordinates' not in address['geometry'] or len(
-                address['geometry']['coordinates']) < 2:
-            logger.error(f"Coordinates missing in geocode response for {city}: {address}")
-            return JsonResponse({"error": "Could not extract coordinates from geocode result"}, status=500)
-
-        latitude = address['geometry']['coordinates'][1]
-        longitude = address['geometry']['coordinates'][0]
-
-    except requests.exceptions.RequestException as e:
-        logger.error(f"Geocoding request failed for {city}: {e}")
-        return JsonResponse({"error": "failed to geocode address"}, status=502)  # 502 Bad Gateway is often appropriate
-    except Exception as e:
-        logger.error(f"Unexpected error during geocoding for {city}: {e}")
-        return JsonResponse({"error": "An unexpected error occurred during geocoding"}, status=500)
+    # ?resolution=3h (default, OWM entries) or daily (aggregated per day server-side)
+    resolution = request.GET.get('resolution', '3h')
+    if resolution not in RESOLUTIONS:
+        return None, JsonResponse({"error": f"resolution must be one of: {', '.join(RESOLUTIONS)}"}, status=400)
+    # ?fields=... trims each entry/day to the listed keys
+    fields = None
+    fields_param = request.GET.get('fields')
+    if fields_param:
+        fields, unknown = _parse_fields(fields_param, DAILY_FIELDS if resolution == 'daily' else ENTRY_FIELDS)
+        if unknown:
+            return None, JsonResponse({"error": f"Unknown fields: {', '.join(unknown)}"}, status=400)
+    elif resolution == 'daily':
+        fields = DEFAULT_DAILY_FIELDS
 
-    # Step 2: Get forecast data
     try:
-        forecast_url = (
-            f"https://api.openweathermap.org/data/2.5/forecast"
-            f"?lat={latitude}&lon={longitude}"
-            f"&units=metric&appid={settings.OWM_API_KEY}"
-        )
-        forecast_response = requests.get(forecast_url, timeout=10)  # Add timeout
-        forecast_response.raise_for_status()
-        forecast_data = forecast_response.json()
-
-        # Basic check if OWM response looks valid
-        if 'list' not in forecast_data or 'city' not in forecast_data:
-            logger.error(
-                f"Invalid forecast data structure received from OWM for {latitude},{longitude}: {forecast_data}")
-            return JsonResponse({"error": "Received invalid data structure from weather service"}, status=502)
-
-    except requests.exceptions.RequestException as e:
-        logger.error(f"OWM forecast request failed for {latitude},{longitude}: {e}")
-        return JsonResponse({"error": "could not fetch forecast"}, status=502)
-    except Exception as e:
-        logger.error(f"Unexpected error during forecast fetch for {latitude},{longitude}: {e}")
-        return JsonResponse({"error": "An unexpected error occurred fetching forecast"}, status=500)
+        start_date = datetime.strptime(start_date_str, "%Y-%m-%d").date()
+        end_date = datetime.strptime(end_date_str, "%Y-%m-%d").date()
+    except ValueError as e:
+        logger.error(f"Date parsing error: {e}. Received start: '{start_date_str}', end: '{end_date_str}'")
+        return None, JsonResponse({"error": f"Invalid date format. Please use YYYY-MM-DD. Error: {e}"}, status=400)
+
+    return {
+        'city': city,
+        'start_date': start_date,
+        'end_date': end_date,
+        'start_date_str': start_date_str,
+        'end_date_str': end_date_str,
+        'resolution': resolution,
+        'fields': fields,
+    }, None
+
+
+def _geocode_error_response(city, error):
+    status = 404 if error == GEOCODE_NOT_FOUND.format(city=city) else 502
+    return JsonResponse({"error": error}, status=status)
+
+
+@require_GET
+def get_weather_view(request):
+    params, error_response = _weather_params(request)
+    if error_response:
+        return error_response
+    city = params['city']
+
+    # Step 1: Geocode city (served from the shared geocode cache when possible)
+    latitude, longitude, error = _geocode_city(city)
+    if error:
+        return _geocode_error_response(city, error)
+
+    # Trips beyond the forecast horizon are described from climate normals, no OWM call needed
+    if beyond_forecast_horizon(params['start_date']):
+        return _climate_response(params, latitude, longitude)
+
+    # Step 2: Get forecast data (cached per grid cell until the next OWM update)
+    forecast_data, error = _fetch_owm_forecast(latitude, longitude)
+    if error:
+        return JsonResponse({"error": error}, status=502)
 
     # Step 3: Filter forecast to only include trip dates
+    return _forecast_response(params, latitude, longitude, forecast_data)
+
+
+async def get_weather_view_async(request):
+    """
+    Async version of get_weather_view for ASGI deployments.
+
+    The Radar and OWM calls are awaited through a shared httpx.AsyncClient, so
+    a worker isn't blocked while they are in flight. Responses are identical.
+    """
+    if request.method != 'GET':
+        return HttpResponseNotAllowed(['GET'])
+    params, error_response = _weather_params(request)
+    if error_response:
+        return error_response
+    city = params['city']
+
+    latitude, longitude, error = await _geocode_city_async(city)
+    if error:
+        return _geocode_error_response(city, error)
+
+    if beyond_forecast_horizon(params['start_date']):
+        return await sync_to_async(_climate_response)(params, latitude, longitude)
+
+    forecast_data, error = await _fetch_owm_forecast_async(latitude, longitude)
+    if error:
+        return JsonResponse({"error": error}, status=502)
+
+    # Filtering is CPU-only, but daily mode reads/writes the cache
+    return await sync_to_async(_forecast_response)(params, latitude, longitude, forecast_data)
+
+
+def _climate_response(params, latitude, longitude):
+    """
+    Response for dates beyond the forecast range: no forecast entries, plus a
+    summary from climate normals when they cover the destination.
+    """
+    city = params['city']
+    resolution = params['resolution']
+    summary = climate_summary(latitude, longitude, city, params['start_date'], params['end_date'])
+    return JsonResponse({
+        'city': {'name': city},
+        'resolution': resolution,
+        'days' if resolution == 'daily' else 'list': [],  # Empty because it's outside the forecast range
+        'trip_duration': (params['end_date'] - params['start_date']).days + 1,
+        'message': f"Requested dates are beyond the available "
+                   f"{getattr(settings, 'FORECAST_HORIZON_DAYS', 5)}-day forecast range.",
+        'climate_summary': summary,
+    })
+
+
+def _forecast_response(params, latitude, longitude, forecast_data):
+    """
+    Filters the forecast to the requested dates and builds the JSON response.
+    Callers send dates beyond the forecast horizon to _climate_response instead.
+    """
+    city = params['city']
+    start_date_str = params['start_date_str']
+    end_date_str = params['end_date_str']
+    resolution = params['resolution']
+    fields = params['fields']
+
     try:
         # Parse the date strings into naive datetime objects
         start_dt_naive = datetime.strptime(start_date_str, "%Y-%m-%d")
@@ -104,36 +202,27 @@ def get_weather_view(request):
         # We assume the input dates represent the start of the day in UTC for filtering.
         end_dt_exclusive = end_dt_naive + timedelta(days=1)
 
-        # Make the start/end datetimes timezone-aware (UTC) for robust comparison
-        # (Even though utcfromtimestamp below gives naive, comparing naive UTC is consistent)
-        # Or, you could make the item_dt aware too, but comparing naive UTC is simpler here.
+        # Make the start/end datetimes timezone-aware (UTC) so they line up with OWM's epoch 'dt' values
         start_dt_utc = start_dt_naive.replace(tzinfo=timezone.utc)
         end_dt_exclusive_utc = end_dt_exclusive.replace(tzinfo=timezone.utc)
 
-        # Check if the requested start date is too far in the future for the OWM API
-        now_utc = datetime.now(timezone.utc)
-        # OWM free tier is 5 days ahead
-        max_forecast_date_utc = now_utc + timedelta(days=5)
+        start_epoch = int(start_dt_utc.timestamp())
+        end_epoch = int(end_dt_exclusive_utc.timestamp())
+        trip_duration = (end_dt_naive - start_dt_naive).days + 1
 
-        if start_dt_utc > max_forecast_date_utc:
-            logger.warning(f"Requested start date {start_date_str} is beyond the 5-day forecast limit.")
-            # Return empty list but success status, as the request itself is valid
+        if resolution == 'daily':
+            days = daily_forecast(latitude, longitude, forecast_data, start_epoch, end_epoch)
             return JsonResponse({
-                'city': forecast_data['city'],
-                'list': [],  # Empty list because it's outside the forecast range
-                'trip_duration': (end_dt_naive - start_dt_naive).days + 1,
-                'message': 'Requested dates are beyond the available 5-day forecast range.'
+                'city': _city_info(forecast_data, city, resolution),
+                'resolution': resolution,
+                'days': [{field: day[field] for field in fields} for day in days],
+                'trip_duration': trip_duration,
+                'stale': bool(forecast_data.get('stale')),
             })
 
-        filtered_forecast = []
-        for item in forecast_data.get('list', []):  # Use .get for safety
-            # --- Important Fix: Use utcfromtimestamp ---
-            # Convert OWM's UTC timestamp ('dt') to a naive datetime representing UTC time
-            item_dt_naive_utc = datetime.utcfromtimestamp(item['dt'])
-
-            # Now compare the naive UTC datetimes
-            if start_dt_naive <= item_dt_naive_utc < end_dt_exclusive:
-                filtered_forecast.append(item)
+        # Columnar view of the forecast; the window is two binary searches on the timestamps
+        frame = ForecastFrame.from_owm(forecast_data).window(start_epoch, end_epoch)
+        filtered_forecast = frame.entries
 
         # Log if filtering resulted in an empty list when OWM provided data
         if forecast_data.get('list') and not filtered_forecast:
@@ -142,10 +231,14 @@ def get_weather_view(request):
             # You could inspect the first few item['dt'] values from forecast_data here if debugging
 
         # Return filtered data
+        if fields:
+            filtered_forecast = [slim_entry(item, fields) for item in filtered_forecast]
         return JsonResponse({
-            'city': forecast_data.get('city', {'name': city}),  # Fallback city info
+            'city': _city_info(forecast_data, city, resolution),
+            'resolution': resolution,
             'list': filtered_forecast,
-            'trip_duration': (end_dt_naive - start_dt_naive).days + 1
+            'trip_duration': trip_duration,
+            'stale': bool(forecast_data.get('stale')),  # Last known good forecast, refresh in progress
         })
 
     except ValueError as e:
@@ -154,4 +247,96 @@ def get_weather_view(request):
     except Exception as e:
         logger.exception(
             f"An unexpected error occurred during forecast filtering: {e}")  # Use logger.exception to include traceback
-        return JsonResponse({"error": "An internal server error occurred during data processing"}, status=500)
\ No newline at end of file
+        return JsonResponse({"error": "An internal server error occurred during data processing"}, status=500)
+
+
+@login_required
+@require_GET
+def batch_weather_view(request):
+    """
+    Weather summaries for many of the user's trips in one response.
+
+    ?trip_ids=1,2,3 selects trips (unknown or foreign IDs are reported under
+    'missing'); without it, every trip that hasn't ended yet is included. Each
+    destination is geocoded and fetched once, concurrently. Trips beyond the
+    forecast horizon are summarized from climate normals without an OWM call.
+    """
+    max_trips = getattr(settings, 'WEATHER_BATCH_MAX_TRIPS', 50)
+    trips = Trip.objects.filter(user=request.user).order_by('date_leaving')
+    requested_ids = []
+    trip_ids_param = request.GET.get('trip_ids')
+    if trip_ids_param:
+        try:
+            requested_ids = [int(trip_id) for trip_id in trip_ids_param.split(',') if trip_id.strip()]
+        except ValueError:
+            return JsonResponse({"error": "trip_ids must be a comma-separated list of integers"}, status=400)
+        if len(requested_ids) > max_trips:
+            return JsonResponse({"error": f"At most {max_trips} trips can be requested at once"}, status=400)
+        trips = trips.filter(pk__in=requested_ids)
+    else:
+        trips = trips.filter(date_returning__gte=django_timezone.now().date())[:max_trips]
+    trips = list(trips)
+
+    far = {trip.id for trip in trips if beyond_forecast_horizon(trip.date_leaving)}
+    forecasts = fetch_forecasts((trip.destination for trip in trips if trip.id not in far),
+                                geocode_only=[trip.destination for trip in trips if trip.id in far])
+    frames = {}
+    results = []
+    for trip in trips:
+        key = geocache.normalize_query(trip.destination)
+        latitude, longitude, forecast_data, error = forecasts.get(key, (None, None, None, "Missing destination."))
+        result = {
+            'trip_id': trip.id,
+            'destination': trip.destination,
+            'start_date': trip.date_leaving.isoformat(),
+            'end_date': trip.date_returning.isoformat(),
+        }
+        if error:
+            result['error'] = error
+            results.append(result)
+            continue
+
+        try:
+            if trip.id in far:
+                summary = climate_summary(latitude, longitude, trip.destination, trip.date_leaving, trip.date_returning)
+                result['summary'] = summary or (f"No specific forecast data available for the selected dates in "
+                                                f"{trip.destination} (may be too far out).")
+                result['stale'] = False
+                result['days'] = []
+                results.append(result)
+                continue
+
+            if key not in frames:
+                frames[key] = ForecastFrame.from_owm(forecast_data)
+            start_epoch, end_epoch = date_window(trip.date_leaving, trip.date_returning)
+            city_name = forecast_data.get('city', {}).get('name', trip.destination)
+            window = frames[key].window(start_epoch, end_epoch)
+            result['summary'] = _summarize_forecast(window, city_name)
+            result['stale'] = bool(forecast_data.get('stale'))
+            days = daily_forecast(latitude, longitude, forecast_data, start_epoch, end_epoch)
+            result['days'] = [{field: day[field] for field in DEFAULT_DAILY_FIELDS} for day in days]
+        except Exception as e:
+            logger.exception(f"Error processing batch forecast for trip {trip.id}: {e}")
+            result['error'] = "Error processing forecast data."
+        results.append(result)
+
+    response = {'trips': results}
+    if requested_ids:
+        found = {trip.id for trip in trips}
+        response['missing'] = [trip_id for trip_id in requested_ids if trip_id not in found]
+    return JsonResponse(response)
+
+
+@login_required
+@require_GET
+def destination_autocomplete_view(request):
+    """Destination suggestions from the offline gazetteer (same shape as the places autocomplete)."""
+    query = request.GET.get('q', '').strip()
+    if len(query) < 2:
+        return JsonResponse({'suggestions': []})
+    cities = gazetteer.prefix(query, limit=getattr(settings, 'GAZETTEER_SUGGESTIONS', 8))
+    return JsonResponse({'suggestions': [
+        {'type': 'city', 'text': city['name'], 'latitude': city['latitude'], 'longitude': city['longitude']}
+        for city in cities
+    ]})
+